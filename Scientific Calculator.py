@@ -1,41 +1,14 @@
 import streamlit as st
-import math
+
+from fxcalc.formatting import result_text
+from shared import apply_style, eval_pool, history_session, history_store
 
 # -----------------------------------
 # Streamlit Page Configuration
 # -----------------------------------
 st.set_page_config(page_title="Casio fx-991EX", page_icon="🧮", layout="centered")
 
-st.markdown("""
-    <style>
-    [data-testid="stAppViewContainer"] {
-        background: linear-gradient(145deg, #0f2027, #203a43, #2c5364);
-        color: white;
-    }
-    .stTextInput > div > div > input {
-        text-align: right;
-        font-size: 24px;
-        height: 3em;
-        border-radius: 10px;
-        color: white;
-        background-color: #1e1e1e;
-    }
-    .stButton>button {
-        width: 100%;
-        height: 3em;
-        font-size: 18px;
-        border-radius: 8px;
-        background: #333;
-        color: white;
-        border: 1px solid #00ff99;
-    }
-    .stButton>button:hover {
-        background: #00ff99;
-        color: black;
-        font-weight: bold;
-    }
-    </style>
-""", unsafe_allow_html=True)
+apply_style("scientific")
 
 st.title("🧮 Casio fx-991EX — Scientific Calculator")
 st.caption("Built with Streamlit • Degree Mode • Replay Memory")
@@ -45,8 +18,12 @@ st.caption("Built with Streamlit • Degree Mode • Replay Memory")
 # -----------------------------------
 if "display" not in st.session_state:
     st.session_state.display = ""
-if "history" not in st.session_state:
-    st.session_state.history = []
+if "history_page" not in st.session_state:
+    st.session_state.history_page = []   # keyset cursors of the older pages shown
+
+if "history_id" not in st.session_state:
+    # kept in the URL so the same history comes back after a reload or restart
+    st.session_state.history_id = history_session()
 
 # -----------------------------------
 # Helper Functions
@@ -62,38 +39,26 @@ def backspace():
 
 def evaluate():
     expr = st.session_state.display
-    expr = expr.replace("^", "**").replace("π", "math.pi").replace("√", "math.sqrt")
     try:
-        # Safe math environment
-        allowed = {
-            "sin": lambda x: math.sin(math.radians(x)),
-            "cos": lambda x: math.cos(math.radians(x)),
-            "tan": lambda x: math.tan(math.radians(x)),
-            "asin": lambda x: math.degrees(math.asin(x)),
-            "acos": lambda x: math.degrees(math.acos(x)),
-            "atan": lambda x: math.degrees(math.atan(x)),
-            "sqrt": math.sqrt,
-            "log": math.log10,
-            "ln": math.log,
-            "exp": math.exp,
-            "pi": math.pi,
-            "e": math.e,
-            "abs": abs,
-            "fact": math.factorial,
-            "pow": pow,
-            "math": math
-        }
-        result = eval(expr, {"__builtins__": None}, allowed)
-        st.session_state.display = str(result)
-        # Store in history (limit 5)
-        st.session_state.history.insert(0, f"{expr} = {result}")
-        st.session_state.history = st.session_state.history[:5]
+        # The shared fxcalc engine (degrees), in the server's time/memory-limited pool
+        result = eval_pool().evaluate(expr, "DEG")
+        text = result_text(result)       # huge ints rounded, not converted digit by digit
+        st.session_state.display = text
+        # Store in history (written to SQLite in the background)
+        history_store().append(st.session_state.history_id, expr, text)
+        st.session_state.history_page = []
     except Exception:
         st.session_state.display = "Error"
 
 def recall_expression(expression):
     st.session_state.display = expression.split("=")[0].strip()
 
+def older_history(cursor):
+    st.session_state.history_page.append(cursor)
+
+def newer_history():
+    st.session_state.history_page.pop()
+
 # -----------------------------------
 # Display Screen
 # -----------------------------------
@@ -137,15 +102,22 @@ for row in buttons:
 # Replay History Section
 # -----------------------------------
 st.divider()
-st.subheader("🧠 Replay Memory (Last 5 Calculations)")
+st.subheader("🧠 Replay Memory")
 
-if len(st.session_state.history) == 0:
+# Only the 5 entries on screen are read; older ones are a click away
+cursors = st.session_state.history_page
+history = history_store().page(st.session_state.history_id, cursors[-1] if cursors else None, 6)
+if len(history) == 0:
     st.caption("No previous calculations yet.")
 else:
-    for i, entry in enumerate(st.session_state.history):
+    for entry in history[:5]:
         cols = st.columns([8, 1])
         cols[0].markdown(f"`{entry}`")
-        cols[1].button("↩", key=f"recall_{i}", on_click=recall_expression, args=(entry,))
+        cols[1].button("↩", key=f"recall_{entry.id}", on_click=recall_expression, args=(str(entry),))
+    cols = st.columns(2)
+    cols[0].button("◀ Newer", on_click=newer_history, disabled=not cursors)
+    cols[1].button("Older ▶", on_click=older_history, args=(history[4].id if len(history) > 5 else None,),
+                   disabled=len(history) <= 5)
 
 st.caption("Mode: Degrees | Supports sin, cos, tan, log, ln, sqrt, factorial, π, e, powers, etc.")
 
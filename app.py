@@ -0,0 +1,19 @@
+"""All three calculators as pages of one Streamlit app.
+
+    streamlit run app.py
+
+The pages share one server process: the fxcalc engine, the evaluation pool,
+the history store and the stylesheet are loaded once (see shared.py), not
+once per app.  Each page still runs on its own with ``streamlit run <page>``.
+"""
+import streamlit as st
+
+st.set_page_config(page_title="Casio fx-991EX", page_icon="🧮", layout="centered")
+
+PAGES = [
+    st.Page("scientificcalculator.py", title="fx-991EX Pro", icon="🧮", url_path="pro", default=True),
+    st.Page("Scientific Calculator.py", title="Scientific", icon="🔬", url_path="scientific"),
+    st.Page("calculator.py", title="Simple", icon="➕", url_path="simple"),
+]
+
+st.navigation(PAGES).run()
@@ -0,0 +1,173 @@
+"""Requests/s of the local JSON API (``python -m fxcalc.api``).
+
+Starts the service on a free local port (or uses ``--url``) and measures:
+
+* ``/evaluate``: N clients, each sending one request after another for
+  ``--duration`` s.  Clients reuse their connection (keep-alive), or open
+  a new one for every request (``new conn``) for comparison.  Reports
+  requests/s and p50/p99 latency;
+* ``/batch``: expressions/s of one batch of each size, and the time to the
+  first NDJSON line;
+* ``inline``: ``fxcalc.evaluate`` in this process, with no HTTP or worker
+  pool, as a ceiling.
+
+The corpus is bench_parser's: expressions the legacy app accepts too.  The
+clients share the machine with the server and its workers, so compare runs
+made on the same machine.
+
+    python benchmarks/bench_api.py [--workers 2] [--duration 5]
+    python benchmarks/bench_api.py --url http://127.0.0.1:8765
+"""
+import argparse
+import asyncio
+import http.client
+import itertools
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+
+from bench_parser import ANS, CORPUS  # noqa: E402
+from fxcalc import evaluate  # noqa: E402
+
+HEAD = (b"POST /evaluate HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+        b"Content-Length: %d\r\nConnection: %s\r\n\r\n")
+_LENGTH = re.compile(rb"content-length:\s*(\d+)", re.IGNORECASE)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int):
+    """``python -m fxcalc.api`` on a free port; returns (process, base url)."""
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, "-m", "fxcalc.api", "--port", str(port), "--workers", str(workers)],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(f"{url}/health", timeout=1)
+            return proc, url
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("the API server exited") from None
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("the API server did not come up")
+
+
+# ───────────────────────── /evaluate ─────────────────────────
+async def _post(reader, writer, body: bytes, keep_alive: bool) -> int:
+    writer.write(HEAD % (len(body), b"keep-alive" if keep_alive else b"close") + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    await reader.readexactly(int(_LENGTH.search(head).group(1)))
+    return int(head[9:12])
+
+
+async def _client(host, port, bodies, keep_alive, end, latencies, errors):
+    connection = None
+    for body in bodies:
+        if time.perf_counter() >= end:
+            break
+        t0 = time.perf_counter()
+        if connection is None:
+            connection = await asyncio.open_connection(host, port)
+        status = await _post(*connection, body, keep_alive)
+        latencies.append(time.perf_counter() - t0)
+        errors[0] += status != 200
+        if not keep_alive:
+            connection[1].close()
+            await connection[1].wait_closed()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def single(url: str, clients: int, keep_alive: bool, duration: float) -> dict:
+    parts = urllib.parse.urlsplit(url)
+    bodies = [json.dumps({"expr": expr, "ans": ANS}).encode() for expr in CORPUS]
+    latencies, errors = [], [0]
+    t0 = time.perf_counter()
+    end = t0 + duration
+    await asyncio.gather(*(_client(parts.hostname, parts.port, itertools.islice(itertools.cycle(bodies), i, None),
+                                   keep_alive, end, latencies, errors) for i in range(clients)))
+    elapsed = time.perf_counter() - t0
+    cuts = statistics.quantiles(latencies, n=100)
+    return {"clients": clients, "keep_alive": keep_alive, "requests": len(latencies), "errors": errors[0],
+            "rps": len(latencies) / elapsed, "p50_ms": cuts[49] * 1e3, "p99_ms": cuts[98] * 1e3}
+
+
+# ───────────────────────── /batch ─────────────────────────
+def batch(url: str, size: int) -> dict:
+    parts = urllib.parse.urlsplit(url)
+    exprs = list(itertools.islice(itertools.cycle(CORPUS), size))
+    body = json.dumps({"exprs": exprs, "ans": ANS})
+    conn = http.client.HTTPConnection(parts.hostname, parts.port)
+    t0 = time.perf_counter()
+    conn.request("POST", "/batch", body, {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    first, lines, errors = None, 0, 0
+    for line in response:
+        if first is None:
+            first = time.perf_counter() - t0
+        lines += 1
+        errors += b'"error"' in line
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    assert lines == size, f"{lines} lines for {size} expressions"
+    return {"size": size, "errors": errors, "eps": size / elapsed, "first_ms": first * 1e3,
+            "total_ms": elapsed * 1e3}
+
+
+def inline(number: int = 20000) -> float:
+    variables = {"Ans": ANS}
+    t0 = time.perf_counter()
+    for expr in itertools.islice(itertools.cycle(CORPUS), number):
+        evaluate(expr, "DEG", variables)
+    return number / (time.perf_counter() - t0)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--url", help="use a running service instead of starting one")
+    ap.add_argument("--workers", type=int, default=2, help="evaluation processes of the started service")
+    ap.add_argument("--duration", type=float, default=5.0, help="seconds per /evaluate run")
+    ap.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = ap.parse_args(argv)
+    proc, url = (None, args.url) if args.url else start_server(args.workers)
+    try:
+        print(f"{'/evaluate':<22}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        runs = [(clients, True) for clients in args.clients] + [(max(args.clients[:2]), False)]
+        for clients, keep_alive in runs:
+            r = asyncio.run(single(url, clients, keep_alive, args.duration))
+            label = f"{clients} clients{'' if keep_alive else ', new conn'}"
+            print(f"{label:<22}{r['rps']:>9,.0f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['errors']:>8}")
+        batch(url, 100)                  # warm-up: worker compile caches, executor threads
+        print(f"\n{'/batch':<22}{'expr/s':>9}{'first ms':>9}{'total ms':>9}{'errors':>8}")
+        for size in args.sizes:
+            r = batch(url, size)
+            print(f"{f'{size:,} expressions':<22}{r['eps']:>9,.0f}{r['first_ms']:>9.1f}{r['total_ms']:>9.0f}"
+                  f"{r['errors']:>8}")
+        print(f"\n{'inline evaluate()':<22}{inline():>9,.0f}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
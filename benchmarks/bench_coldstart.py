@@ -0,0 +1,122 @@
+"""Cold start and memory: one multipage app vs. one process per calculator.
+
+Every measurement runs in a fresh interpreter, driven headlessly through
+Streamlit's AppTest harness:
+
+* ``separate``: one process per page script, as the calculators were
+  deployed before ``app.py``.  Each process renders its page and does one
+  calculation.
+* ``multipage``: one ``app.py`` process that renders every page and does the
+  same calculations.
+
+Reported per process: time from spawn to the first rendered page, and the
+resident memory of the process and its children (evaluation workers) after
+the calculations.  The totals compare what the deployment costs.
+
+    python benchmarks/bench_coldstart.py
+    python benchmarks/bench_coldstart.py --rev HEAD~1      # separate apps of an older commit
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+HERE = os.path.abspath(__file__)
+ROOT = os.path.dirname(os.path.dirname(HERE))
+
+PAGES = ["scientificcalculator.py", "Scientific Calculator.py", "calculator.py"]
+ENTRY = "app.py"
+# what each page types before reading memory: one calculation
+KEYS = {"scientificcalculator.py": ["1", "+", "1", "="],
+        "Scientific Calculator.py": ["1", "+", "1", "="],
+        "calculator.py": ["Calculate"]}
+
+
+# ───────────────────────── CHILD ─────────────────────────
+def _rss_kib(pid: int) -> int:
+    """VmRSS of ``pid`` plus all of its descendants."""
+    total = 0
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            total += next(int(line.split()[1]) for line in fh if line.startswith("VmRSS:"))
+        with open(f"/proc/{pid}/task/{pid}/children") as fh:
+            children = [int(child) for child in fh.read().split()]
+    except (OSError, StopIteration):
+        return total
+    return total + sum(_rss_kib(child) for child in children)
+
+
+def _calculate(at, page: str):
+    for label in KEYS[page]:
+        at.run()                 # a fragment rerun leaves only the fragment in AppTest's tree
+        next(b for b in at.button if b.label == label).click().run()
+    at.run()
+
+
+def child(root: str, script: str, started: float):
+    sys.path.insert(0, root)
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(root, script), default_timeout=120).run()
+    first_render = time.time() - started
+    if at.exception:
+        raise SystemExit(f"{script}: {at.exception[0].message}")
+    if script == ENTRY:
+        for page in PAGES:
+            at.switch_page(page).run()
+            _calculate(at, page)
+    else:
+        _calculate(at, script)
+    print(json.dumps({"first_render_s": first_render, "rss_kib": _rss_kib(os.getpid())}))
+
+
+# ───────────────────────── PARENT ─────────────────────────
+def measure(root: str, script: str) -> dict:
+    # FXCALC_KEYPAD=server: the calculations click st.button keys
+    env = dict(os.environ, FXCALC_HISTORY_DB=os.path.join(tempfile.mkdtemp(), "history.sqlite3"),
+               FXCALC_KEYPAD="server")
+    started = time.time()
+    out = subprocess.check_output([sys.executable, HERE, "--child", root, script, repr(started)],
+                                  env=env, cwd=root, stderr=subprocess.DEVNULL, text=True)
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _checkout(rev: str) -> str:
+    """The tree of ``rev`` in a temporary directory."""
+    target = tempfile.mkdtemp(prefix="fxcalc-")
+    data = subprocess.check_output(["git", "-C", ROOT, "archive", rev])
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        tar.extractall(target)
+    return target
+
+
+def report(name: str, results: dict):
+    print(f"{name}:")
+    for script, r in results.items():
+        print(f"  {script:<28}{r['first_render_s'] * 1e3:>9,.0f} ms{r['rss_kib'] / 1024:>9,.1f} MiB")
+    print(f"  {'total':<28}{max(r['first_render_s'] for r in results.values()) * 1e3:>9,.0f} ms"
+          f"{sum(r['rss_kib'] for r in results.values()) / 1024:>9,.1f} MiB")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="cold start and memory per deployment")
+    ap.add_argument("--rev", help="measure the separate apps of this git revision instead of the working tree")
+    ap.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        root, script, started = args.child
+        return child(root, script, float(started))
+
+    root = _checkout(args.rev) if args.rev else ROOT
+    report(f"separate ({args.rev or 'working tree'})", {page: measure(root, page) for page in PAGES})
+    if os.path.exists(os.path.join(ROOT, ENTRY)):
+        report("multipage", {ENTRY: measure(ROOT, ENTRY)})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Result text for huge ints: ``str()`` vs. fxcalc.formatting.
+
+For results up to the engine's size limit it reports:
+
+* ``str()``: what "=" used to do for the display and for history.  Past
+  4,300 digits it raises ValueError unless the limit is lifted, and is
+  lifted here only to time it;
+* ``display``: ``result_text`` in Norm, Sci and Eng, i.e. the rounded text
+  "=" now shows;
+* ``all digits``: ``all_digits`` for the lazy view, first call (the
+  background conversion) and cached;
+* the bytes a history row stores with either.
+
+    python benchmarks/bench_format.py
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fxcalc.formatting import ENG, SCI, Format, all_digits, compact, result_text  # noqa: E402
+from fxcalc.limits import MAX_RESULT_BITS  # noqa: E402
+
+RESULTS = {"1000!": lambda: math.factorial(1000), "5000!": lambda: math.factorial(5000),
+           "20000!": lambda: math.factorial(20000), "50000!": lambda: math.factorial(50000),
+           "2^(limit)-1": lambda: (1 << MAX_RESULT_BITS) - 1}
+
+
+def best(fn, repeat=3) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    sys.set_int_max_str_digits(0)
+    print(f"{'result':<13}{'digits':>9}{'str() ms':>10}{'display µs':>12}{'all digits ms':>15}"
+          f"{'cached µs':>11}{'history bytes':>15}")
+    for name, make in RESULTS.items():
+        n = make()
+        text = str(n)
+        plain = best(lambda: str(n))
+        shown = max(best(lambda: result_text(n, fmt), repeat=20) for fmt in (Format(), Format(SCI, 6), Format(ENG, 6)))
+        t0 = time.perf_counter()
+        digits = all_digits(n).result()
+        first = time.perf_counter() - t0
+        cached = best(lambda: all_digits(n).result(), repeat=20)
+        assert digits == text
+        stored = str(compact(n))
+        print(f"{name:<13}{len(text):>9,}{plain * 1e3:>10.1f}{shown * 1e6:>12.1f}{first * 1e3:>15.1f}"
+              f"{cached * 1e6:>11.1f}{len(text):>8,} → {len(stored)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
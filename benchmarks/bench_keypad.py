@@ -0,0 +1,92 @@
+"""Server work for typing on the Pro app: st.button keys vs. the browser keypad.
+
+Types the bench_reruns key sequence, sin(30)+2×3= then SHIFT, asin(0.5)= and C,
+both ways, headlessly through AppTest:
+
+* ``server``: every key is a websocket message and a (fragment) script run;
+* ``client``: the fxkeypad component edits the expression in the browser, so
+  only the keys outside ``fxkeypad.CLIENT_ACTIONS`` send an event.  The
+  browser side is modelled here; it costs the server nothing.
+
+    python benchmarks/bench_keypad.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+os.environ.setdefault("FXCALC_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "history.sqlite3"))
+
+from streamlit.proto.WidgetStates_pb2 import WidgetStates  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import bench_reruns  # noqa: E402
+from fxcalc.keypad import LAYOUT, SHIFT_MAP  # noqa: E402
+from fxkeypad import CLIENT_ACTIONS  # noqa: E402
+
+KEYS = {key: (action, token) for row in LAYOUT for _label, action, token, key in row}
+
+
+def browser_keypad(keys, send):
+    """Model of keypad.js: edit locally, ``send(action, expr)`` the rest; it returns the new display."""
+    expr, shift = "", False
+    for key in keys:
+        action, token = KEYS[key]
+        if action not in CLIENT_ACTIONS:
+            expr = send(action, expr)
+        elif action == "press":
+            expr += SHIFT_MAP.get(token, token) if shift else token
+        elif action == "clear":
+            expr = ""
+        elif action == "back":
+            expr = expr[:-1]
+        elif action == "toggle_shift":
+            shift = not shift
+
+
+def run_server() -> list:
+    bench_reruns._install_counters()
+    return [secs for _key, _counts, secs in bench_reruns.run()]
+
+
+def run_client() -> list:
+    os.environ["FXCALC_KEYPAD"] = "client"
+    try:
+        at = AppTest.from_file(os.path.join(ROOT, bench_reruns.APP), default_timeout=60).run()
+    finally:
+        os.environ["FXCALC_KEYPAD"] = "server"
+    times = []
+
+    def send(action, expr):
+        component = at.get("component_instance")[0]
+        states = WidgetStates()
+        widget = states.widgets.add()
+        widget.id = component.proto.id
+        widget.json_value = json.dumps({"action": action, "expr": expr, "seq": len(times)})
+        t0 = time.perf_counter()
+        at._run(states)
+        times.append(time.perf_counter() - t0)
+        return at.session_state.calc.disp
+
+    browser_keypad(bench_reruns.KEYS, send)
+    return times
+
+
+def main():
+    keys = len(bench_reruns.KEYS)
+    run_server()                     # warm up: evaluation pool, compile cache, imports
+    results = {"server": run_server(), "client": run_client()}
+    print(f"{keys} keystrokes")
+    print(f"{'keypad':<8}{'round trips':>13}{'server ms':>11}{'ms/keystroke':>14}")
+    for name, times in results.items():
+        print(f"{name:<8}{len(times):>13}{sum(times) * 1e3:>11.1f}{sum(times) * 1e3 / keys:>14.2f}")
+    server, client = (sum(results[name]) for name in ("server", "client"))
+    print(f"server work, client/server: {client / server:.2f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
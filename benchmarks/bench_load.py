@@ -0,0 +1,349 @@
+"""Concurrent users on one server process: keystroke latency, RSS and saturation.
+
+Starts ``streamlit run app.py`` on a free local port (or attaches to a
+running server with ``--url``).  Then N simulated users type on the Pro page
+at once, for N = 1, 2, 4, ... .  Each user is a websocket session that
+speaks Streamlit's own protocol, as a browser tab does: a ``rerun_script``
+message with the widget event, then every ForwardMsg until the run
+finishes.  Users type whole calculations (digits, operators, functions with
+and without SHIFT, DEG/RAD, "=", M+ and C), with a random think time between
+keys.  AppTest can't do this: it runs one session per process.
+
+* ``--keypad server``: every key is an ``st.button`` click, i.e. one round trip;
+* ``--keypad client``: the browser keypad is modelled as in bench_keypad.
+  Only "=", M+ and the mode key are sent, plus a preview after a pause.
+
+Per level it reports keystrokes/s and round trips/s, and p50/p95/p99
+latency per round trip (send to script_finished).  It also reports the
+server's RSS, with its evaluation workers, against the RSS before the first
+level.  The sweep stops at the first saturated level: p95 above ``--slo-ms``,
+or throughput up less than 10% on the previous level.  The level before it
+is the saturation point.  The load generator shares the machine with the
+server, so compare reports made on the same machine.
+
+    python benchmarks/bench_load.py -o load.json
+    python benchmarks/bench_load.py --rev HEAD~1 --compare load.json
+    python benchmarks/bench_load.py --keypad client --think 0.3
+    python benchmarks/bench_load.py --url ws://127.0.0.1:8501 --pid 4242
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.asyncio.client import connect
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+
+from bench_coldstart import _checkout, _rss_kib  # noqa: E402
+from bench_suite import _metadata  # noqa: E402
+from fxcalc.keypad import LAYOUT, SHIFT_MAP  # noqa: E402
+from fxkeypad import CLIENT_ACTIONS  # noqa: E402
+
+KEYS = {key: (action, token) for row in LAYOUT for _label, action, token, key in row}
+PRESS = {token: key for key, (action, token) in KEYS.items() if action == "press"}
+ACTION = {action: key for key, (action, token) in KEYS.items() if action != "press"}
+PREVIEW_DELAY = 0.25         # keypad.js: quiet time before the browser asks for a preview
+COMPONENT = "keypad_ui"      # widget key of the browser keypad
+
+
+# ───────────────────────── TYPING ─────────────────────────
+def _number(rng) -> list:
+    digits = str(rng.randint(1, 999))
+    if rng.random() < 0.25:
+        digits += "." + str(rng.randint(0, 9))
+    return [PRESS[d] for d in digits]
+
+
+def calculation(rng) -> list:
+    """Widget keys for one calculation, from C to "=" (and maybe M+)."""
+    keys = [ACTION["clear"]]
+    if rng.random() < 0.1:
+        keys.append(ACTION["toggle_mode"])                   # DEG ↔ RAD
+    for term in range(rng.randint(1, 3)):
+        if term:
+            keys.append(PRESS[rng.choice("+−×÷")])
+        roll = rng.random()
+        if roll < 0.1:
+            # SHIFT sin → asin( 0.5 ) SHIFT
+            keys += [ACTION["toggle_shift"], PRESS[rng.choice(("sin(", "cos(", "tan("))],
+                     PRESS["0"], PRESS["."], PRESS["5"], PRESS[")"], ACTION["toggle_shift"]]
+        elif roll < 0.35:
+            keys += [PRESS[rng.choice(("sin(", "cos(", "tan(", "log(", "ln(", "√("))],
+                     *_number(rng), PRESS[")"]]
+        else:
+            keys += _number(rng)
+        if rng.random() < 0.05:
+            keys += [PRESS["7"], ACTION["back"]]               # a typo, deleted
+    keys.append(ACTION["equal"])
+    if rng.random() < 0.2:
+        keys.append(ACTION["mem_add"])
+    return keys
+
+
+# ───────────────────────── SESSION ─────────────────────────
+class Session:
+    """One browser tab: a websocket, and the widgets and display of its last render."""
+
+    def __init__(self, ws, keypad: str):
+        self.ws = ws
+        self.keypad = keypad
+        self.widgets = {}        # widget key → (element id, fragment id)
+        self.page = ""           # page_script_hash, from the navigation message
+        self.disp = ""           # the browser keypad's display text
+        self.errors = 0          # exceptions rendered
+        self.seq = 0
+
+    @classmethod
+    async def open(cls, url: str, keypad: str) -> "Session":
+        session = cls(await connect(f"{url}/_stcore/stream", max_size=None), keypad)
+        await session.rerun()
+        return session
+
+    async def rerun(self, widget: WidgetState = None, fragment: str = "") -> float:
+        """Send one rerun request; seconds until its last run finished."""
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.query_string = f"keypad={self.keypad}"
+        state.page_script_hash = self.page
+        state.fragment_id = fragment
+        if widget is not None:
+            state.widget_states.widgets.append(widget)
+        t0 = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            fwd = ForwardMsg.FromString(await self.ws.recv())
+            kind = fwd.WhichOneof("type")
+            if kind == "delta":
+                self._delta(fwd.delta)
+            elif kind == "navigation":
+                self.page = fwd.navigation.page_script_hash
+            elif kind == "script_finished" and fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - t0
+
+    def _delta(self, delta):
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "button":
+            # keyed widget ids end in "-<key>"
+            self.widgets[element.button.id.rsplit("-", 1)[-1]] = (element.button.id, delta.fragment_id)
+        elif kind == "component_instance":
+            instance = element.component_instance
+            self.widgets[COMPONENT] = (instance.id, delta.fragment_id)
+            self.disp = json.loads(instance.json_args)["disp"]
+        elif kind == "exception":
+            self.errors += 1
+
+    async def click(self, key: str) -> float:
+        element_id, fragment = self.widgets[key]
+        return await self.rerun(WidgetState(id=element_id, trigger_value=True), fragment)
+
+    async def event(self, action: str, expr: str) -> float:
+        """A browser keypad event, as keypad.js sends it."""
+        element_id, fragment = self.widgets[COMPONENT]
+        self.seq += 1
+        value = json.dumps({"action": action, "expr": expr, "seq": self.seq})
+        return await self.rerun(WidgetState(id=element_id, json_value=value), fragment)
+
+    async def close(self):
+        await self.ws.close()
+
+
+async def type_calculations(session: Session, rng, think: float, deadline: float, samples: list) -> int:
+    """Type until ``deadline``; appends (action, seconds) per round trip, returns keystrokes typed."""
+    loop = asyncio.get_running_loop()
+    typed, expr, shift, previewed = 0, session.disp, False, None
+    while loop.time() < deadline:
+        for key in calculation(rng):
+            pause = rng.expovariate(1 / think)
+            if session.keypad == "client" and pause > PREVIEW_DELAY and expr != previewed:
+                await asyncio.sleep(PREVIEW_DELAY)
+                samples.append(("preview", await session.event("preview", expr)))
+                previewed, pause = expr, pause - PREVIEW_DELAY
+            await asyncio.sleep(pause)
+            action, token = KEYS[key]
+            if session.keypad == "server":
+                samples.append((action, await session.click(key)))
+            elif action not in CLIENT_ACTIONS:
+                samples.append((action, await session.event(action, expr)))
+                expr = previewed = session.disp
+            elif action == "press":
+                expr += SHIFT_MAP.get(token, token) if shift else token
+            elif action == "clear":
+                expr = ""
+            elif action == "back":
+                expr = expr[:-1]
+            elif action == "toggle_shift":
+                shift = not shift
+            typed += 1
+            if loop.time() >= deadline:
+                break
+    return typed
+
+
+# ───────────────────────── SERVER ─────────────────────────
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(root: str, app: str, keypad: str):
+    """``streamlit run`` of ``app`` in ``root``; returns (process, base url)."""
+    port = _free_port()
+    env = dict(os.environ, FXCALC_HISTORY_DB=os.path.join(tempfile.mkdtemp(), "history.sqlite3"),
+               FXCALC_KEYPAD=keypad)
+    proc = subprocess.Popen([sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true",
+                             "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+                            cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+            return proc, f"ws://127.0.0.1:{port}"
+        except OSError:
+            if proc.poll() is not None:
+                raise SystemExit(f"streamlit run {app} exited with {proc.returncode}")
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit(f"streamlit run {app} did not come up on port {port}")
+
+
+# ───────────────────────── LEVELS ─────────────────────────
+def _percentiles(values) -> tuple:
+    if len(values) < 2:
+        return (values[0],) * 3 if values else (float("nan"),) * 3
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+async def run_level(url: str, users: int, args, pid: int = None) -> dict:
+    sessions = await asyncio.gather(*(Session.open(url, args.keypad) for _ in range(users)))
+    samples = []
+    try:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        typed = await asyncio.gather(*(
+            type_calculations(session, random.Random(args.seed * 1000 + i), args.think,
+                              started + args.duration, samples)
+            for i, session in enumerate(sessions)))
+        elapsed = loop.time() - started
+        rss = _rss_kib(pid) if pid else None
+    finally:
+        await asyncio.gather(*(session.close() for session in sessions))
+    latencies = [secs for _action, secs in samples]
+    p50, p95, p99 = _percentiles(latencies)
+    equal = [secs for action, secs in samples if action == "equal"]
+    return {"sessions": users, "keystrokes": sum(typed), "round_trips": len(samples),
+            "keys_per_s": sum(typed) / elapsed, "round_trips_per_s": len(samples) / elapsed,
+            "p50_ms": p50 * 1e3, "p95_ms": p95 * 1e3, "p99_ms": p99 * 1e3,
+            "max_ms": max(latencies, default=float("nan")) * 1e3,
+            "equal_p95_ms": _percentiles(equal)[1] * 1e3,
+            "errors": sum(session.errors for session in sessions), "rss_kib": rss}
+
+
+async def sweep(url: str, args, pid: int = None) -> dict:
+    # warm-up: imports, evaluation workers and compile caches are not per user
+    warm = await Session.open(url, args.keypad)
+    await type_calculations(warm, random.Random(-1), 0.01, asyncio.get_running_loop().time() + 2, [])
+    await warm.close()
+    baseline = _rss_kib(pid) if pid else None
+    levels, saturated, users = [], False, 1
+    print(f"{'users':>5}{'keys/s':>9}{'trips/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'= p95':>9}"
+          f"{'errors':>8}{'RSS MiB':>9}{'growth':>8}")
+    while users <= args.max_sessions and not saturated:
+        level = await run_level(url, users, args, pid)
+        previous = levels[-1] if levels else None
+        saturated = level["p95_ms"] > args.slo_ms or bool(
+            previous and level["keys_per_s"] < 1.1 * previous["keys_per_s"])
+        level["saturated"] = saturated
+        levels.append(level)
+        rss = growth = ""
+        if level["rss_kib"] is not None:
+            rss = f"{level['rss_kib'] / 1024:.1f}"
+            growth = f"{(level['rss_kib'] - baseline) / 1024:+.1f}"
+        print(f"{users:>5}{level['keys_per_s']:>9.1f}{level['round_trips_per_s']:>9.1f}{level['p50_ms']:>9.1f}"
+              f"{level['p95_ms']:>9.1f}{level['p99_ms']:>9.1f}{level['equal_p95_ms']:>9.1f}{level['errors']:>8}"
+              f"{rss:>9}{growth:>8}{'  <-- saturated' if saturated else ''}")
+        users *= 2
+    ok = [level for level in levels if not level["saturated"]]
+    return {"rss_baseline_kib": baseline, "levels": {str(level["sessions"]): level for level in levels},
+            "saturation_sessions": ok[-1]["sessions"] if saturated and ok else None,
+            "saturation_keys_per_s": ok[-1]["keys_per_s"] if saturated and ok else None}
+
+
+# ───────────────────────── REPORT ─────────────────────────
+def compare(old: dict, new: dict):
+    """Print the saturation point and per-level p95/throughput against an earlier report."""
+    before, after = old["results"], new["results"]
+    print(f"saturation: {before['saturation_sessions']} → {after['saturation_sessions']} users "
+          f"(rev {old['meta']['git_rev']} → {new['meta']['git_rev']})", file=sys.stderr)
+    for users in sorted(before["levels"].keys() & after["levels"].keys(), key=int):
+        a, b = before["levels"][users], after["levels"][users]
+        print(f"  {users:>4} users: p95 {a['p95_ms']:.1f} → {b['p95_ms']:.1f} ms, "
+              f"{a['keys_per_s']:.1f} → {b['keys_per_s']:.1f} keys/s", file=sys.stderr)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--url", help="base ws:// URL of a running server (default: start one)")
+    ap.add_argument("--pid", type=int, help="with --url: the server's pid, for RSS")
+    ap.add_argument("--rev", help="serve this git revision instead of the working tree")
+    ap.add_argument("--app", default="app.py", help="script to serve (default: app.py)")
+    ap.add_argument("--keypad", choices=("server", "client"), default="server")
+    ap.add_argument("--think", type=float, default=0.15, help="mean seconds between keys")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds of typing per level")
+    ap.add_argument("--max-sessions", type=int, default=64)
+    ap.add_argument("--slo-ms", type=float, default=250.0, help="p95 latency that counts as saturated")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--output", help="write the JSON report here")
+    ap.add_argument("--compare", metavar="JSON", help="an earlier report to compare against")
+    args = ap.parse_args(argv)
+
+    proc = None
+    if args.url:
+        url, pid = args.url.rstrip("/"), args.pid
+    else:
+        proc, url = start_server(_checkout(args.rev) if args.rev else ROOT, args.app, args.keypad)
+        pid = proc.pid
+    try:
+        results = asyncio.run(sweep(url, args, pid))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    if results["saturation_sessions"]:
+        print(f"saturation: {results['saturation_sessions']} users, "
+              f"{results['saturation_keys_per_s']:.1f} keys/s at p95 ≤ {args.slo_ms:g} ms")
+    else:
+        print(f"not saturated up to {args.max_sessions} users" if results["levels"] else "no level completed")
+    meta = _metadata()
+    if args.rev:
+        meta["git_rev"] = args.rev
+    report = {"meta": meta,
+              "config": {name: getattr(args, name) for name in ("app", "keypad", "think", "duration", "slo_ms", "seed")},
+              "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            compare(json.load(fh), report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""MATRIX/VECTOR mode on 500×500 matrices: operation times and shared storage.
+
+* each operation through ``fxcalc.evaluate`` (in-process) and through
+  ``EvalPool`` (what "=" on the Pro page does: the used arrays are pickled
+  to a worker and the result back);
+* 100 sessions that load the same matrix and compute the same ``MatAns``:
+  bytes in the shared ``ArrayStore`` vs. one copy per session.
+
+    python benchmarks/bench_matrix.py [--size 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fxcalc  # noqa: E402
+from fxcalc.matrix import STORE  # noqa: E402
+from fxcalc.sandbox import EvalPool  # noqa: E402
+from fxcalc.session import SessionState  # noqa: E402
+
+OPERATIONS = ["MatA×MatB", "MatA+MatB", "2MatA", "det(MatA)", "inv(MatA)", "MatA^-1×VctA",
+              "trn(MatA)", "eig(MatA)", "eig(MatA+trn(MatA))", "MatA^8",
+              "dot(VctA,VctB)", "cross(VctC,VctD)", "abs(VctA)"]
+SESSIONS = 100
+
+
+def best(fn, repeat=3) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--size", type=int, default=500)
+    args = ap.parse_args(argv)
+    rng = np.random.default_rng(0)
+    n = args.size
+    scale = n ** -0.5                       # keeps det() within float range
+    variables = {"MatA": rng.standard_normal((n, n)) * scale, "MatB": rng.standard_normal((n, n)) * scale,
+                 "VctA": rng.standard_normal(n), "VctB": rng.standard_normal(n),
+                 "VctC": rng.standard_normal(3), "VctD": rng.standard_normal(3)}
+
+    pool = EvalPool(timeout=30)
+    try:
+        print(f"{n}×{n}, best of 3 (ms)")
+        print(f"{'expression':<24}{'in-process':>12}{'EvalPool':>12}")
+        for expr in OPERATIONS:
+            local = best(lambda: fxcalc.evaluate(expr, "DEG", variables))
+            pooled = best(lambda: pool.evaluate(expr, "DEG", variables))
+            print(f"{expr:<24}{local * 1e3:>12.1f}{pooled * 1e3:>12.1f}")
+    finally:
+        pool.close()
+
+    matrix = variables["MatA"]
+    sessions = []
+    for _ in range(SESSIONS):
+        state = SessionState()
+        state.arrays["MatA"] = STORE.put(matrix.copy())      # e.g. the same CSV, uploaded again
+        state.arrays["MatAns"] = STORE.put(fxcalc.evaluate("MatA×MatA", "DEG", state.variables()))
+        sessions.append(state)
+    copies = SESSIONS * 2 * matrix.nbytes
+    print(f"{SESSIONS} sessions × (MatA, MatAns): store {STORE.nbytes / 2**20:.1f} MiB in {len(STORE)} arrays, "
+          f"per-session copies {copies / 2**20:.1f} MiB")
+    del sessions[:], state
+    print(f"after the sessions end: {len(STORE)} arrays, {STORE.nbytes} bytes")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
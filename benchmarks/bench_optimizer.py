@@ -0,0 +1,86 @@
+"""AST optimizer: constant folding, shared sub-expressions, locally bound functions.
+
+Times a history-style corpus (``expression = result`` lines, as the History
+panel shows them) compiled without and with ``optimize``:
+
+* ``call``: one call of the compiled function, i.e. "=" on a cached
+  expression or a recall from history;
+* ``compile``: parse + optimize + codegen, i.e. a compile-cache miss.
+
+    python benchmarks/bench_optimizer.py [-n 20000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fxcalc.compiler import compile_tree  # noqa: E402
+from fxcalc.parser import parse  # noqa: E402
+
+ANS = 1.5
+
+HISTORY = """\
+sin(30)^2+cos(30)^2+sin(30) = 1.5
+2π×6371 = 40030.17359204114
+√(2)^2 = 2.0000000000000004
+5!÷(3!×2!) = 10.0
+nCr(20,6)+nPr(10,3) = 39480
+log(1000)×2-1 = 5.0
+(1.5+2.25)×(3-0.75)^2 = 18.984375
+e^(2)-e^(-2) = 7.253720815694038
+tan(45)×Ans = 1.4999999999999998
+Ans^2+2×Ans+1 = 6.25
+sin(Ans)^2+cos(Ans)^2 = 1.0
+(Ans+1)^2-(Ans+1) = 3.75
+√(Ans^2+4^2) = 4.272001872658765
+Ans×(1+5%)^10 = 2.443342136865469
+100×(1+0.05÷12)^(12×30) = 446.77443140061
+ln(Ans)+ln(Ans)^2 = 0.5698778337232143
+sin(Ans×π÷180)+cos(Ans×π÷180)+sin(Ans×π÷180)×cos(Ans×π÷180) = 1.0523497326787095
+(Ans-3)^2+(Ans-3)^2+(Ans-3)^2 = 6.75
+nCr(52,5)÷nCr(52,5)×Ans = 1.5
+2^10+2^10×Ans = 2560.0
+sin(cos(60)×60)+tan(sin(90)×45) = 1.5
+Ans÷(1+Ans)+Ans÷(1+Ans)^2 = 0.84
+"""
+
+
+def corpus():
+    return [line.rsplit(" = ", 1)[0] for line in HISTORY.splitlines()]
+
+
+def bench(exprs, optimize: bool, number: int):
+    calls, compiles = {}, {}
+    for expr in exprs:
+        compiled = compile_tree(parse(expr), "DEG", optimize=optimize)
+        args = [ANS] * len(compiled.variables)
+        fn = compiled.fn
+        calls[expr] = min(timeit.repeat(lambda: fn(*args), number=number, repeat=5)) / number
+        compiles[expr] = min(timeit.repeat(lambda: compile_tree(parse(expr), "DEG", optimize=optimize),
+                                           number=max(1, number // 100), repeat=3)) / max(1, number // 100)
+    return calls, compiles
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", "--number", type=int, default=20000, help="calls per timing run")
+    args = ap.parse_args(argv)
+    exprs = corpus()
+    (plain_calls, plain_compiles), (opt_calls, opt_compiles) = (bench(exprs, flag, args.number)
+                                                                for flag in (False, True))
+    print(f"{'expression':<44}{'call µs':>9}{'optimized':>11}{'speed-up':>10}")
+    for expr in exprs:
+        print(f"{expr[:43]:<44}{plain_calls[expr] * 1e6:>9.3f}{opt_calls[expr] * 1e6:>11.3f}"
+              f"{plain_calls[expr] / opt_calls[expr]:>9.1f}x")
+    total_plain, total_opt = sum(plain_calls.values()), sum(opt_calls.values())
+    print(f"{'corpus, per call':<44}{total_plain / len(exprs) * 1e6:>9.3f}{total_opt / len(exprs) * 1e6:>11.3f}"
+          f"{total_plain / total_opt:>9.1f}x")
+    compile_plain, compile_opt = sum(plain_compiles.values()), sum(opt_compiles.values())
+    print(f"compile (cache miss), mean µs: {compile_plain / len(exprs) * 1e6:.1f} → "
+          f"{compile_opt / len(exprs) * 1e6:.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Micro-benchmark: legacy ``_sanitize`` + ``eval`` vs. the fxcalc parser/compiler.
+
+Run from the repository root:  python benchmarks/bench_parser.py [-n 20000]
+"""
+import argparse
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fxcalc  # noqa: E402
+
+# Expressions both pipelines accept (the legacy one mangles "ln(", "exp(", "asin(", "√(" and "−").
+CORPUS = [
+    "1+2",
+    "2^10×3÷7",
+    "sin(30)+cos(60)",
+    "(2.5+π)^2",
+    "tan(45)×Ans",
+    "math.factorial(12)÷(3+4)",
+    "log(1000)×2-1",
+    "((1.5+2.25)×(3-0.75))^2÷7",
+    "nCr(20,6)+nPr(10,3)",
+    "sin(30)^2+cos(30)^2+sin(30)",
+    "sin(cos(60)×60)+tan(sin(90)×45)",
+    "2^3^2+Ans^2-math.factorial(5)",
+]
+
+ANS = 1.5
+
+
+# ───────────────────────── LEGACY PATH (copied from the old app) ─────────────────────────
+def tsin(x): return math.sin(math.radians(x))
+def tcos(x): return math.cos(math.radians(x))
+def ttan(x): return math.tan(math.radians(x))
+def nPr(n, r): return math.factorial(int(n)) // math.factorial(int(n) - int(r))
+def nCr(n, r): return math.comb(int(n), int(r))
+
+
+ALLOWED = {"math": math, "tsin": tsin, "tcos": tcos, "ttan": ttan, "nPr": nPr, "nCr": nCr}
+
+
+def _sanitize(expr: str) -> str:
+    return (expr.replace("×", "*")
+                .replace("÷", "/")
+                .replace("^", "**")
+                .replace("%", "/100")
+                .replace("√", "math.sqrt(")
+                .replace("π", "math.pi")
+                .replace("e", "math.e")
+                .replace("sin", "tsin")
+                .replace("cos", "tcos")
+                .replace("tan", "ttan")
+                .replace("ln", "math.log")
+                .replace("log", "math.log10")
+                .replace("Ans", str(ANS)))
+
+
+def legacy(expr):
+    return eval(_sanitize(expr), ALLOWED)
+
+
+# ───────────────────────── RUN ─────────────────────────
+def new_cold(expr):
+    fxcalc.cache_clear()
+    return fxcalc.evaluate(expr, "DEG", {"Ans": ANS})
+
+
+def new_warm(expr):
+    return fxcalc.evaluate(expr, "DEG", {"Ans": ANS})
+
+
+def bench(fn, number):
+    per_expr = {}
+    for expr in CORPUS:
+        fn(expr)  # warm-up (and fills the cache for the warm variant)
+        per_expr[expr] = min(timeit.repeat(lambda: fn(expr), number=number, repeat=3)) / number
+    return per_expr
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", "--number", type=int, default=20000, help="evaluations per timing run")
+    args = ap.parse_args(argv)
+
+    results = {name: bench(fn, args.number)
+               for name, fn in (("legacy", legacy), ("parse+compile", new_cold), ("cached", new_warm))}
+
+    print(f"{'expression':<32}" + "".join(f"{name:>16}" for name in results))
+    for expr in CORPUS:
+        print(f"{expr:<32}" + "".join(f"{results[name][expr] * 1e6:>14.2f}µs" for name in results))
+    totals = {name: sum(r.values()) / len(r) for name, r in results.items()}
+    print(f"{'mean':<32}" + "".join(f"{t * 1e6:>14.2f}µs" for t in totals.values()))
+    print(f"cached speed-up vs legacy: {totals['legacy'] / totals['cached']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Precision modes (fxcalc.precise) vs. the float path, per compiled call.
+
+Every expression reads Ans, so nothing is folded away at compile time.  For
+each one it reports µs per compiled call with floats, with ``--digits``
+Decimal digits (50 by default) and with Fractions, plus the Decimal/float
+ratio.  Below that is the mean over the corpus as a caller sees it:
+``evaluate()`` (text to value, compile cache hit) and ``=`` (an
+:class:`~fxcalc.sandbox.EvalPool` round trip, as the Pro page and the API
+evaluate).  Then come the costs paid once per expression or per precision:
+
+* ``compile``: a compile-cache miss, in each mode;
+* ``π``, ``e``, ``ln 10``: the first computation at a precision, and a
+  cached lookup;
+* ``tables``: building a mode's functions and constants (``precise.system``).
+
+    python benchmarks/bench_precise.py [--digits 50] [-n 2000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fxcalc import compiler, precise  # noqa: E402
+from fxcalc.precise import DECIMAL, FRACTION, GUARD_DIGITS, Precision  # noqa: E402
+from fxcalc.sandbox import EvalPool  # noqa: E402
+
+CORPUS = [
+    "Ans×3+2÷7",
+    "(Ans+π)^2÷e",
+    "1÷Ans+1÷(Ans+1)",
+    "sin(Ans)+cos(Ans×2)",
+    "tan(Ans×30)",
+    "atan(Ans)",
+    "ln(Ans)×log(Ans)",
+    "exp(Ans)-Ans^2",
+    "√(Ans)^3÷7",
+    "Ans^(1÷3)",
+]
+
+ANS = 1.5
+
+
+def per_call(text: str, mode: str, precision, number: int) -> float:
+    """µs per call of ``text``'s compiled function, Ans bound as it would be."""
+    compiled = compiler.compile_expression(text, mode, precision)
+    args = [ANS] * len(compiled.variables)
+    return min(timeit.repeat(lambda: compiled.fn(*args), number=number, repeat=3)) / number * 1e6
+
+
+def per_evaluate(evaluate, mode: str, precision, number: int) -> float:
+    """Mean µs of ``evaluate(text, mode, variables, precision)`` over the corpus."""
+    variables = {"Ans": ANS, "M": 0.0}
+    total = 0.0
+    for text in CORPUS:
+        evaluate(text, mode, variables, precision)       # compiled and cached
+        total += min(timeit.repeat(lambda: evaluate(text, mode, variables, precision), number=number,
+                                   repeat=3)) / number
+    return total / len(CORPUS) * 1e6
+
+
+def compile_miss(precision, mode: str) -> float:
+    """µs per compile-cache miss, over the corpus."""
+    compiler.cache_clear()
+    t0 = time.perf_counter()
+    for text in CORPUS:
+        compiler.compile_expression(text, mode, precision)
+    return (time.perf_counter() - t0) / len(CORPUS) * 1e6
+
+
+def first_and_cached(fn, *args):
+    """µs of the first call (after clearing the constant caches) and of a cached one."""
+    for cached in (fn, precise._pi_fixed, precise._ln10_fixed, precise.pi, precise.e):
+        cached.cache_clear()
+    t0 = time.perf_counter()
+    fn(*args)
+    first = time.perf_counter() - t0
+    cached = min(timeit.repeat(lambda: fn(*args), number=1000, repeat=3)) / 1000
+    return first * 1e6, cached * 1e6
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--digits", type=int, default=precise.DEFAULT_DIGITS, help="Decimal digits")
+    ap.add_argument("--mode", default="DEG")
+    ap.add_argument("-n", "--number", type=int, default=2000, help="calls per timing")
+    args = ap.parse_args(argv)
+    decimal_mode = Precision(DECIMAL, args.digits).check()
+    fraction_mode = Precision(FRACTION, args.digits)
+    # every result must agree with the float path to float precision
+    for text in CORPUS:
+        exact = compiler.evaluate(text, args.mode, {"Ans": ANS}, decimal_mode)
+        binary = compiler.evaluate(text, args.mode, {"Ans": ANS})
+        assert abs(exact - Decimal(binary)) <= abs(exact) * Decimal("1e-12"), (text, exact, binary)
+
+    modes = [("float", None), (str(decimal_mode), decimal_mode), (str(fraction_mode), fraction_mode)]
+    print(f"{'µs per call':<22}" + "".join(f"{name:>10}" for name, _ in modes) + f"{'Dec/float':>11}")
+    ratios = []
+    for text in CORPUS:
+        times = [per_call(text, args.mode, precision, args.number) for _, precision in modes]
+        ratios.append(times[1] / times[0])
+        print(f"{text:<22}" + "".join(f"{t:>10.1f}" for t in times) + f"{ratios[-1]:>10.1f}×")
+    print(f"{'geometric mean':<52}{statistics.geometric_mean(ratios):>10.1f}×")
+
+    pool = EvalPool(1)
+    try:
+        for label, evaluate, number in (("evaluate()", compiler.evaluate, args.number),
+                                        ("= (EvalPool)", pool.evaluate, max(1, args.number // 20))):
+            times = [per_evaluate(evaluate, args.mode, precision, number) for _, precision in modes]
+            print(f"{f'mean, {label}':<22}" + "".join(f"{t:>10.1f}" for t in times)
+                  + f"{times[1] / times[0]:>10.1f}×")
+    finally:
+        pool.close()
+
+    print(f"\n{'once':<22}" + "".join(f"{name:>10}" for name, _ in modes))
+    print(f"{'compile miss µs':<22}" + "".join(f"{compile_miss(p, args.mode):>10.0f}" for _, p in modes))
+    work = args.digits + GUARD_DIGITS
+    print(f"\n{'constants µs':<22}{'first':>10}{'cached':>10}")
+    constants = (("π", precise.pi, work), ("e", precise.e, args.digits),
+                 ("ln 10", precise._ln10_fixed, precise._bits(work)),
+                 ("tables", precise.system, (args.mode, decimal_mode)))
+    for name, fn, arg in constants:
+        first, cached = first_and_cached(fn, *(arg if isinstance(arg, tuple) else (arg,)))
+        print(f"{f'{name} ({args.digits} digits)':<22}{first:>10.1f}{cached:>10.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
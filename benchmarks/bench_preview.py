@@ -0,0 +1,84 @@
+"""Live preview cost: a full evaluation per keystroke vs. fxcalc.Preview.
+
+Types every bench_parser expression one character at a time and asks for the
+provisional result after each key:
+
+* ``pool``: ``EvalPool.evaluate`` of the prefix, what "=" costs (IPC included);
+* ``evaluate``: in-process ``fxcalc.evaluate``, cold compile cache per prefix;
+* ``preview``: one ``Preview`` per expression, incremental tokens + memo.
+
+The browser keypad debounces, so a real session asks far less often than
+once per key; this is the worst case.
+
+    python benchmarks/bench_preview.py
+"""
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), HERE]
+
+import fxcalc  # noqa: E402
+from bench_parser import ANS, CORPUS  # noqa: E402
+from fxcalc.preview import Preview  # noqa: E402
+from fxcalc.sandbox import EvalPool  # noqa: E402
+
+VARIABLES = {"Ans": ANS}
+
+
+def prefixes():
+    for expr in CORPUS:
+        yield [expr[:end] for end in range(1, len(expr) + 1)]
+
+
+def full(evaluate):
+    def run(typed):
+        for text in typed:
+            fxcalc.cache_clear()
+            try:
+                evaluate(text, "DEG", VARIABLES)
+            except fxcalc.CalcError:
+                pass
+    return run
+
+
+def incremental(stats):
+    def run(typed):
+        preview = Preview()
+        for text in typed:
+            preview(text, "DEG", VARIABLES)
+        stats[0] += preview.hits
+        stats[1] += preview.misses
+    return run
+
+
+def timed(run) -> float:
+    t0 = time.perf_counter()
+    for typed in prefixes():
+        run(typed)
+    return time.perf_counter() - t0
+
+
+def main():
+    keys = sum(len(expr) for expr in CORPUS)
+    stats = [0, 0]
+    pool = EvalPool()
+    try:
+        pool.evaluate("1+1")                 # start the workers outside the timing
+        results = {"pool": timed(full(pool.evaluate)),
+                   "evaluate": timed(full(fxcalc.evaluate)),
+                   "preview": timed(incremental(stats))}
+    finally:
+        pool.close()
+    print(f"{len(CORPUS)} expressions, {keys} keystrokes, a preview after every key")
+    print(f"{'per key':<10}{'total ms':>10}{'µs/key':>10}")
+    for name, secs in results.items():
+        print(f"{name:<10}{secs * 1e3:>10.1f}{secs * 1e6 / keys:>10.1f}")
+    print(f"memo hits/misses: {stats[0]}/{stats[1]}")
+    print(f"preview speed-up vs evaluate: {results['evaluate'] / results['preview']:.1f}x, "
+          f"vs pool: {results['pool'] / results['preview']:.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
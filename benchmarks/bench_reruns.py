@@ -0,0 +1,104 @@
+"""Count what each keypress executes in scientificcalculator.py.
+
+Drives the app headlessly through Streamlit's AppTest harness and reports,
+per keystroke, how many full script runs, keypad renders and display renders
+happened, plus wall time.  Compare against an older revision with --rev:
+
+    python benchmarks/bench_reruns.py              # working tree
+    python benchmarks/bench_reruns.py --rev HEAD~1 # a previous commit
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import streamlit as st
+from streamlit.proto.WidgetStates_pb2 import WidgetStates
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = "scientificcalculator.py"
+# st.button keys: every press is a script run (the browser keypad has no buttons to click)
+os.environ.setdefault("FXCALC_KEYPAD", "server")
+
+# sin(30)+2×3=  then SHIFT, sin → asin(, 0.5, =, C
+KEYS = ["k_sin", "k_sub", "k_0", "k_rp", "k_op_add", "k_2", "k_op_mul", "k_sub", "k_eq",
+        "k_shift", "k_sin", "k_0", "k_dot", "k_5", "k_eq", "k_shift", "k_clear"]
+
+COUNTS = {"script": 0, "keypad": 0, "display": 0}
+
+
+def _install_counters():
+    page_config, button, markdown = st.set_page_config, st.button, st.markdown
+
+    def counting_page_config(*args, **kwargs):
+        COUNTS["script"] += 1
+        return page_config(*args, **kwargs)
+
+    def counting_button(*args, **kwargs):
+        if kwargs.get("key") == "k_eq":          # one per keypad render
+            COUNTS["keypad"] += 1
+        return button(*args, **kwargs)
+
+    def counting_markdown(body, *args, **kwargs):
+        if "class='display'" in str(body):
+            COUNTS["display"] += 1
+        return markdown(body, *args, **kwargs)
+
+    st.set_page_config, st.button, st.markdown = counting_page_config, counting_button, counting_markdown
+
+
+def _script_for(rev):
+    if rev is None:
+        return os.path.join(ROOT, APP), None
+    # next to the real app so its sibling imports (fxcalc) still resolve
+    path = os.path.join(ROOT, f"_bench_{rev.replace('/', '_').replace('~', '_')}.py")
+    with open(path, "wb") as fh:
+        fh.write(subprocess.check_output(["git", "-C", ROOT, "show", f"{rev}:{APP}"]))
+    return path, path
+
+
+def run(rev=None):
+    path, cleanup = _script_for(rev)
+    try:
+        at = AppTest.from_file(path, default_timeout=30).run()
+        # A fragment-only rerun leaves AppTest's tree holding just that fragment,
+        # so keep the last rendered button of each key and click it directly.
+        buttons = {b.key: b for b in at.button}
+        rows = []
+        for key in KEYS:
+            for name in COUNTS:
+                COUNTS[name] = 0
+            states = WidgetStates()
+            buttons[key].click()
+            states.widgets.append(buttons[key]._widget_state)
+            buttons[key]._value = False
+            t0 = time.perf_counter()
+            at._run(states)
+            rows.append((key, dict(COUNTS), time.perf_counter() - t0))
+            buttons.update((b.key, b) for b in at.button)
+        return rows
+    finally:
+        if cleanup:
+            os.remove(cleanup)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Script executions per keystroke")
+    ap.add_argument("--rev", help="git revision of the app to measure (default: working tree)")
+    args = ap.parse_args(argv)
+
+    _install_counters()
+    rows = run(args.rev)
+    print(f"{'key':<10}{'script runs':>12}{'keypad':>8}{'display':>9}{'ms':>9}")
+    for key, counts, secs in rows:
+        print(f"{key:<10}{counts['script']:>12}{counts['keypad']:>8}{counts['display']:>9}{secs * 1e3:>9.2f}")
+    n = len(rows)
+    mean = {name: sum(r[1][name] for r in rows) / n for name in COUNTS}
+    print(f"{'mean':<10}{mean['script']:>12.2f}{mean['keypad']:>8.2f}{mean['display']:>9.2f}"
+          f"{sum(r[2] for r in rows) / n * 1e3:>9.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Throughput and tail latency: inline evaluation vs. the sandboxed EvalPool.
+
+Several client threads (standing in for Streamlit sessions) evaluate a corpus
+of ordinary expressions.  In the "pathological" runs every Nth request is an
+expression that passes the static cost check but runs for a long time.  Only
+the ordinary requests' latencies are reported, since those are what other
+users feel.  Clients send on a fixed schedule and latency is measured from
+the scheduled send time, so time spent stuck behind a request that holds the
+GIL is counted.
+
+    python benchmarks/bench_sandbox.py [--clients 8] [--requests 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fxcalc import CalcError, evaluate  # noqa: E402
+from fxcalc.sandbox import EvalPool  # noqa: E402
+
+CORPUS = [
+    "1+2", "2^10×3÷7", "sin(30)+cos(60)", "(2.5+π)^2", "tan(45)×Ans",
+    "math.factorial(12)÷(3+4)", "log(1000)×2-1", "nCr(20,6)+nPr(10,3)",
+]
+PATHOLOGICAL = "nCr(10^7,40000)"      # ~0.3 s of bignum work, under the static limits
+
+
+def _client(evaluate_fn, requests, every, interval, latencies, lock):
+    mine = []
+    start = time.perf_counter()
+    for i in range(requests):
+        slow = every and i % every == every - 1
+        expr = PATHOLOGICAL if slow else CORPUS[i % len(CORPUS)]
+        t0 = start + i * interval
+        delay = t0 - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            evaluate_fn(expr, "DEG", {"Ans": 2})
+        except CalcError:
+            pass
+        if not slow:
+            mine.append(time.perf_counter() - t0)
+    with lock:
+        latencies.extend(mine)
+
+
+def measure(evaluate_fn, clients, requests, every, interval):
+    latencies, lock = [], threading.Lock()
+    threads = [threading.Thread(target=_client, args=(evaluate_fn, requests, every, interval, latencies, lock))
+               for _ in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "throughput": clients * requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1e3,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1e3,
+        "max_ms": latencies[-1] * 1e3,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="inline vs. pooled evaluation under load")
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=200, help="per client")
+    ap.add_argument("--every", type=int, default=100, help="one pathological request per this many")
+    ap.add_argument("--interval-ms", type=float, default=5.0, help="per-client send interval")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--timeout", type=float, default=0.1, help="pool wall-clock limit (s)")
+    args = ap.parse_args(argv)
+
+    pool = EvalPool(workers=args.workers, timeout=args.timeout)
+    try:
+        print(f"{'path':<8}{'mix':<14}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, fn in (("inline", evaluate), ("pool", pool.evaluate)):
+            for mix, every in (("clean", 0), ("pathological", args.every)):
+                r = measure(fn, args.clients, args.requests, every, args.interval_ms / 1e3)
+                print(f"{name:<8}{mix:<14}{r['throughput']:>10.0f}{r['p50_ms']:>10.2f}"
+                      f"{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}")
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
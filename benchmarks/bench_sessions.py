@@ -0,0 +1,96 @@
+"""Per-session memory of the Pro app's state: loose keys vs. SessionState.
+
+Builds N simulated sessions, each with a full page of recent results, and
+reports the traced bytes per session for both layouts:
+
+* ``loose``: the old six ``st.session_state`` keys, i.e. display, mode, Ans,
+  M, SHIFT and a list of ``"expr = result"`` strings;
+* ``slots``: one :class:`fxcalc.session.SessionState` with its ring buffer
+  of ``(expression, number)`` pairs.
+
+Also reported: what one keypad render used to allocate (the SHIFT_MAP dict
+and a partial per key), which now comes from ``fxcalc.keypad`` for free.
+
+    python benchmarks/bench_sessions.py            # 5,000 sessions
+    python benchmarks/bench_sessions.py -n 20000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fxcalc.keypad import LAYOUT, SHIFT_MAP, rows  # noqa: E402
+from fxcalc.session import RECENT_SIZE, SessionState  # noqa: E402
+
+# what a session typed: expression and result, as the app produces them
+CALCULATIONS = [(f"sin({i})+{i}^2", i * i + 0.01745240643728351 * i) for i in range(RECENT_SIZE)]
+
+
+def _press(token):
+    pass
+
+
+def loose_session(i: int) -> dict:
+    state = {"disp": "", "mode": "DEG", "ans": 0.0, "mem": 0.0, "shift": False, "hist": []}
+    for expr, result in CALCULATIONS:
+        state["ans"] = result
+        state["disp"] = str(result)
+        state["hist"].insert(0, f"{expr} = {result}")
+        state["hist"] = state["hist"][:RECENT_SIZE]
+    return state
+
+
+def legacy_keypad(i: int) -> tuple:
+    return dict(SHIFT_MAP), [(label, partial(_press, token), key)
+                             for row in LAYOUT for label, _action, token, key in row]
+
+
+def shared_keypad(i: int) -> tuple:
+    return rows(i % 2 == 1)
+
+
+def slots_session(i: int) -> SessionState:
+    state = SessionState(f"{i:012x}")
+    for expr, result in CALCULATIONS:
+        state.ans = result
+        state.disp = str(result)
+        state.record(expr, result)
+    return state
+
+
+def measure(factory, n: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        sessions = [factory(i) for i in range(n)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del sessions
+    return after - before
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="memory per simulated calculator session")
+    ap.add_argument("-n", "--sessions", type=int, default=5000)
+    args = ap.parse_args(argv)
+
+    rows(False), rows(True)          # process-wide, not per session
+    results = {name: measure(factory, args.sessions)
+               for name, factory in (("loose", loose_session), ("slots", slots_session))}
+    print(f"{'state':<8}{'total KiB':>12}{'bytes/session':>15}")
+    for name, total in results.items():
+        print(f"{name:<8}{total / 1024:>12,.0f}{total / args.sessions:>15,.0f}")
+    print(f"slots/loose: {results['slots'] / results['loose']:.2f}x")
+    render = {name: measure(factory, args.sessions) / args.sessions
+              for name, factory in (("legacy", legacy_keypad), ("shared", shared_keypad))}
+    print(f"keypad render: {render['legacy']:,.0f} bytes before, {render['shared']:,.0f} bytes now")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
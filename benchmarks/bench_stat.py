@@ -0,0 +1,87 @@
+"""STAT mode on a large CSV: streamed accumulators vs. loading the whole file.
+
+Writes an x,y CSV of N rows to a temporary file, then reports the time and
+the peak traced memory (tracemalloc) for:
+
+* ``load all``: ``pandas.read_csv`` of the whole file, then NumPy mean, std,
+  quantiles and ``polyfit`` for both regressions;
+* ``streamed``: ``fxcalc.stat.summarize``, CHUNK_ROWS rows at a time;
+* ``cached``: the same file again, i.e. its digest and a cache lookup.
+
+    python benchmarks/bench_stat.py [-n 2000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fxcalc import stat  # noqa: E402
+
+
+def write_csv(path: str, rows: int):
+    rng = np.random.default_rng(0)
+    with open(path, "w") as out:
+        out.write("x,y\n")
+        for start in range(0, rows, 1_000_000):
+            x = rng.normal(50, 10, min(1_000_000, rows - start))
+            y = 3 + 2 * x - 0.01 * x * x + rng.normal(0, 1, len(x))
+            np.savetxt(out, np.column_stack((x, y)), delimiter=",", fmt="%.8g")
+
+
+def load_all(path: str):
+    import pandas as pd
+    data = pd.read_csv(path).to_numpy()
+    x, y = data[:, 0], data[:, 1]
+    return (x.mean(), x.std(), x.std(ddof=1), np.quantile(x, [0.25, 0.5, 0.75]),
+            y.mean(), y.std(), np.polyfit(x, y, 1), np.polyfit(x, y, 2))
+
+
+def streamed(path: str):
+    with open(path, "rb") as source:
+        for stats in stat.summarize(source, "x", "y", key=stat.digest(source)):
+            pass
+    return stats
+
+
+def measure(fn, path: str):
+    tracemalloc.start()
+    try:
+        t0 = time.perf_counter()
+        fn(path)
+        secs = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return secs, peak
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", "--rows", type=int, default=2_000_000)
+    args = ap.parse_args(argv)
+    import pandas  # noqa: F401  (imported outside the timings)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.csv")
+        write_csv(path, args.rows)
+        size = os.path.getsize(path)
+        results = {"load all": measure(load_all, path), "streamed": measure(streamed, path),
+                   "cached": measure(streamed, path)}
+        final = streamed(path)
+    print(f"{args.rows:,} rows, {size / 2**20:.0f} MiB of CSV, chunks of {stat.CHUNK_ROWS:,}")
+    print(f"{'':<10}{'seconds':>9}{'peak MiB':>10}")
+    for name, (secs, peak) in results.items():
+        print(f"{name:<10}{secs:>9.2f}{peak / 2**20:>10.1f}")
+    a, b, c = final.quadratic
+    print(f"x̄={final.xbar:.6g} σx={final.sigmax:.6g} Q1={final.Q1:.6g} med={final.med:.6g} Q3={final.Q3:.6g} "
+          f"a={a:.6g} b={b:.6g} c={c:.6g} (quartiles {'exact' if final.exact_quartiles else 'approximate'})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Benchmark suite for the evaluation and render hot paths, as JSON.
+
+Measures, in one run:
+
+* ``sanitize_eval``: legacy ``_sanitize()`` + ``eval`` against the fxcalc
+  engine, per expression of the ``bench_parser`` corpus;
+* ``sc_evaluate``: the ``evaluate()`` callback of ``Scientific Calculator.py``,
+  lifted out of the script as it is in the tree;
+* ``keypress``: script time per simulated keypress for each of the three
+  apps, driven headlessly through Streamlit's AppTest harness;
+* ``memory``: peak traced allocation for one session of each app.
+
+    python benchmarks/bench_suite.py -o bench.json
+    python benchmarks/bench_suite.py --compare old.json     # ratios vs. a previous run
+
+Timings are medians in seconds; memory is in bytes.
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+# keep benchmark calculations out of the real history database
+os.environ.setdefault("FXCALC_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "history.sqlite3"))
+
+import streamlit  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import bench_parser  # noqa: E402
+import bench_reruns  # noqa: E402
+import fxcalc  # noqa: E402
+from fxcalc.formatting import result_text  # noqa: E402
+from fxcalc.history import HistoryStore  # noqa: E402
+from fxcalc.sandbox import EvalPool  # noqa: E402
+
+SC_APP = "Scientific Calculator.py"
+SIMPLE_APP = "calculator.py"
+PRO_APP = bench_reruns.APP
+
+# sin(30)+2*3= then clear, on the button labels of "Scientific Calculator.py"
+SC_KEYS = ["sin(", "3", "0", ")", "+", "2", "*", "3", "=", "C"]
+# DISPLAY-style inputs of the evaluate() callback
+SC_CORPUS = ["1+2", "sin(30)+cos(60)", "(2.5+π)^2", "fact(12)/(3+4)", "log(1000)*2-1",
+             "sin(cos(60)*60)+tan(sin(90)*45)", "2^3^2-√(16)"]
+
+
+def _median_time(fn, number: int) -> float:
+    return statistics.median(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def _summary(samples) -> dict:
+    samples = sorted(samples)
+    return {"median": statistics.median(samples), "mean": statistics.fmean(samples),
+            "max": samples[-1], "n": len(samples)}
+
+
+# ───────────────────────── EVALUATION ─────────────────────────
+def bench_sanitize_eval(number: int) -> dict:
+    out = {}
+    for name, fn in (("legacy", bench_parser.legacy), ("fxcalc", bench_parser.new_warm)):
+        per_expr = {}
+        for expr in bench_parser.CORPUS:
+            fn(expr)
+            per_expr[expr] = _median_time(lambda: fn(expr), number)
+        out[name] = {"per_expr": per_expr, "mean": statistics.fmean(per_expr.values())}
+    return out
+
+
+def _load_sc_evaluate():
+    """``evaluate`` from "Scientific Calculator.py", without running the Streamlit script."""
+    with open(os.path.join(ROOT, SC_APP), encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+    wanted = [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == "evaluate"]
+    state = types.SimpleNamespace(display="", history_id="bench", history_page=[])
+    store, pool = HistoryStore(":memory:"), EvalPool()
+    namespace = {"st": types.SimpleNamespace(session_state=state), "result_text": result_text,
+                 "history_store": lambda: store, "eval_pool": lambda: pool}
+    exec(compile(ast.Module(wanted, []), SC_APP, "exec"), namespace)
+    return namespace["evaluate"], state
+
+
+def bench_sc_evaluate(number: int) -> dict:
+    evaluate, state = _load_sc_evaluate()
+    per_expr = {}
+    for expr in SC_CORPUS:
+        def call():
+            state.display = expr
+            evaluate()
+        call()
+        per_expr[expr] = _median_time(call, number)
+    return {"per_expr": per_expr, "mean": statistics.fmean(per_expr.values())}
+
+
+# ───────────────────────── KEYPRESS (AppTest) ─────────────────────────
+def _sc_session():
+    at = AppTest.from_file(os.path.join(ROOT, SC_APP), default_timeout=60).run()
+    times = []
+    for label in SC_KEYS:
+        button = next(b for b in at.button if b.label == label)
+        t0 = time.perf_counter()
+        button.click().run()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def _simple_session():
+    at = AppTest.from_file(os.path.join(ROOT, SIMPLE_APP), default_timeout=60).run()
+    times = []
+    for a, b, op in ((3.0, 4.0, "Addition"), (10.0, 4.0, "Division"), (2.5, 2.0, "Multiplication")):
+        t0 = time.perf_counter()
+        at.number_input[0].set_value(a).run()
+        at.number_input[1].set_value(b).run()
+        at.selectbox[0].select(op).run()
+        at.button[0].click().run()
+        times.append((time.perf_counter() - t0) / 4)     # four interactions
+    return times
+
+
+def _pro_session():
+    return [secs for _key, _counts, secs in bench_reruns.run()]
+
+
+SESSIONS = {PRO_APP: _pro_session, SC_APP: _sc_session, SIMPLE_APP: _simple_session}
+
+
+def bench_keypress(sessions: int) -> dict:
+    out = {}
+    for app, session in SESSIONS.items():
+        samples = []
+        for _ in range(sessions):
+            samples.extend(session())
+        out[app] = _summary(samples)
+    return out
+
+
+def bench_memory() -> dict:
+    out = {}
+    for app, session in SESSIONS.items():
+        session()                    # imports, caches and worker pools are not per-session
+        tracemalloc.start()
+        try:
+            session()
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        out[app] = {"peak_bytes": peak}
+    return out
+
+
+# ───────────────────────── REPORT ─────────────────────────
+def _metadata() -> dict:
+    try:
+        rev = subprocess.check_output(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"],
+                                      text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        rev = None
+    return {"git_rev": rev, "python": platform.python_version(), "streamlit": streamlit.__version__,
+            "platform": platform.platform(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+    return out
+
+
+def compare(old: dict, new: dict):
+    """Print new/old ratios for every metric both runs have."""
+    before, after = _flatten("", old["results"], {}), _flatten("", new["results"], {})
+    for key in sorted(before.keys() & after.keys()):
+        if before[key] and not key.endswith(".n"):
+            ratio = after[key] / before[key]
+            flag = "  <-- slower" if ratio > 1.10 else ""
+            print(f"{key:<70}{ratio:>8.2f}x{flag}", file=sys.stderr)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="evaluation and render benchmarks, as JSON")
+    ap.add_argument("-o", "--output", help="write JSON here (default: stdout)")
+    ap.add_argument("-n", "--number", type=int, default=2000, help="calls per timing run")
+    ap.add_argument("--sessions", type=int, default=3, help="simulated sessions per app")
+    ap.add_argument("--compare", metavar="JSON", help="a previous report to compare against")
+    args = ap.parse_args(argv)
+
+    bench_reruns._install_counters()
+    fxcalc.cache_clear()
+    report = {
+        "meta": _metadata(),
+        "results": {
+            "sanitize_eval": bench_sanitize_eval(args.number),
+            "sc_evaluate": bench_sc_evaluate(args.number),
+            "keypress": bench_keypress(args.sessions),
+            "memory": bench_memory(),
+        },
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            compare(json.load(fh), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""Streamlit-free calculator engine shared by the calculator apps."""
+from .compiler import Compiled, cache_clear, cache_info, compile_expression, compile_tree, evaluate
+from .parser import CalcError, parse, tokenize
+
+__all__ = [
+    "CalcError", "Compiled", "cache_clear", "cache_info", "compile_expression",
+    "compile_tree", "evaluate", "parse", "tokenize",
+]
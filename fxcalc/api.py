@@ -0,0 +1,281 @@
+"""Local JSON evaluation API, with the keypad's semantics for other tools.
+
+    python -m fxcalc.api [--host 127.0.0.1] [--port 8765] [--workers N]
+
+=====================  ====================================================
+``POST /evaluate``     ``{"expr": "sin(30)+5%", "mode": "DEG", "ans": 0,
+                       "mem": 0, "precision": null}`` → ``{"value": 0.55,
+                       "text": "0.55"}``, or ``{"error": "Math ERROR"}``
+``POST /batch``        ``{"exprs": [...], "mode": ..., "ans": ..., "mem":
+                       ...}`` → NDJSON, one ``{"i": 0, "value": ..., "text":
+                       ...}`` line per expression, in order
+``GET /health``        ``{"status": "ok", "workers": N}``
+=====================  ====================================================
+
+Expressions mean what they mean on the Pro page: the engine's trig follows
+``mode`` (the legacy app's ``tsin``/``tcos``/``ttan``), ``nPr``/``nCr``,
+``%`` is /100, and ``Ans`` and ``M`` are the request's ``ans`` and ``mem``.
+The expressions of a batch are independent; each sees the same Ans and M
+(``python -m fxcalc`` is the tool for chains where Ans carries over).
+``text`` is the display's Norm text, and is the only value of an int too
+long for Norm (``value`` is then null).  ``precision`` is a number of
+Decimal digits or ``"fraction"`` (see :mod:`fxcalc.precise`); ``value`` is
+then the nearest float and ``text`` has every digit.
+
+Every evaluation runs in an :class:`~fxcalc.sandbox.EvalPool`, with its time
+and memory limits.  A batch is cut into chunks of :data:`CHUNK`
+expressions, each a single round trip to a worker.  Up to two chunks per
+worker are in flight, and lines are written as soon as the chunks before
+them are done.  Connections are HTTP/1.1 keep-alive (uvicorn; idle ones
+are closed after ``--keep-alive`` s).  Limits per request:
+:data:`MAX_BODY_BYTES`, :data:`MAX_BATCH` expressions of up to
+:data:`MAX_EXPR_CHARS` characters, and :data:`BATCH_SECONDS`, after which a
+batch's remaining expressions fail.  Past ``--max-connections`` the server
+answers 503.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from .compiler import MODES
+from .formatting import is_huge, result_text
+from .parser import CalcError
+from .precise import DECIMAL, FRACTION, Precision
+from .sandbox import DEFAULT_TIMEOUT, EvalPool
+
+MAX_BODY_BYTES = 4 * 1024 * 1024
+MAX_BATCH = 10_000
+MAX_EXPR_CHARS = 1000
+BATCH_SECONDS = 60.0
+CHUNK = 64
+DEFAULT_PORT = 8765
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int, message: str):
+        self.status, self.message = status, message
+
+
+# ───────────────────────── REQUESTS ─────────────────────────
+async def _read_json(request: Request) -> dict:
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_BODY_BYTES:
+        raise _BadRequest(413, f"Body over {MAX_BODY_BYTES} bytes")
+    body = bytearray()
+    async for part in request.stream():
+        body += part
+        if len(body) > MAX_BODY_BYTES:
+            raise _BadRequest(413, f"Body over {MAX_BODY_BYTES} bytes")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise _BadRequest(400, "Body is not JSON") from None
+    if not isinstance(payload, dict):
+        raise _BadRequest(400, "Body must be a JSON object")
+    return payload
+
+
+def _number(payload: dict, name: str):
+    value = payload.get(name, 0)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise _BadRequest(400, f"{name!r} must be a number")
+    return value
+
+
+def _precision(payload: dict):
+    value = payload.get("precision")
+    if value is None:
+        return None
+    if value == "fraction":
+        return Precision(FRACTION)
+    try:
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError("'precision' must be a number of digits or \"fraction\"")
+        return Precision(DECIMAL, value).check()
+    except ValueError as exc:
+        raise _BadRequest(400, str(exc)) from None
+
+
+def _context(payload: dict):
+    """``(mode, variables, precision)`` of a request."""
+    mode = payload.get("mode", "DEG")
+    if mode not in MODES:
+        raise _BadRequest(400, f"'mode' must be one of {', '.join(MODES)}")
+    return mode, {"Ans": _number(payload, "ans"), "M": _number(payload, "mem")}, _precision(payload)
+
+
+def _problem(expr):
+    # why ``expr`` is not sent to a worker, or None
+    if not isinstance(expr, str):
+        return CalcError("Expression must be a string")
+    if len(expr) > MAX_EXPR_CHARS:
+        return CalcError(f"Expression over {MAX_EXPR_CHARS} characters")
+    return None
+
+
+def _failure(exc: Exception) -> CalcError:
+    # what an expression's line says when evaluating it raised
+    return exc if isinstance(exc, CalcError) else CalcError("Math ERROR")
+
+
+def _result(outcome) -> dict:
+    """The JSON of one value or CalcError."""
+    if isinstance(outcome, CalcError):
+        return {"error": str(outcome)}
+    if getattr(outcome, "ndim", 0):
+        return {"value": outcome.tolist() if outcome.dtype.kind in "biuf" else None, "text": result_text(outcome)}
+    if is_huge(outcome):
+        return {"value": None, "text": result_text(outcome)}
+    if isinstance(outcome, int):
+        return {"value": outcome, "text": result_text(outcome)}
+    try:
+        value = float(outcome)
+    except (TypeError, ValueError):
+        return {"value": None, "text": result_text(outcome)}
+    return {"value": value if math.isfinite(value) else None, "text": result_text(outcome)}
+
+
+# ───────────────────────── SERVICE ─────────────────────────
+class Service:
+    """The worker pool, and the threads that wait on it for the event loop."""
+
+    def __init__(self, workers: int, timeout: float = DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.pool = EvalPool(workers, timeout)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fxcalc-api")
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
+
+    def _chunk(self, exprs, mode, variables, precision) -> list:
+        outcomes = [_problem(expr) for expr in exprs]
+        sent = [i for i, problem in enumerate(outcomes) if problem is None]
+        if sent:
+            try:
+                results = self.pool.evaluate_many([exprs[i] for i in sent], mode, variables, precision)
+            except Exception as exc:     # the chunk's lines still get a record each: the stream must finish
+                results = [_failure(exc)] * len(sent)
+            for i, outcome in zip(sent, results):
+                outcomes[i] = outcome
+        return outcomes
+
+    def _one(self, expr, mode, variables, precision):
+        # a single expression: one deadline, never a batch's retry
+        problem = _problem(expr)
+        if problem is not None:
+            return problem
+        try:
+            return self.pool.evaluate(expr, mode, variables, precision)
+        except Exception as exc:
+            return _failure(exc)
+
+    async def evaluate(self, expr, mode: str, variables: dict, precision=None) -> dict:
+        loop = asyncio.get_running_loop()
+        return _result(await loop.run_in_executor(self.executor, self._one, expr, mode, variables, precision))
+
+    async def batch(self, exprs: list, mode: str, variables: dict, precision=None):
+        """Yield the NDJSON lines of ``exprs``, a chunk at a time, in order."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + BATCH_SECONDS
+        starts = iter(range(0, len(exprs), CHUNK))
+        in_flight = deque()
+
+        def submit():
+            for start in starts:
+                chunk = exprs[start:start + CHUNK]
+                if loop.time() > deadline:
+                    late = CalcError(f"Batch over {BATCH_SECONDS:g} s")
+                    future = loop.create_future()
+                    future.set_result([late] * len(chunk))
+                else:
+                    future = loop.run_in_executor(self.executor, self._chunk, chunk, mode, variables, precision)
+                in_flight.append((start, future))
+                return
+
+        try:
+            for _ in range(2 * self.workers):
+                submit()
+            while in_flight:
+                start, future = in_flight.popleft()
+                outcomes = await future
+                submit()
+                yield "".join(json.dumps({"i": start + i, **_result(outcome)}, ensure_ascii=False,
+                                         separators=(",", ":")) + "\n"
+                              for i, outcome in enumerate(outcomes))
+        finally:
+            for _, future in in_flight:      # client gone: drop chunks not yet started
+                future.cancel()
+
+
+# ───────────────────────── APP ─────────────────────────
+async def _evaluate(request: Request):
+    payload = await _read_json(request)
+    if "expr" not in payload:
+        raise _BadRequest(400, "Missing 'expr'")
+    return JSONResponse(await request.app.state.service.evaluate(payload["expr"], *_context(payload)))
+
+
+async def _batch(request: Request):
+    payload = await _read_json(request)
+    exprs = payload.get("exprs")
+    if not isinstance(exprs, list):
+        raise _BadRequest(400, "'exprs' must be a list")
+    if len(exprs) > MAX_BATCH:
+        raise _BadRequest(413, f"Over {MAX_BATCH} expressions")
+    return StreamingResponse(request.app.state.service.batch(exprs, *_context(payload)),
+                             media_type="application/x-ndjson")
+
+
+async def _health(request: Request):
+    return JSONResponse({"status": "ok", "workers": request.app.state.service.workers})
+
+
+async def _bad_request(request: Request, exc: _BadRequest):
+    return JSONResponse({"error": exc.message}, status_code=exc.status)
+
+
+def create_app(workers: int = None, timeout: float = DEFAULT_TIMEOUT) -> Starlette:
+    """The ASGI app; its worker pool starts with the server and stops with it."""
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        app.state.service = Service(workers or os.cpu_count() or 1, timeout)
+        try:
+            yield
+        finally:
+            app.state.service.close()
+
+    routes = [Route("/evaluate", _evaluate, methods=["POST"]), Route("/batch", _batch, methods=["POST"]),
+              Route("/health", _health, methods=["GET"])]
+    return Starlette(routes=routes, exception_handlers={_BadRequest: _bad_request}, lifespan=lifespan)
+
+
+def main(argv=None):
+    import uvicorn
+
+    ap = argparse.ArgumentParser(prog="python -m fxcalc.api", description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--workers", type=int, default=None, help="evaluation processes (default: one per CPU)")
+    ap.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per expression")
+    ap.add_argument("--keep-alive", type=float, default=30.0, help="seconds an idle connection stays open")
+    ap.add_argument("--max-connections", type=int, default=256, help="answer 503 past this many")
+    args = ap.parse_args(argv)
+    uvicorn.run(create_app(args.workers, args.timeout), host=args.host, port=args.port,
+                timeout_keep_alive=args.keep_alive, limit_concurrency=args.max_connections,
+                log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
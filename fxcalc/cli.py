@@ -0,0 +1,188 @@
+"""Batch evaluation from the command line.
+
+    python -m fxcalc [FILE ...] [-o OUT] [--mode RAD] [--precision 50] [--jobs N] [--echo]
+
+Reads one expression (or command: DEG, RAD, MC, M+, M-) per line from the
+files or stdin and writes one output line per input line as it goes, so
+memory use does not grow with the input.  Ans, M and the angle mode carry
+from line to line exactly as on the keypad.
+
+With ``--jobs N`` the input is cut into chunks that worker processes
+evaluate speculatively from their own first line.  A chunk that reads Ans or
+M before producing them itself stops at that line; the parent finishes the
+rest of it in order once the previous chunk's state is known, so results are
+identical to a sequential run.
+"""
+import argparse
+import fileinput
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from .compiler import MODES, compile_expression
+from .core import MEMORY_KEYS, Calculator
+from .parser import CalcError
+from .precise import DECIMAL, FRACTION, Precision
+
+CHUNK_SIZE = 20_000
+
+
+def _is_command(text: str) -> bool:
+    return not text or text in MODES or text == "MC" or text in MEMORY_KEYS
+
+
+def _precision(text: str) -> Precision:
+    # "--precision 50" (Decimal digits) or "--precision fraction"
+    try:
+        if text.lower() in ("fraction", "frac"):
+            return Precision(FRACTION)
+        return Precision(DECIMAL, int(text)).check()
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+
+
+_UNSET = object()   # the chunk's Ans until a line replaces it
+
+
+def _fits_float(calc) -> bool:
+    # M+ adds Ans to a float M only if it converts (precision modes always do)
+    if calc.precision is not None or not isinstance(calc.ans, int):
+        return True
+    try:
+        float(calc.ans)
+    except OverflowError:
+        return False
+    return True
+
+
+def _run_chunk(lines, mode, precision=None):
+    """Evaluate a chunk without knowing the Ans/M it starts with.
+
+    Returns ``(outputs, stop, state)``: ``stop`` is the index of the first
+    line that needed the incoming Ans or M (``None`` if the chunk finished),
+    and ``state`` is ``(mode, ans_known, ans, mem_known, mem)`` at that point.
+    While M is unknown ``mem`` holds the change relative to the incoming M,
+    or ``None`` if no M+/M− ran.
+    """
+    calc = Calculator(mode, ans=_UNSET, precision=precision)
+    mem_known = mem_changed = False
+    outputs = []
+    for i, line in enumerate(lines):
+        text = line.strip()
+        ans_known = calc.ans is not _UNSET
+        if text in MEMORY_KEYS and not (ans_known and (mem_known or _fits_float(calc))):
+            break                   # whether a huge int can join M depends on the incoming M
+        if text == "MC" and mem_changed and not mem_known:
+            break                   # the M± so far must still be checked against the incoming M
+        if not _is_command(text):
+            try:
+                needs = compile_expression(text, calc.mode, precision).variables
+            except CalcError:
+                needs = ()
+            if ("Ans" in needs and not ans_known) or ("M" in needs and not mem_known):
+                break
+        out = calc.execute(text)
+        if text == "MC":
+            mem_known = True
+        mem_changed = mem_changed or text in MEMORY_KEYS
+        outputs.append(out)
+    else:
+        i = None
+    # a matrix result or an error leaves Ans as it was, so only a reassignment counts
+    ans_known = calc.ans is not _UNSET
+    mem = calc.mem if mem_known or mem_changed else None
+    return outputs, i, (calc.mode, ans_known, calc.ans, mem_known, mem)
+
+
+def _chunks(lines, mode, size):
+    """Yield ``(chunk, mode at its first line)``, tracking DEG/RAD lines as we go."""
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk, mode
+        for line in chunk:
+            text = line.strip()
+            if text in MODES:
+                mode = text
+
+
+def _merge(calc, chunk, result):
+    outputs, stop, (mode, ans_known, ans, mem_known, mem) = result
+    if mem is None:
+        mem = calc.mem
+    elif not mem_known:
+        before = calc.mem
+        try:
+            calc.mem_plus(mem)
+        except CalcError:
+            # the incoming M and the chunk's change don't mix (a huge int and a float):
+            # its M± lines would have failed, so run the chunk again here
+            calc.mem = before
+            for line in chunk:
+                yield line, calc.execute(line)
+            return
+        mem = calc.mem
+    yield from zip(chunk, outputs)
+    calc.mode = mode
+    if ans_known:
+        calc.ans = ans
+    calc.mem = mem
+    if stop is not None:
+        for line in chunk[stop:]:
+            yield line, calc.execute(line)
+
+
+def run_parallel(lines, calc: Calculator, jobs: int, chunk_size: int = CHUNK_SIZE):
+    """Yield ``(line, output)`` per input line, evaluating chunks on ``jobs`` processes.
+
+    At most ``2 * jobs`` chunks are in flight, so memory stays bounded.
+    """
+    with ProcessPoolExecutor(jobs) as pool:
+        pending = deque()
+        for chunk, mode in _chunks(iter(lines), calc.mode, chunk_size):
+            pending.append((chunk, pool.submit(_run_chunk, chunk, mode, calc.precision)))
+            if len(pending) >= 2 * jobs:
+                chunk, future = pending.popleft()
+                yield from _merge(calc, chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from _merge(calc, chunk, future.result())
+
+
+def run(lines, calc: Calculator, jobs: int = 1, chunk_size: int = CHUNK_SIZE):
+    """Yield ``(line, output)`` for every input line, in input order."""
+    if jobs > 1:
+        return run_parallel(lines, calc, jobs, chunk_size)
+    return ((line, calc.execute(line)) for line in lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m fxcalc", description="Evaluate calculator expressions, one per line.")
+    ap.add_argument("files", nargs="*", default=["-"], help="input files (default: stdin)")
+    ap.add_argument("-o", "--output", help="write results here instead of stdout")
+    ap.add_argument("--mode", choices=MODES, default="DEG", help="starting angle mode")
+    ap.add_argument("--precision", type=_precision, default=None, metavar="DIGITS|fraction",
+                    help="evaluate with Decimal digits (10–100) or exact fractions instead of floats")
+    ap.add_argument("--jobs", "-j", type=int, default=1, help="worker processes (default: 1, in-process)")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="lines per worker task")
+    ap.add_argument("--echo", action="store_true", help="print 'expr = result' instead of just the result")
+    args = ap.parse_args(argv)
+    if args.jobs < 1 or args.chunk_size < 1:
+        ap.error("--jobs and --chunk-size must be positive")
+
+    calc = Calculator(args.mode, precision=args.precision)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        with fileinput.input(args.files, encoding="utf-8") as lines:
+            for line, result in run(lines, calc, args.jobs, args.chunk_size):
+                if args.echo and result:
+                    result = f"{line.strip()} = {result}"
+                out.write(result + "\n")
+    except BrokenPipeError:
+        sys.stderr.close()   # e.g. piped into head; nothing left to report
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
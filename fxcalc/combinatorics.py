@@ -0,0 +1,175 @@
+"""Exact combinatorics: n!, nPr, nCr and friends.
+
+Factorials come from ``math.factorial`` (CPython's divide-and-conquer
+binary-splitting product over the odd part, in C); what this module adds is
+reuse.  Large factorials are kept in a small process-wide cache, shared by
+every session, and a new one is built from the nearest cached smaller one
+with a binary-split range product.  nPr never touches a full factorial, and
+small binomial rows are cached whole.  Stirling numbers of the first kind are
+O(n²) bignum work; the cost limits in ``limits`` keep n modest.
+"""
+import bisect
+import math
+import threading
+from functools import lru_cache
+
+FACTORIAL_CACHE_MIN = 1_000      # smaller factorials are cheaper to recompute than to look up
+FACTORIAL_CACHE_SIZE = 32
+ROW_CACHE_LIMIT = 1_024          # nCr for n up to this comes from a cached Pascal row
+
+
+def as_int(x) -> int:
+    """Integral float or int → int; anything else is a math error (as on the device)."""
+    if isinstance(x, int):
+        return x
+    if isinstance(x, float) and x.is_integer():
+        return int(x)
+    ratio = getattr(x, "as_integer_ratio", None)      # Decimal, Fraction (precision modes)
+    if ratio is not None and not isinstance(x, float):
+        n, d = ratio()
+        if d == 1:
+            return n
+    raise ValueError(f"{x!r} is not an integer")
+
+
+def _natural(x) -> int:
+    n = as_int(x)
+    if n < 0:
+        raise ValueError(f"{n} is negative")
+    return n
+
+
+def range_product(lo: int, hi: int) -> int:
+    """Product of ``lo * (lo+1) * ... * (hi-1)`` by binary splitting."""
+    if hi - lo <= 16:
+        p = 1
+        for k in range(lo, hi):
+            p *= k
+        return p
+    mid = (lo + hi) // 2
+    return range_product(lo, mid) * range_product(mid, hi)
+
+
+# ───────────────────────── FACTORIAL CACHE ─────────────────────────
+class _FactorialCache:
+    """The last few large factorials, reused as starting points for nearby ones."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.keys = []           # sorted n
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def get(self, n: int) -> int:
+        with self.lock:
+            if n in self.values:
+                return self.values[n]
+            i = bisect.bisect_left(self.keys, n)
+            below = self.keys[i - 1] if i else None
+            # read under the lock: another thread's insert may evict it right after
+            start = self.values[below] if below is not None and n - below < n // 4 else None
+        if start is not None:
+            # close to one we have: n! = below! · (below+1)···n
+            value = start * range_product(below + 1, n + 1)
+        else:
+            value = math.factorial(n)
+        with self.lock:
+            if n not in self.values:
+                if len(self.keys) >= self.size:
+                    # drop the smallest; big ones are the expensive ones to rebuild
+                    del self.values[self.keys.pop(0)]
+                bisect.insort(self.keys, n)
+                self.values[n] = value
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.keys.clear()
+            self.values.clear()
+
+
+_factorials = _FactorialCache(FACTORIAL_CACHE_SIZE)
+clear_cache = _factorials.clear
+
+
+def factorial(n) -> int:
+    n = _natural(n)
+    if n < FACTORIAL_CACHE_MIN:
+        return math.factorial(n)
+    return _factorials.get(n)
+
+
+# ───────────────────────── PERMUTATIONS / COMBINATIONS ─────────────────────────
+def nPr(n, r) -> int:
+    # falling factorial n·(n−1)···(n−r+1), split recursively in C: O(r) work, never n!
+    n, r = _natural(n), _natural(r)
+    return math.perm(n, r)
+
+
+@lru_cache(maxsize=64)
+def binomial_row(n: int) -> tuple:
+    """Row ``n`` of Pascal's triangle, built multiplicatively and cached."""
+    row = [1] * (n + 1)
+    for k in range(1, n // 2 + 1):
+        row[k] = row[n - k] = row[k - 1] * (n - k + 1) // k
+    return tuple(row)
+
+
+def nCr(n, r) -> int:
+    n, r = _natural(n), _natural(r)
+    if r > n:
+        return 0
+    if n <= ROW_CACHE_LIMIT:
+        return binomial_row(n)[r]
+    return math.comb(n, r)
+
+
+def multinomial(*ks) -> int:
+    """(k1+k2+...)! / (k1!·k2!···), as a product of binomials."""
+    result, total = 1, 0
+    for k in map(_natural, ks):
+        total += k
+        result *= nCr(total, k)
+    return result
+
+
+def catalan(n) -> int:
+    n = _natural(n)
+    return math.comb(2 * n, n) // (n + 1)
+
+
+def stirling2(n, k) -> int:
+    """Stirling numbers of the second kind: partitions of n items into k blocks."""
+    n, k = _natural(n), _natural(k)
+    if k > n:
+        return 0
+    if k == 0:
+        return 1 if n == 0 else 0
+    # inclusion–exclusion over a cached binomial row
+    row = binomial_row(k) if k <= ROW_CACHE_LIMIT else [math.comb(k, i) for i in range(k + 1)]
+    total = 0
+    for i in range(k + 1):
+        term = row[i] * (k - i) ** n
+        total += -term if i & 1 else term
+    return total // factorial(k)
+
+
+@lru_cache(maxsize=16)
+def _stirling1_row(n: int) -> tuple:
+    # coefficients of the rising factorial x(x+1)···(x+n−1)
+    row = [1]
+    for m in range(n):
+        nxt = [0] * (len(row) + 1)
+        for k, c in enumerate(row):
+            nxt[k + 1] += c
+            nxt[k] += c * m
+        row = nxt
+    return tuple(row)
+
+
+def stirling1(n, k) -> int:
+    """Unsigned Stirling numbers of the first kind: permutations of n with k cycles."""
+    n, k = _natural(n), _natural(k)
+    if k > n:
+        return 0
+    return _stirling1_row(n)[k]
@@ -0,0 +1,413 @@
+"""Compile parsed expressions into plain Python callables, with an LRU cache.
+
+An expression is parsed and compiled once per (normalized text, angle mode);
+pressing "=" again, recalling it from history, or changing ``Ans`` only calls
+the cached function.
+
+Before code generation the tree is optimized (see OPTIMIZER below).
+Constant sub-trees are folded, and a sub-tree that occurs twice is
+evaluated once.  The generated lambda takes the functions it calls as
+keyword-only defaults, so a call is a local load, not a global lookup.
+
+With a ``precision`` (see :mod:`fxcalc.precise`) the same expression is
+compiled against Decimal or Fraction tables instead, cached separately.
+"""
+import ast
+import decimal
+import math
+import operator
+from collections import Counter
+from fractions import Fraction
+from functools import lru_cache
+from typing import Callable, NamedTuple, Tuple
+
+from . import combinatorics, metrics
+from .limits import TooExpensive, check_cost, is_risky, result_bits
+from .parser import BinOp, CalcError, Call, Name, Num, Postfix, UnaryOp, parse
+
+CACHE_SIZE = 1024
+MODES = ("DEG", "RAD")
+
+CONSTANTS = {"pi": math.pi, "e": math.e}
+
+# Calls whose first argument is a function of x rather than a value
+CALCULUS = frozenset(("integral", "derivative"))
+
+# MATRIX / VECTOR mode: expressions naming these are compiled by fxcalc.matrix (NumPy)
+ARRAY_VARIABLES = frozenset(("MatA", "MatB", "MatC", "MatD", "MatAns",
+                             "VctA", "VctB", "VctC", "VctD", "VctAns"))
+ARRAY_CALLS = frozenset(("det", "trn", "inv", "dot", "cross", "eig", "identity"))
+
+
+# ───────────────────────── FUNCTION TABLES ─────────────────────────
+def _trig_table(mode: str) -> dict:
+    if mode == "RAD":
+        return {"sin": math.sin, "cos": math.cos, "tan": math.tan,
+                "asin": math.asin, "acos": math.acos, "atan": math.atan}
+    radians, degrees = math.radians, math.degrees
+    return {
+        "sin": lambda x: math.sin(radians(x)),
+        "cos": lambda x: math.cos(radians(x)),
+        "tan": lambda x: math.tan(radians(x)),
+        "asin": lambda x: degrees(math.asin(x)),
+        "acos": lambda x: degrees(math.acos(x)),
+        "atan": lambda x: degrees(math.atan(x)),
+    }
+
+
+def _calculus(name: str, mode: str):
+    # fxcalc.calculus needs NumPy; import it the first time ∫ or d/dx runs, not with the engine
+    def call(*args):
+        from . import calculus
+        return getattr(calculus, name)(*args, mode=mode)
+    call.__name__ = name
+    return call
+
+
+FUNCTIONS = {
+    mode: {
+        **_trig_table(mode),
+        "log": math.log10, "ln": math.log, "exp": math.exp, "sqrt": math.sqrt,
+        "abs": abs, "pow": pow,
+        "factorial": combinatorics.factorial, "nPr": combinatorics.nPr, "nCr": combinatorics.nCr,
+        "multinomial": combinatorics.multinomial, "catalan": combinatorics.catalan,
+        "stirling1": combinatorics.stirling1, "stirling2": combinatorics.stirling2,
+        "integral": _calculus("integral", mode),
+        "derivative": _calculus("derivative", mode),
+    }
+    for mode in MODES
+}
+
+
+def uses_arrays(tree) -> bool:
+    """Whether ``tree`` names a matrix/vector variable or function."""
+    if isinstance(tree, Name):
+        return tree.id in ARRAY_VARIABLES
+    if isinstance(tree, BinOp):
+        return uses_arrays(tree.left) or uses_arrays(tree.right)
+    if isinstance(tree, (UnaryOp, Postfix)):
+        return uses_arrays(tree.operand)
+    if isinstance(tree, Call):
+        return tree.func in ARRAY_CALLS or any(map(uses_arrays, tree.args))
+    return False
+
+
+# ───────────────────────── OPTIMIZER ─────────────────────────
+# Folding runs here, in the caller's process, not in the evaluation sandbox:
+# sub-trees the cost estimator can't keep under FOLD_MAX_BITS are left for run time.
+FOLD_MAX_BITS = 4096             # 500! is folded, 50000! is not
+
+_FOLD_BINOPS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv,
+                "^": operator.pow}
+_FOLD_UNARYOPS = {"-": operator.neg, "+": operator.pos}
+
+
+# plain numbers a folded sub-tree may become (not NumPy arrays or scalars)
+_EXACT = (decimal.Decimal, Fraction)
+_FOLDABLE = (int, float, *_EXACT)
+
+
+def fold(tree, functions: dict, operators: dict = None, constants: dict = None):
+    """Replace sub-trees without variables by their value (``π``, ``2^10``, ``sin(30)``, ``5!``).
+
+    A sub-tree that raises (``1÷0``, ``√(-1)``) or whose value isn't a plain
+    number stays as it is, and fails or runs at call time as before.
+    Calculus bodies are functions of x and are left alone.
+    """
+    constants = CONSTANTS if constants is None else constants
+    if isinstance(tree, Name):
+        return Num(constants[tree.id]) if tree.id in constants else tree
+    if isinstance(tree, BinOp):
+        node = BinOp(tree.op, fold(tree.left, functions, operators, constants),
+                     fold(tree.right, functions, operators, constants))
+        operands = (node.left, node.right)
+    elif isinstance(tree, (UnaryOp, Postfix)):
+        node = type(tree)(tree.op, fold(tree.operand, functions, operators, constants))
+        operands = (node.operand,)
+    elif isinstance(tree, Call) and tree.func in CALCULUS:
+        return Call(tree.func, tree.args[:1] + tuple(fold(a, functions, operators, constants)
+                                                     for a in tree.args[1:]))
+    elif isinstance(tree, Call):
+        node = Call(tree.func, tuple(fold(a, functions, operators, constants) for a in tree.args))
+        operands = node.args
+    else:
+        return tree
+    if not all(isinstance(a, Num) for a in operands):
+        return node
+    try:
+        if is_risky(node) and result_bits(node) > FOLD_MAX_BITS:
+            return node
+        value = _fold_value(node, [a.value for a in operands], functions, operators)
+    except (TooExpensive, ArithmeticError, ValueError, TypeError, KeyError):
+        return node
+    return Num(value) if type(value) in _FOLDABLE else node
+
+
+def _fold_value(node, values, functions, operators):
+    operators = operators or {}
+    if isinstance(node, BinOp):
+        return operators.get(OPERATOR_NAMES[node.op], _FOLD_BINOPS[node.op])(*values)
+    if isinstance(node, UnaryOp):
+        return operators.get(UNARY_NAMES[node.op], _FOLD_UNARYOPS[node.op])(*values)
+    if isinstance(node, Postfix):
+        if node.op == "%":
+            return operators.get("div", operator.truediv)(values[0], 100)
+        return functions["factorial"](*values)
+    return functions[node.func](*values)
+
+
+def _key(node) -> str:
+    # repr, not the node: Num(2) == Num(2.0), but 2^99 and 2.0^99 are different values
+    return repr(node)
+
+
+def repeated(tree) -> frozenset:
+    """Keys of the non-leaf sub-trees that occur more than once (calculus bodies excluded)."""
+    counts = Counter()
+
+    def walk(node):
+        if isinstance(node, (Num, Name)):
+            return
+        counts[_key(node)] += 1
+        if isinstance(node, BinOp):
+            walk(node.left)
+            walk(node.right)
+        elif isinstance(node, (UnaryOp, Postfix)):
+            walk(node.operand)
+        elif isinstance(node, Call):
+            for arg in node.args[1:] if node.func in CALCULUS else node.args:
+                walk(arg)
+    walk(tree)
+    return frozenset(key for key, count in counts.items() if count > 1)
+
+
+# ───────────────────────── CODEGEN ─────────────────────────
+_BINOPS = {"+": ast.Add, "-": ast.Sub, "*": ast.Mult, "/": ast.Div, "^": ast.Pow}
+_UNARYOPS = {"-": ast.USub, "+": ast.UAdd}
+
+# operator table keys, for function tables whose operators aren't Python's (matrix mode);
+# a table may replace only some of them (precision modes: ÷ and ^)
+OPERATOR_NAMES = {"+": "add", "-": "sub", "*": "mul", "/": "div", "^": "pow"}
+UNARY_NAMES = {"-": "neg", "+": "pos"}
+
+
+class _Codegen:
+    """Translate our AST into a Python ``ast`` expression, collecting free variables."""
+
+    def __init__(self, functions: dict, operators: dict = None, shared: frozenset = frozenset(),
+                 constants: dict = None):
+        self.functions = functions
+        self.operators = operators or {}    # empty: Python's own operators
+        self.constants = CONSTANTS if constants is None else constants
+        self.variables = set()
+        self.bindings = {}          # extra namespace entries (calculus bodies)
+        self.used = set()           # namespace names the code loads (bound as lambda defaults)
+        self.shared = shared        # keys of sub-trees to evaluate once (see repeated())
+        self.temps = {}             # shared key → name of the local holding its value
+
+    def emit(self, node) -> ast.expr:
+        if not self.shared or isinstance(node, (Num, Name)):
+            return self.emit_node(node)
+        key = _key(node)
+        if key not in self.shared:
+            return self.emit_node(node)
+        if key in self.temps:
+            return ast.Name(self.temps[key], ast.Load())
+        # the first occurrence in evaluation order (left to right) stores the value
+        value = self.emit_node(node)
+        name = self.temps[key] = f"_t{len(self.temps)}"
+        return ast.NamedExpr(ast.Name(name, ast.Store()), value)
+
+    def load(self, name: str) -> ast.expr:
+        self.used.add(name)
+        return ast.Name(name, ast.Load())
+
+    def constant(self, value) -> ast.expr:
+        if type(value) in (int, float):
+            return ast.Constant(value)
+        # Decimals and Fractions can't be code constants: bound like functions
+        name = f"_c{len(self.bindings)}"
+        self.bindings[name] = value
+        return self.load(name)
+
+    def emit_node(self, node) -> ast.expr:
+        if isinstance(node, Num):
+            return self.constant(node.value)
+        if isinstance(node, Name):
+            if node.id in self.constants:
+                return self.constant(self.constants[node.id])
+            self.variables.add(node.id)
+            return ast.Name(node.id, ast.Load())
+        if isinstance(node, BinOp):
+            if OPERATOR_NAMES[node.op] in self.operators:
+                return self.operator(OPERATOR_NAMES[node.op], node.left, node.right)
+            return ast.BinOp(self.emit(node.left), _BINOPS[node.op](), self.emit(node.right))
+        if isinstance(node, UnaryOp):
+            if UNARY_NAMES[node.op] in self.operators:
+                return self.operator(UNARY_NAMES[node.op], node.operand)
+            return ast.UnaryOp(_UNARYOPS[node.op](), self.emit(node.operand))
+        if isinstance(node, Postfix):
+            if node.op == "%":
+                if "div" in self.operators:
+                    return self.operator("div", node.operand, Num(100))
+                return ast.BinOp(self.emit(node.operand), ast.Div(), ast.Constant(100))
+            return self.call("factorial", (node.operand,))
+        if isinstance(node, Call):
+            return self.call(node.func, node.args)
+        raise CalcError(f"Cannot compile {node!r}")
+
+    def operator(self, name: str, *operands) -> ast.expr:
+        return ast.Call(self.load("_op_" + name), [self.emit(a) for a in operands], [])
+
+    def call(self, func: str, args) -> ast.expr:
+        if func not in self.functions:
+            raise CalcError(f"Unknown function {func}")
+        # "_" prefixes can't collide with user variables (the tokenizer rejects them)
+        fn = self.load("_" + func)
+        if func in CALCULUS:
+            return ast.Call(fn, self.body(func, args), [])
+        return ast.Call(fn, [self.emit(a) for a in args], [])
+
+    def body(self, func: str, args) -> list:
+        # ∫(f, a, b) → _integral(_body0, ("Ans",), (Ans,), a, b): the body's own tree
+        # plus the outer variables it uses; x is bound by the callee
+        if not args:
+            raise CalcError(f"{func} needs a function of x")
+        inner = compile_tree(args[0], functions=self.functions)
+        outer = [name for name in inner.variables if name != "x"]
+        name = f"_body{len(self.bindings)}"
+        self.bindings[name] = args[0]
+        return [self.load(name), ast.Constant(tuple(outer)),
+                ast.Tuple([self.emit(Name(v)) for v in outer], ast.Load()),
+                *[self.emit(a) for a in args[1:]]]
+
+
+class Compiled(NamedTuple):
+    """A compiled expression; call ``fn`` with the values of ``variables`` in order."""
+    fn: Callable
+    variables: Tuple[str, ...]
+    source: str
+    tree: object = None
+    risky: bool = False         # needs a cost check before running (see limits)
+
+
+def compile_tree(tree, mode: str = "DEG", functions: dict = None, source: str = "",
+                 operators: dict = None, optimize: bool = False, constants: dict = None) -> Compiled:
+    """Compile an already-parsed AST against a function table (default: float math).
+
+    ``operators`` maps :data:`OPERATOR_NAMES`/:data:`UNARY_NAMES` to functions
+    that replace Python's operators (matrix mode: × is the matrix product).
+    ``constants`` replaces :data:`CONSTANTS` (π and e to more digits).
+    ``optimize`` folds constants and shares repeated sub-trees first; it
+    is meant for scalar tables (NumPy constants don't fold into code).
+    """
+    if functions is None:
+        if mode not in FUNCTIONS:
+            raise CalcError(f"Unknown angle mode {mode!r}")
+        functions = FUNCTIONS[mode]
+    try:                                        # parse() bounds the depth; this is the backstop
+        if optimize:
+            tree = fold(tree, functions, operators, constants)
+        gen = _Codegen(functions, operators, repeated(tree) if optimize else frozenset(), constants)
+        body = gen.emit(tree)
+    except RecursionError:
+        raise CalcError("Syntax ERROR") from None
+    variables = tuple(sorted(gen.variables))
+    # functions as keyword-only defaults: loaded as locals, invisible to fn(*args)
+    bound = sorted(gen.used)
+    params = ast.arguments(posonlyargs=[], args=[ast.arg(v) for v in variables],
+                           kwonlyargs=[ast.arg(name) for name in bound],
+                           kw_defaults=[ast.Name(name, ast.Load()) for name in bound], defaults=[])
+    module = ast.Expression(ast.Lambda(params, body))
+    ast.fix_missing_locations(module)
+    namespace = {"__builtins__": {}}
+    namespace.update(("_" + name, fn) for name, fn in functions.items())
+    namespace.update(gen.bindings)
+    namespace.update(("_op_" + name, fn) for name, fn in (operators or {}).items())
+    fn = eval(compile(module, "<calc>", "eval"), namespace)
+    return Compiled(fn, variables, source, tree, is_risky(tree))
+
+
+def normalize(text: str) -> str:
+    """Cache key form of display text: any run of whitespace is one token boundary."""
+    return " ".join(text.split())
+
+
+def _float_scalars(fn):
+    def call(*args):
+        return fn(*[float(a) if isinstance(a, _EXACT) else a for a in args])
+    return call
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile_cached(text: str, mode: str, precision) -> Compiled:
+    with metrics.phase("compile"):          # misses only; hits are read from cache_info
+        system = None
+        if precision is not None:
+            from . import precise
+            system = precise.system(mode, precision)
+        tree = parse(text, float if system is None else system.number)     # parsed once per miss
+        if uses_arrays(tree):
+            from . import matrix                # NumPy; only once a matrix or vector is used
+            if mode not in matrix.FUNCTIONS:
+                raise CalcError(f"Unknown angle mode {mode!r}")
+            if system is not None:
+                tree = parse(text)              # matrices stay binary: float literals for NumPy
+            compiled = compile_tree(tree, mode, matrix.FUNCTIONS[mode], text, matrix.OPERATORS, optimize=True)
+            # matrices stay binary in every precision mode; a Decimal or Fraction Ans joins them as a float
+            return compiled if system is None else compiled._replace(fn=_float_scalars(compiled.fn))
+        if system is not None:
+            with decimal.localcontext(system.context):     # folding rounds as the call will
+                compiled = compile_tree(tree, mode, system.functions, text,
+                                        system.operators, optimize=True, constants=system.constants)
+            return compiled._replace(fn=system.bind(compiled.fn))
+        return compile_tree(tree, mode, source=text, optimize=True)
+
+
+def compile_expression(text: str, mode: str = "DEG", precision=None) -> Compiled:
+    """Parse and compile ``text`` for the given angle mode, reusing cached results.
+
+    ``precision`` is a :class:`fxcalc.precise.Precision`; ``None`` is binary floats.
+    """
+    return _compile_cached(normalize(text), mode, precision)
+
+
+cache_info = _compile_cached.cache_info
+cache_clear = _compile_cached.cache_clear
+
+
+@metrics.REGISTRY.collector
+def _cache_metrics():
+    info = cache_info()
+    yield "fxcalc_compile_cache_hits_total", "counter", "Compiled-expression cache hits.", {"": info.hits}
+    yield "fxcalc_compile_cache_misses_total", "counter", "Compiled-expression cache misses.", {"": info.misses}
+    yield "fxcalc_compile_cache_entries", "gauge", "Compiled expressions cached.", {"": info.currsize}
+
+
+def evaluate(text: str, mode: str = "DEG", variables: dict = None, precision=None):
+    """Evaluate display text; ``variables`` supplies ``Ans`` and friends.
+
+    Parse errors, unknown names and math-domain failures all surface as
+    :class:`CalcError`; obviously huge integer work as
+    :class:`~fxcalc.limits.TooExpensive`, before anything runs.  With a
+    ``precision`` the result is a Decimal or Fraction (or an exact int).
+    """
+    compiled = compile_expression(text, mode, precision)
+    env = variables or {}
+    try:
+        args = [env[name] for name in compiled.variables]
+    except KeyError as exc:
+        raise CalcError(f"Undefined variable {exc.args[0]}") from None
+    if compiled.risky:
+        check_cost(compiled.tree, env)
+    try:
+        result = compiled.fn(*args)
+    except CalcError:
+        raise                                   # e.g. matrix "Dimension ERROR"
+    except (ArithmeticError, ValueError, TypeError) as exc:
+        raise CalcError("Math ERROR") from exc
+    except MemoryError as exc:
+        raise TooExpensive("out of memory") from exc
+    if isinstance(result, complex) or (isinstance(result, float) and not math.isfinite(result)):
+        raise CalcError("Math ERROR")           # 10.0^300×10.0^300 overflows to inf, not an error
+    return result
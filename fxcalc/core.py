@@ -0,0 +1,101 @@
+"""Headless calculator state: angle mode, Ans and independent memory (M).
+
+This is the same behaviour the Streamlit keypad has, without Streamlit:
+``=`` stores the result in Ans, errors leave Ans untouched, M+/M− add or
+subtract the displayed value to M, MC clears it.  With a ``precision``
+(:class:`fxcalc.precise.Precision`) expressions evaluate in Decimal or
+Fraction arithmetic, and Ans and M keep those values.
+"""
+from .compiler import MODES, evaluate
+from .formatting import compact, result_text
+from .parser import CalcError
+
+ERROR = "Error"
+
+# Keypad keys that are commands rather than expressions, as typed in batch input.
+MEMORY_KEYS = {"M+": 1, "M-": -1, "M−": -1}
+
+
+class Calculator:
+    __slots__ = ("mode", "ans", "mem", "precision")
+
+    def __init__(self, mode: str = "DEG", ans=0.0, mem=0.0, precision=None):
+        if mode not in MODES:
+            raise CalcError(f"Unknown angle mode {mode!r}")
+        self.mode = mode
+        self.ans = ans
+        self.mem = mem
+        self.precision = precision
+
+    def variables(self) -> dict:
+        return {"Ans": self.ans, "M": self.mem}
+
+    def value(self, expr: str):
+        """Evaluate without touching Ans (what M+/M− do with the display)."""
+        return evaluate(expr, self.mode, self.variables(), self.precision)
+
+    def equal(self, expr: str):
+        result = self.value(expr)
+        if not getattr(result, "ndim", 0):   # matrix/vector results don't replace Ans
+            self.ans = result
+        return result
+
+    def mem_plus(self, value, sign: int = 1):
+        """M += ``sign`` × ``value``: exact for ints (as Ans is), else a float or in the current precision."""
+        if self.precision is None:
+            try:
+                if isinstance(value, int):
+                    mem = self.mem
+                    if isinstance(mem, float) and mem.is_integer():
+                        mem = int(mem)              # 0.0 after MC: an int result keeps M exact
+                    self.mem = mem + sign * value
+                else:
+                    self.mem = self.mem + sign * float(value)
+            except (OverflowError, TypeError, ValueError) as exc:
+                raise CalcError("Math ERROR") from exc    # a huge int and a float M don't mix
+        else:
+            from .precise import add
+            self.mem = add(self.mem, value, self.precision, sign)
+
+    def mem_add(self, expr: str = "Ans"):
+        self.mem_plus(self.value(expr or "0"))
+
+    def mem_sub(self, expr: str = "Ans"):
+        self.mem_plus(self.value(expr or "0"), -1)
+
+    def mem_clear(self):
+        self.mem = 0.0
+
+    def toggle_mode(self):
+        self.mode = "RAD" if self.mode == "DEG" else "DEG"
+
+    def execute(self, line: str) -> str:
+        """Run one line of batch input and return the text to print for it.
+
+        ``DEG``/``RAD`` switch the angle mode, ``MC``/``M+``/``M-`` act on
+        memory (M+/M− use Ans), anything else is an expression whose result
+        becomes Ans.  Commands and blank lines print an empty line so output
+        stays aligned with input.
+        """
+        line = line.strip()
+        if not line:
+            return ""
+        if line in MODES:
+            self.mode = line
+            return ""
+        if line == "MC":
+            self.mem_clear()
+            return ""
+        try:
+            if line in MEMORY_KEYS:
+                self.mem_plus(self.ans, MEMORY_KEYS[line])
+                return ""
+            result = self.equal(line)
+            if getattr(result, "ndim", 0):
+                from .matrix import summary           # NumPy; only once a matrix was computed
+                return summary(result)                # one line per input line, like any result
+            if self.precision is not None:
+                return result_text(result)            # Decimal/Fraction: the digits, not "1E+20"
+            return str(compact(result))               # ints over NORM_DIGITS digits: rounded text
+        except CalcError:
+            return ERROR
@@ -0,0 +1,299 @@
+"""Result text for the display and history: fx-991EX number formats, bounded in time.
+
+``str()`` of an int is quadratic in its length, and refuses outright past
+``sys.get_int_max_str_digits()`` (4,300 digits).  Results here reach
+``limits.MAX_RESULT_BITS`` (~315,000 digits; 50000! has 213,237).  So no
+function in this module converts a huge int digit by digit:
+
+* :func:`result_text` rounds an int of more than :data:`NORM_DIGITS` digits
+  to a mantissa and exponent.  Those come from its top 128 bits times a
+  power of two in :mod:`decimal`, which costs microseconds at any size;
+* :func:`all_digits` writes every digit in a background thread.  It splits
+  the int in halves recursively, as CPython 3.12's ``_pylong`` does, which
+  is about 9× faster than ``str()`` at 200,000 digits.  Its results are
+  cached;
+* :func:`compact` is what goes into history: the number, or its display
+  text once it is too long to keep.
+
+Decimal and Fraction results (the precision modes, :mod:`fxcalc.precise`)
+are formatted from their own digits, never through a float.
+
+Numbers are written the way the parser reads them back, with ``×10^`` for
+the exponent (``1e+20`` would read as 1·e+20).  The formats follow the
+device's SETUP menu:
+
+========  ==================================================================
+``Norm``  every digit the number has: floats as their shortest round-trip
+          text, Decimals with all their digits, ints up to
+          :data:`NORM_DIGITS` digits, so continuing a calculation from the
+          display loses nothing.  Floats below 10^-9 or from 10^16 get
+          ``×10^`` (read back to within 2 ulp), longer ints 10-digit Sci.
+          Fractions are ``a/b`` up to :data:`FRACTION_DIGITS` digits in
+          all, else :data:`LONG_FRACTION_DIGITS` digits of their value
+``Fix``   ``digits`` decimals (0–9); 10^10 and above switch to Sci
+``Sci``   ``digits`` significant digits (1–10)
+``Eng``   ``digits`` significant digits (1–10), exponent a multiple of 3
+========  ==================================================================
+
+Rounding is half up, as on the device.
+"""
+import decimal
+import math
+import operator
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from fractions import Fraction
+from typing import NamedTuple
+
+NORM, FIX, SCI, ENG = "Norm", "Fix", "Sci", "Eng"
+FORMATS = (NORM, FIX, SCI, ENG)
+DIGIT_RANGE = {FIX: (0, 9), SCI: (1, 10), ENG: (1, 10)}
+
+NORM_DIGITS = 1000               # longer ints are shown rounded (str() of 1,000 digits: ~10 µs)
+NORM_SMALL = -9                  # Norm writes floats from 10^-9 positionally, as the device's Norm 2
+DISPLAY_DIGITS = 10              # significant digits of the device's display
+FIX_LIMIT = 10 ** 10             # Fix shows Sci from here, as the display would overflow
+FRACTION_DIGITS = 20             # numerator and denominator digits Norm still shows as a/b
+LONG_FRACTION_DIGITS = 50
+DIGITS_CACHE_SIZE = 8
+
+_LOG10_2 = math.log10(2)
+_TOP_BITS = 128                  # bits of a huge int that decide its leading digits
+_WIDE = decimal.Context(prec=40, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+_NORM_LARGE = 16                 # Decimals from 10^16 get ×10^ unless they have more digits than that
+
+
+class Format(NamedTuple):
+    """A number format of the SETUP menu; ``digits`` is ignored by Norm."""
+    mode: str = NORM
+    digits: int = DISPLAY_DIGITS
+
+    def check(self) -> "Format":
+        if self.mode not in FORMATS:
+            raise ValueError(f"Unknown number format {self.mode!r}")
+        if self.mode in DIGIT_RANGE:
+            low, high = DIGIT_RANGE[self.mode]
+            if not low <= self.digits <= high:
+                raise ValueError(f"{self.mode} takes {low}–{high} digits")
+        return self
+
+    def __str__(self):
+        return self.mode if self.mode == NORM else f"{self.mode} {self.digits}"
+
+
+NORM_FORMAT = Format()
+
+
+# ───────────────────────── NUMBERS ─────────────────────────
+def _as_int(value):
+    # ints, bools aside, and NumPy integers; None for anything else
+    if isinstance(value, bool):
+        return None
+    try:
+        return operator.index(value)
+    except TypeError:
+        return None
+
+
+def int_digits(n: int) -> int:
+    """Decimal digits of ``abs(n)``, from its bit length (may be one too many)."""
+    return max(1, int(abs(n).bit_length() * _LOG10_2) + 1)
+
+
+def is_huge(value) -> bool:
+    """Whether ``value`` is an int too long for Norm to show every digit of."""
+    n = _as_int(value)
+    return n is not None and int_digits(n) > NORM_DIGITS
+
+
+def _decimal(value, digits: int = 40) -> decimal.Decimal:
+    """``value`` as a Decimal: exact for floats and ints that fit, within 1e-38 relative otherwise."""
+    if isinstance(value, decimal.Decimal):
+        return value
+    if isinstance(value, Fraction):
+        return _quotient(value, digits)
+    n = _as_int(value)
+    if n is None:
+        return decimal.Decimal(float(value))
+    bits = abs(n).bit_length()
+    if bits <= 4 * _TOP_BITS:
+        return decimal.Decimal(n)
+    shift = bits - _TOP_BITS
+    top = decimal.Decimal(n >> shift if n > 0 else -(-n >> shift))
+    return _WIDE.multiply(top, _WIDE.power(2, shift))
+
+
+def _quotient(f: Fraction, digits: int) -> decimal.Decimal:
+    """``f`` correctly rounded to ``digits`` significant digits, at any size of its terms.
+
+    One integer division, scaled so that the quotient has just over
+    ``digits`` digits, plus a sticky last digit for a non-zero remainder: no
+    huge int is ever converted to Decimal, and the one rounding is exact.
+    """
+    p, q = abs(f.numerator), f.denominator
+    if not p:
+        return decimal.Decimal(0)
+    # 10^shift·p/q ≥ 10^(digits+1), since p/q ≥ 2^(bits(p)-bits(q)-1)
+    shift = digits + 2 - math.floor((p.bit_length() - q.bit_length() - 1) * _LOG10_2)
+    m, r = divmod(p * 10 ** shift, q) if shift >= 0 else divmod(p, q * 10 ** -shift)
+    d = decimal.Decimal(f"{m * 10 + bool(r)}E{-shift - 1}")
+    ctx = decimal.Context(prec=digits, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+    return ctx.plus(d if f > 0 else d.copy_negate())
+
+
+def _round(d: decimal.Decimal, digits: int) -> decimal.Decimal:
+    # to ``digits`` significant digits, half up
+    return decimal.Context(prec=digits, rounding=decimal.ROUND_HALF_UP,
+                           Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN).plus(d)
+
+
+def _scientific(d: decimal.Decimal, digits: int, step: int = 1, strip: bool = False) -> str:
+    """``d`` as ``m×10^e`` with ``digits`` significant digits and ``e`` a multiple of ``step``."""
+    if not d:
+        return "0"
+    d = _round(d, digits)
+    sign, coefficient, _ = d.as_tuple()
+    text = "".join(map(str, coefficient)).ljust(digits, "0")
+    exponent = d.adjusted()
+    lead = 1 + exponent % step           # digits before the point
+    exponent -= exponent % step
+    whole, fraction = text[:lead].ljust(lead, "0"), text[lead:]
+    if strip:
+        fraction = fraction.rstrip("0")
+    mantissa = f"{whole}.{fraction}" if fraction else whole
+    mantissa = "-" + mantissa if sign else mantissa
+    return mantissa if exponent == 0 else f"{mantissa}×10^{exponent}"
+
+
+def _norm(value) -> str:
+    n = _as_int(value)
+    if n is not None:
+        return str(n) if int_digits(n) <= NORM_DIGITS else _scientific(_decimal(n), DISPLAY_DIGITS)
+    if not value:
+        return "0"                       # and not "-0"
+    text = repr(float(value))
+    if "e" not in text:
+        return text.removesuffix(".0")
+    mantissa, exponent = text.split("e")
+    if NORM_SMALL <= int(exponent) < 0:
+        return f"{decimal.Decimal(text):f}"     # 1.5e-05 → 0.000015, read back exactly
+    return f"{mantissa.removesuffix('.0')}×10^{int(exponent)}"
+
+
+def _norm_decimal(d: decimal.Decimal) -> str:
+    if not d:
+        return "0"
+    digits = len(d.as_tuple().digits)
+    if NORM_SMALL <= d.adjusted() < max(_NORM_LARGE, digits):
+        text = f"{d:f}"
+        return text.rstrip("0").rstrip(".") if "." in text else text
+    return _scientific(d, digits, strip=True)
+
+
+def _norm_fraction(f: Fraction) -> str:
+    if int_digits(f.numerator) + int_digits(f.denominator) <= FRACTION_DIGITS:
+        return f"{f.numerator}/{f.denominator}"
+    return _norm_decimal(_decimal(f, LONG_FRACTION_DIGITS))
+
+
+def result_text(value, fmt: Format = NORM_FORMAT) -> str:
+    """``value`` as the display shows it in ``fmt``; anything not a real number as ``str()``."""
+    if getattr(value, "ndim", 0):
+        return str(value)
+    if isinstance(value, Fraction):
+        if value.denominator == 1:
+            value = value.numerator
+        elif fmt.mode == NORM:
+            return _norm_fraction(value)
+    if isinstance(value, decimal.Decimal):
+        if not value.is_finite():
+            return str(value)
+        if fmt.mode == NORM:
+            return _norm_decimal(value)
+    elif _as_int(value) is None and not isinstance(value, (float, Fraction)):
+        try:
+            value = float(value)          # NumPy scalars, ...
+        except (TypeError, ValueError):
+            return str(value)
+    if isinstance(value, float) and not math.isfinite(value):
+        return repr(value)
+    if fmt.mode == NORM:
+        return _norm(value)
+    d = _decimal(value)
+    if fmt.mode == FIX:
+        if abs(d) >= FIX_LIMIT:
+            return _scientific(d, DISPLAY_DIGITS)
+        fixed = d.quantize(decimal.Decimal(1).scaleb(-fmt.digits), rounding=decimal.ROUND_HALF_UP, context=_WIDE)
+        return f"{abs(fixed) if not fixed else fixed:f}"      # no "-0.00"
+    if fmt.mode == SCI:
+        return _scientific(d, fmt.digits)
+    return _scientific(d, fmt.digits, step=3, strip=True)
+
+
+def brief(value, digits: int = 4) -> str:
+    """Short text for a status line, like ``f"{value:.4g}"`` but safe for any int."""
+    if isinstance(value, Fraction):
+        value = _decimal(value)
+    n = _as_int(value)
+    if n is not None and n.bit_length() > 1000:   # past float range: format() would overflow
+        return _scientific(_decimal(n), digits, strip=True)
+    try:
+        return f"{value:.{digits}g}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def compact(value):
+    """What history keeps of ``value``: the number, or its Norm text if that is rounded."""
+    return result_text(value) if is_huge(value) else value
+
+
+# ───────────────────────── ALL DIGITS ─────────────────────────
+def _int_to_decimal_string(n: int) -> str:
+    """Every digit of ``n``: split in halves by bits, joined with exact Decimal arithmetic."""
+    if int_digits(n) <= NORM_DIGITS:
+        return str(n)
+    ctx = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+    ctx.traps[decimal.Inexact] = False
+    powers = {}
+
+    def power(bits):
+        if bits not in powers:
+            powers[bits] = ctx.power(decimal.Decimal(2), bits)
+        return powers[bits]
+
+    def convert(m, bits):
+        if bits <= 1024:
+            return decimal.Decimal(m)
+        low_bits = bits >> 1
+        high = m >> low_bits
+        return ctx.add(ctx.multiply(convert(high, bits - low_bits), power(low_bits)),
+                       convert(m - (high << low_bits), low_bits))
+
+    text = str(convert(abs(n), abs(n).bit_length()))
+    return "-" + text if n < 0 else text
+
+
+_digits = OrderedDict()           # int → Future of its digits
+_digits_lock = threading.Lock()
+_digits_executor = None
+
+
+def all_digits(value) -> Future:
+    """A Future of every digit of the int ``value``, computed once in a background thread."""
+    global _digits_executor
+    n = _as_int(value)
+    if n is None:
+        raise TypeError(f"{type(value).__name__} has no digit string")
+    with _digits_lock:
+        future = _digits.get(n)
+        if future is None:
+            if _digits_executor is None:
+                _digits_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fxcalc-digits")
+            future = _digits[n] = _digits_executor.submit(_int_to_decimal_string, n)
+            if len(_digits) > DIGITS_CACHE_SIZE:
+                _digits.popitem(last=False)
+        else:
+            _digits.move_to_end(n)
+    return future
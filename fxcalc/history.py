@@ -0,0 +1,183 @@
+"""Persistent calculation history in SQLite, shared by every session.
+
+The table is append-only.  ``append`` only puts the row on a queue; one
+writer thread drains whatever has piled up and commits it as a single
+transaction, so the "=" key never waits on the disk.  A read waits only for
+its own session's queued rows.  The database runs in WAL mode, so readers are
+never blocked by that writer.
+
+Pages are read with keyset pagination (``id < cursor ORDER BY id DESC
+LIMIT n``) over the ``(session, id)`` index.  Fetching page 300 costs the
+same as fetching page 1, and only the rows on screen are ever loaded.
+"""
+import collections
+import contextlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+DEFAULT_PATH = os.environ.get(
+    "FXCALC_HISTORY_DB", os.path.join(os.path.expanduser("~"), ".fxcalc", "history.sqlite3"))
+PAGE_SIZE = 10
+BATCH_SIZE = 512                 # rows per write transaction, at most
+_INSERT = "INSERT INTO history (session, ts, expression, result) VALUES (?, ?, ?, ?)"
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id         INTEGER PRIMARY KEY,
+    session    TEXT NOT NULL,
+    ts         REAL NOT NULL,
+    expression TEXT NOT NULL,
+    result     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_session ON history (session, id);
+CREATE INDEX IF NOT EXISTS history_ts ON history (ts);
+CREATE INDEX IF NOT EXISTS history_expression ON history (session, expression);
+"""
+
+
+class Entry(NamedTuple):
+    id: int
+    ts: float
+    expression: str
+    result: str
+
+    def __str__(self):
+        return f"{self.expression} = {self.result}"
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")    # safe with WAL; commits skip the fsync
+    return conn
+
+
+def _prefix_bounds(prefix: str):
+    # "sin" → ["sin", "sio"): a range the (session, expression) index can answer
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class HistoryStore:
+    """Thread-safe history store; share one per server process."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._writer = _connect(path)
+        self._writer.executescript(_SCHEMA)
+        # in-memory databases are private to their connection
+        self._reader = self._writer if path == ":memory:" else _connect(path)
+        self._read_lock = threading.Lock()
+        self._write_lock = self._read_lock if self._reader is self._writer else contextlib.nullcontext()
+        self._pending = queue.Queue()
+        self._unwritten = collections.Counter()      # session -> rows still on the queue
+        self._written = threading.Condition()
+        threading.Thread(target=self._write_loop, name="history-writer", daemon=True).start()
+
+    # ───────────────────────── WRITES ─────────────────────────
+    def append(self, session: str, expression: str, result: str):
+        """Record one calculation; returns immediately."""
+        with self._written:
+            self._unwritten[session] += 1
+            self._pending.put((session, time.time(), expression, result))
+
+    def _insert(self, rows: list):
+        with self._write_lock:
+            try:
+                self._writer.execute("BEGIN")
+                self._writer.executemany(_INSERT, rows)
+                self._writer.execute("COMMIT")
+            except sqlite3.Error:
+                if self._writer.in_transaction:
+                    self._writer.execute("ROLLBACK")
+                raise
+
+    def _write(self, rows: list):
+        try:
+            self._insert(rows)
+        except sqlite3.Error:
+            if len(rows) == 1:
+                log.exception("history: dropped row %r", rows[0][:3])
+                return
+            # keep the good rows of the batch; drop only the ones that fail
+            for row in rows:
+                self._write([row])
+
+    def _write_loop(self):
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            try:
+                if rows:
+                    self._write(rows)
+            finally:
+                with self._written:
+                    for session, *_ in rows:
+                        self._unwritten[session] -= 1
+                        if not self._unwritten[session]:
+                            del self._unwritten[session]
+                    self._written.notify_all()
+                for _ in batch:
+                    self._pending.task_done()
+            if None in batch:
+                return
+
+    def flush(self):
+        """Block until every appended row is committed."""
+        self._pending.join()
+
+    def close(self):
+        self._pending.put(None)
+        self.flush()
+        self._writer.close()
+        if self._reader is not self._writer:
+            self._reader.close()
+
+    # ───────────────────────── READS ─────────────────────────
+    def _query(self, sql: str, params, session: Optional[str] = None) -> list:
+        # a page read right after "=" should include that row; the writer
+        # commits within a millisecond or so of being handed it
+        if session is not None:
+            with self._written:
+                self._written.wait_for(lambda: session not in self._unwritten)
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def page(self, session: str, before: Optional[int] = None, limit: int = PAGE_SIZE,
+             prefix: str = "") -> List[Entry]:
+        """Up to ``limit`` entries older than id ``before``, newest first."""
+        sql, params = "SELECT id, ts, expression, result FROM history WHERE session = ?", [session]
+        if before is not None:
+            sql += " AND id < ?"
+            params.append(before)
+        if prefix:
+            sql += " AND expression >= ? AND expression < ?"
+            params.extend(_prefix_bounds(prefix))
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return [Entry(*row) for row in self._query(sql, params, session)]
+
+    def count(self, session: str, prefix: str = "") -> int:
+        sql, params = "SELECT count(*) FROM history WHERE session = ?", [session]
+        if prefix:
+            sql += " AND expression >= ? AND expression < ?"
+            params.extend(_prefix_bounds(prefix))
+        return self._query(sql, params, session)[0][0]
+
+    def get(self, entry_id: int) -> Optional[Entry]:
+        rows = self._query("SELECT id, ts, expression, result FROM history WHERE id = ?", (entry_id,))
+        return Entry(*rows[0]) if rows else None
+
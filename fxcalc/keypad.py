@@ -0,0 +1,64 @@
+"""The fx-991EX keypad as immutable, process-wide data.
+
+Each key is ``(label, action, token, widget key)``.  ``action`` names an app
+callback: "press" types ``token`` on the display, and the other actions
+("equal", "clear", ...) take no token.  Both SHIFT states are resolved once
+per process, so a rerun only looks the rows up and builds no partials.
+"""
+from functools import lru_cache
+from types import MappingProxyType
+
+# What the key *prints* when SHIFT is ON
+SHIFT_MAP = MappingProxyType({
+    "sin(": "asin(",   # inverse trig
+    "cos(": "acos(",
+    "tan(": "atan(",
+    "log(": "10**",    # 10^x
+    "ln(":  "exp(",    # e^x
+    "√(":   "**2",     # x^2 (acts on the left value)
+    "π":    "e",       # quick constant swap
+})
+
+MODE_LABEL = None      # the mode key shows the current angle unit
+
+LAYOUT = (
+    # Memory row
+    (("MC", "mem_clear", None, "k_mc"), ("MR", "mem_recall", None, "k_mr"),
+     ("M+", "mem_add", None, "k_mplus"), ("M−", "mem_sub", None, "k_mminus")),
+    # Trig / function rows (SHIFT aware)
+    (("sin(", "press", "sin(", "k_sin"), ("cos(", "press", "cos(", "k_cos"),
+     ("tan(", "press", "tan(", "k_tan"), ("√(", "press", "√(", "k_sqrt")),
+    (("log(", "press", "log(", "k_log"), ("ln(", "press", "ln(", "k_ln"),
+     ("(", "press", "(", "k_lp"), (")", "press", ")", "k_rp")),
+    # Calculus: ∫(f(x), a, b) and d/dx(f(x), x0)
+    (("∫(", "press", "∫(", "k_int"), ("d/dx(", "press", "d/dx(", "k_ddx"),
+     (",", "press", ",", "k_comma"), ("x", "press", "x", "k_x")),
+    # Digits & ops
+    (("7", "press", "7", "k_7"), ("8", "press", "8", "k_8"),
+     ("9", "press", "9", "k_div"), ("÷", "press", "÷", "k_op_div")),
+    (("4", "press", "4", "k_4"), ("5", "press", "5", "k_5"),
+     ("6", "press", "6", "k_mul"), ("×", "press", "×", "k_op_mul")),
+    (("1", "press", "1", "k_1"), ("2", "press", "2", "k_2"),
+     ("3", "press", "3", "k_sub"), ("−", "press", "−", "k_op_sub")),
+    (("0", "press", "0", "k_0"), (".", "press", ".", "k_dot"),
+     ("^", "press", "^", "k_pow"), ("+", "press", "+", "k_op_add")),
+    # Constants / equals
+    (("π", "press", "π", "k_pi"), ("e", "press", "e", "k_e"),
+     ("!", "press", "math.factorial(", "k_fact"), ("=", "equal", None, "k_eq")),
+    # Controls (use ASCII-safe DEL instead of ⌫)
+    (("C", "clear", None, "k_clear"), ("DEL", "back", None, "k_del"),
+     ("SHIFT", "toggle_shift", None, "k_shift"), (MODE_LABEL, "toggle_mode", None, "k_mode")),
+)
+
+
+@lru_cache(maxsize=2)
+def rows(shift: bool) -> tuple:
+    """``LAYOUT`` with SHIFT applied to the labels and tokens of the shiftable keys."""
+    if not shift:
+        return LAYOUT
+    return tuple(
+        tuple((SHIFT_MAP.get(label, label), action, SHIFT_MAP.get(token, token), key)
+              if action == "press" and token in SHIFT_MAP else (label, action, token, key)
+              for label, action, token, key in row)
+        for row in LAYOUT
+    )
@@ -0,0 +1,167 @@
+"""Static cost estimation: refuse obviously huge integer work before running it.
+
+Float arithmetic is cheap whatever the inputs (it overflows instead of
+growing), so only exact integer results are tracked.  Every sub-expression is
+given an upper bound on ``log2|value|``; ``9^9^9``, ``10^10^6`` or
+``factorial(10^7)`` are rejected in microseconds instead of pinning a core.
+Anything that slips through is the wall-clock limit's job (see ``sandbox``).
+"""
+import decimal
+import math
+from fractions import Fraction
+
+from .parser import BinOp, CalcError, Call, Name, Num, Postfix, UnaryOp
+
+MAX_RESULT_BITS = 1 << 20        # ~315,000 decimal digits
+MAX_FACTORIAL = 50_000           # math.factorial(50_000) takes ~0.1 s
+MAX_STIRLING1 = 1_000            # stirling1 is an O(n²) bignum recurrence: ~0.5 s at n = 1000
+MAX_STIRLING2_WORK = 1 << 25     # stirling2 sums k+1 powers of ~n·log2(k) bits: ~0.2 s
+
+# Operations whose integer results can grow faster than their inputs.
+_GROWTH_CALLS = frozenset((
+    "factorial", "nPr", "nCr", "pow", "multinomial", "catalan", "stirling1", "stirling2",
+))
+
+
+class TooExpensive(CalcError):
+    """The expression would need more time or memory than we allow."""
+
+    def __init__(self, what: str = ""):
+        self.what = what
+        super().__init__(f"Too expensive{': ' + what if what else ''}")
+
+
+def is_risky(tree) -> bool:
+    """Whether ``tree`` contains anything that can blow up integer sizes."""
+    if isinstance(tree, BinOp):
+        return tree.op == "^" or is_risky(tree.left) or is_risky(tree.right)
+    if isinstance(tree, Postfix):
+        return tree.op == "!" or is_risky(tree.operand)
+    if isinstance(tree, UnaryOp):
+        return is_risky(tree.operand)
+    if isinstance(tree, Call):
+        return tree.func in _GROWTH_CALLS or any(map(is_risky, tree.args))
+    return False
+
+
+def _log2(value) -> float:
+    # math.log2 accepts ints far beyond float range
+    return math.log2(abs(value)) if value else -math.inf
+
+
+class _Estimator:
+    """Abstract interpretation over ``(is_int, log2 upper bound)`` pairs."""
+
+    def __init__(self, variables: dict):
+        self.variables = variables
+
+    def bound(self, node):
+        if isinstance(node, Num):
+            return isinstance(node.value, int), _log2(node.value)
+        if isinstance(node, Name):
+            value = self.variables.get(node.id, 1.0)    # constants (π, e) are floats
+            sized = isinstance(value, (int, float, decimal.Decimal, Fraction))    # and not arrays
+            return isinstance(value, int), _log2(value) if sized else 0.0
+        if isinstance(node, UnaryOp):
+            return self.bound(node.operand)
+        if isinstance(node, Postfix):
+            is_int, size = self.bound(node.operand)
+            if node.op == "%":
+                return False, size
+            return self.factorial(size)
+        if isinstance(node, BinOp):
+            return self.binop(node.op, self.bound(node.left), self.bound(node.right))
+        if isinstance(node, Call):
+            args = [self.bound(a) for a in node.args]
+            if node.func == "factorial" and args:
+                return self.factorial(args[0][1])
+            if node.func == "pow" and len(args) == 2:
+                return self.binop("^", *args)
+            if node.func in ("nPr", "nCr") and len(args) == 2:
+                return self.combinatorial(node.func, args[0][1], args[1][1])
+            if node.func == "catalan" and args:
+                # C(2n, n) / (n+1) < 4^n
+                return self.combinatorial("nCr", args[0][1] + 1, args[0][1])
+            if node.func == "multinomial" and args:
+                return self.multinomial([size for _, size in args])
+            if node.func in ("stirling1", "stirling2") and len(args) == 2:
+                return self.stirling(node.func, args[0][1], args[1][1])
+            if node.func == "abs" and args:
+                return args[0]
+            return False, 0.0
+        return False, 0.0
+
+    @staticmethod
+    def binop(op, left, right):
+        (l_int, l_size), (r_int, r_size) = left, right
+        is_int = l_int and r_int and op != "/"
+        if op in ("+", "-"):
+            size = max(l_size, r_size) + 1
+        elif op == "*":
+            size = l_size + r_size
+        elif op == "/":
+            size = l_size - r_size if r_size > -math.inf else l_size
+        else:  # "^": |a|^b ≤ 2^(log2|a| · 2^log2 b)
+            exponent = 2.0 ** min(r_size, 1024) if r_size < 1024 else math.inf
+            size = l_size * exponent if l_size > 0 else 0.0
+            if not is_int:
+                return False, size
+        if is_int and size > MAX_RESULT_BITS:
+            raise TooExpensive(f"result over {MAX_RESULT_BITS:,} bits")
+        return is_int, size
+
+    @staticmethod
+    def factorial(size):
+        if size > math.log2(MAX_FACTORIAL):
+            raise TooExpensive(f"factorial above {MAX_FACTORIAL:,}")
+        n = 2.0 ** size if size > -math.inf else 0.0
+        return True, n * math.log2(n) if n > 1 else 0.0
+
+    @staticmethod
+    def combinatorial(func, n_size, r_size):
+        # both are O(r) products (nCr over its smaller side); nPr is limited by its result size
+        limit = math.log2(MAX_FACTORIAL)
+        if func == "nCr" and min(n_size, r_size) > limit:
+            raise TooExpensive(f"nCr with r above {MAX_FACTORIAL:,}")
+        n_bits = max(n_size, 0.0)
+        r = 2.0 ** min(r_size, n_size)
+        size = r * n_bits if func == "nPr" else min(2.0 ** min(n_bits, 1024), r * n_bits)
+        if size > MAX_RESULT_BITS:
+            raise TooExpensive(f"result over {MAX_RESULT_BITS:,} bits")
+        return True, size
+
+    @staticmethod
+    def multinomial(sizes):
+        # a product of binomials C(k1+...+ki, ki); the work is in everything but the largest k
+        ks = sorted(2.0 ** min(size, 1024) if size > -math.inf else 0.0 for size in sizes)
+        rest, total = sum(ks[:-1]), sum(ks)
+        if rest > MAX_FACTORIAL:
+            raise TooExpensive(f"multinomial with more than {MAX_FACTORIAL:,} in the smaller parts")
+        size = rest * math.log2(total) if total > 1 else 0.0
+        if size > MAX_RESULT_BITS:
+            raise TooExpensive(f"result over {MAX_RESULT_BITS:,} bits")
+        return True, size
+
+    @staticmethod
+    def stirling(func, n_size, k_size):
+        n = 2.0 ** min(n_size, 1024) if n_size > -math.inf else 0.0
+        k = 2.0 ** min(k_size, n_size, 1024) if k_size > -math.inf else 0.0
+        if func == "stirling1" and n > MAX_STIRLING1:
+            raise TooExpensive(f"stirling1 with n above {MAX_STIRLING1:,}")
+        # S1(n, k) ≤ n!, S2(n, k) ≤ k^n
+        size = n * math.log2(n) if func == "stirling1" and n > 1 else n * math.log2(max(k, 1.0))
+        if func == "stirling2" and k * size > MAX_STIRLING2_WORK:
+            raise TooExpensive("stirling2 with n·k too large")
+        if size > MAX_RESULT_BITS:
+            raise TooExpensive(f"result over {MAX_RESULT_BITS:,} bits")
+        return True, size
+
+
+def check_cost(tree, variables: dict = None):
+    """Raise :class:`TooExpensive` if ``tree`` is obviously too costly to evaluate."""
+    _Estimator(variables or {}).bound(tree)
+
+
+def result_bits(tree, variables: dict = None) -> float:
+    """Upper bound on ``log2|value|`` of ``tree``; raises like :func:`check_cost`."""
+    return _Estimator(variables or {}).bound(tree)[1]
@@ -0,0 +1,262 @@
+"""MATRIX and VECTOR modes: MatA–MatD and VctA–VctD as NumPy arrays.
+
+Matrices are 2-D and vectors 1-D float64 arrays.  They are ordinary
+variables of the expression language.  The compiler sends any expression
+that names one of them, or calls det/trn/inv/dot/cross/eig/identity, here
+(see ``compiler.uses_arrays``).  Those expressions get this module's
+function table, and its operators in place of Python's, with the device's
+rules:
+
+* ``×`` is the matrix product; vector × vector is the cross product, and a
+  scalar scales;
+* ``+``/``−`` need equal shapes, ``÷`` only divides by a scalar;
+* ``^n`` is the matrix power of a square matrix, so ``MatA^-1`` is its inverse.
+
+A shape mismatch is a "Dimension ERROR", a singular matrix a "Math ERROR".
+
+Arrays are kept in an :class:`ArrayStore`, not in session state.  The store
+holds each distinct array once, read-only, keyed by a hash of its contents.
+A session holds :class:`ArrayRef` handles, and an array is freed when its
+last handle goes.  So a 500×500 matrix costs 2 MB once, however many
+reruns, sessions or ``MatAns`` copies refer to it.
+"""
+import hashlib
+import math
+import threading
+import weakref
+
+import numpy as np
+
+from . import metrics
+from .compiler import FUNCTIONS as SCALAR_FUNCTIONS
+from .compiler import MODES
+from .parser import CalcError
+
+MATRICES = ("MatA", "MatB", "MatC", "MatD")
+VECTORS = ("VctA", "VctB", "VctC", "VctD")
+ANSWERS = {2: "MatAns", 1: "VctAns"}        # where an array result goes, by number of dimensions
+MAX_DIM = 1000                              # rows, columns or vector length
+
+DIMENSION_ERROR = "Dimension ERROR"
+
+
+def as_array(value) -> np.ndarray:
+    """``value`` as a C-contiguous float64 (or complex128) vector or matrix, within :data:`MAX_DIM`."""
+    try:
+        # complex stays complex (eig of a rotation): float would drop the imaginary parts
+        array = np.ascontiguousarray(value, dtype=complex if np.iscomplexobj(value) else float)
+    except (TypeError, ValueError):
+        raise CalcError("Matrix cells must be numbers") from None
+    if array.ndim not in (1, 2) or not array.size:
+        raise CalcError(DIMENSION_ERROR)
+    if max(array.shape) > MAX_DIM:
+        raise CalcError(f"More than {MAX_DIM:,} rows or columns")
+    return array
+
+
+def summary(array: np.ndarray) -> str:
+    """One line for the display and history: the cells if few, else the shape."""
+    if array.size <= 16:
+        cell = "{:.10g}".format
+        return np.array2string(array, separator=", ", max_line_width=10**6,
+                               formatter={"float_kind": cell, "complex_kind": cell}).replace("\n", "")
+    return "×".join(map(str, array.shape))
+
+
+# ───────────────────────── OPERATORS ─────────────────────────
+def _is_array(value) -> bool:
+    return isinstance(value, np.ndarray)
+
+
+def _is_square(value) -> bool:
+    return _is_array(value) and value.ndim == 2 and value.shape[0] == value.shape[1]
+
+
+def _same_shape(a, b):
+    if _is_array(a) or _is_array(b):
+        if not (_is_array(a) and _is_array(b) and a.shape == b.shape):
+            raise CalcError(DIMENSION_ERROR)
+
+
+def _add(a, b):
+    _same_shape(a, b)
+    return a + b
+
+
+def _sub(a, b):
+    _same_shape(a, b)
+    return a - b
+
+
+def _mul(a, b):
+    if not (_is_array(a) and _is_array(b)):
+        return a * b                        # scalars, or a scalar times an array
+    if a.ndim == b.ndim == 1:
+        return _cross(a, b)
+    if a.shape[-1] != b.shape[0]:
+        raise CalcError(DIMENSION_ERROR)
+    return a @ b
+
+
+def _div(a, b):
+    if _is_array(b):
+        raise CalcError(DIMENSION_ERROR)
+    return a / b
+
+
+def _pow(a, b):
+    if not (_is_array(a) or _is_array(b)):
+        return a ** b
+    if not _is_square(a) or _is_array(b) or b != int(b):
+        raise CalcError(DIMENSION_ERROR)
+    return np.linalg.matrix_power(a, int(b))
+
+
+OPERATORS = {"add": _add, "sub": _sub, "mul": _mul, "div": _div, "pow": _pow,
+             "neg": lambda a: -a, "pos": lambda a: +a}
+
+
+# ───────────────────────── FUNCTIONS ─────────────────────────
+def _square(m) -> np.ndarray:
+    if not _is_square(m):
+        raise CalcError(DIMENSION_ERROR)
+    return m
+
+
+def _vectors(a, b, size: int = None):
+    if not (_is_array(a) and _is_array(b) and a.ndim == b.ndim == 1 and len(a) == len(b)):
+        raise CalcError(DIMENSION_ERROR)
+    if size is not None and len(a) != size:
+        raise CalcError(DIMENSION_ERROR)
+
+
+def _det(m) -> float:
+    with np.errstate(all="ignore"):
+        value = float(np.linalg.det(_square(m)))
+    if not math.isfinite(value):
+        raise OverflowError("det")          # → Math ERROR, like a scalar overflow
+    return value
+
+
+def _inv(m) -> np.ndarray:
+    return np.linalg.inv(_square(m))        # singular: LinAlgError, a ValueError → Math ERROR
+
+
+def _trn(m) -> np.ndarray:
+    if not _is_array(m):
+        raise CalcError(DIMENSION_ERROR)
+    return np.ascontiguousarray(m.T)
+
+
+def _dot(a, b) -> float:
+    _vectors(a, b)
+    return float(np.dot(a, b))
+
+
+def _cross(a, b) -> np.ndarray:
+    _vectors(a, b, 3)
+    return np.cross(a, b)
+
+
+def _eig(m) -> np.ndarray:
+    """Eigenvalues, largest first; complex only if some really are."""
+    m = _square(m)
+    if np.array_equal(m, m.T):
+        return np.linalg.eigvalsh(m)[::-1]  # symmetric: real, and several times faster
+    values = np.linalg.eigvals(m)
+    if np.allclose(values.imag, 0.0, atol=1e-12 * max(1.0, np.abs(values).max())):
+        values = values.real
+    return values[np.argsort(-values.real, kind="stable")]
+
+
+def _identity(n) -> np.ndarray:
+    if _is_array(n) or n != int(n) or not 1 <= n <= MAX_DIM:
+        raise CalcError(DIMENSION_ERROR)
+    return np.eye(int(n))
+
+
+def _abs(value):
+    # |vector| is its length, as on the device; matrices and scalars go cell by cell
+    if _is_array(value) and value.ndim == 1:
+        return float(np.linalg.norm(value))
+    return np.abs(value) if _is_array(value) else abs(value)
+
+
+FUNCTIONS = {
+    mode: {
+        **SCALAR_FUNCTIONS[mode],
+        "abs": _abs, "det": _det, "inv": _inv, "trn": _trn,
+        "dot": _dot, "cross": _cross, "eig": _eig, "identity": _identity,
+    }
+    for mode in MODES
+}
+
+
+# ───────────────────────── ARRAY STORE ─────────────────────────
+class ArrayRef:
+    """A handle on an array in an :class:`ArrayStore`; small enough for session state."""
+    __slots__ = ("key", "shape", "_store", "__weakref__")
+
+    def __init__(self, store: "ArrayStore", key: str, shape: tuple):
+        self.key = key
+        self.shape = shape
+        self._store = store
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._store.get(self.key)
+
+    def __repr__(self):
+        return f"ArrayRef({self.key[:8]}, {'×'.join(map(str, self.shape))})"
+
+
+class ArrayStore:
+    """Process-wide, content-addressed store of read-only arrays with handle counting."""
+
+    def __init__(self):
+        self._entries = {}               # key → [array, live handles]
+        self._lock = threading.Lock()
+
+    def put(self, value) -> ArrayRef:
+        """Store ``value`` (copied once, unless an equal array is already stored)."""
+        array = as_array(value)
+        digest = hashlib.blake2b(array.tobytes(), digest_size=16)
+        digest.update(repr((array.shape, array.dtype.str)).encode())
+        key = digest.hexdigest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if array is value or array.base is not None:
+                    array = array.copy()     # never share the caller's buffer
+                array.flags.writeable = False
+                entry = self._entries[key] = [array, 0]
+            entry[1] += 1
+        ref = ArrayRef(self, key, entry[0].shape)
+        weakref.finalize(ref, self._release, key)
+        return ref
+
+    def get(self, key: str) -> np.ndarray:
+        return self._entries[key][0]
+
+    def _release(self, key: str):
+        with self._lock:
+            entry = self._entries[key]
+            entry[1] -= 1
+            if not entry[1]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry[0].nbytes for entry in list(self._entries.values()))
+
+
+STORE = ArrayStore()
+
+
+@metrics.REGISTRY.collector
+def _store_metrics():
+    yield "fxcalc_array_store_arrays", "gauge", "Distinct matrices/vectors stored.", {"": len(STORE)}
+    yield "fxcalc_array_store_bytes", "gauge", "Bytes held by stored matrices/vectors.", {"": STORE.nbytes}
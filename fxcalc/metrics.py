@@ -0,0 +1,320 @@
+"""Hot-path instrumentation: phase timers, counters, histograms, slow-run stacks.
+
+Everything is process-wide and thread-safe.  Recording costs about a
+microsecond per phase: one ``perf_counter`` pair and a bisect under a lock.
+The metrics are rendered in the Prometheus text format, and can be exported
+two ways, both off by default:
+
+* ``FXCALC_METRICS_FILE=/var/lib/node_exporter/fxcalc.prom`` rewrites that file
+  every ``FXCALC_METRICS_INTERVAL`` seconds (node_exporter textfile collector);
+* ``FXCALC_METRICS_PORT=9464`` serves ``/metrics`` on localhost.
+
+``FXCALC_PROFILE_SLOW_MS=250`` turns on the sampling profiler.  While a run
+(script or fragment) is in progress its thread is sampled every
+``FXCALC_PROFILE_INTERVAL_MS``.  A run that ends up slower than the
+threshold has its stacks written to ``FXCALC_PROFILE_DIR``, in the collapsed
+``frame;frame;frame count`` format that flamegraph.pl and speedscope read.
+"""
+import bisect
+import collections
+import functools
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds; keypresses live between a millisecond and a second
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+# ───────────────────────── REGISTRY ─────────────────────────
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Counters and histograms keyed by ``(name, label value)``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = collections.defaultdict(float)
+        self._histograms = collections.defaultdict(_Histogram)
+        self._help = {}
+        self._collectors = []        # callables yielding (name, kind, help, {label: value})
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def inc(self, name: str, label: str = "", amount: float = 1.0):
+        with self._lock:
+            self._counters[name, label] += amount
+
+    def observe(self, name: str, label: str, value: float):
+        with self._lock:
+            self._histograms[name, label].observe(value)
+
+    def collector(self, fn):
+        """Register ``fn`` to report values read at render time (e.g. cache stats)."""
+        self._collectors.append(fn)
+        return fn
+
+    def snapshot(self) -> dict:
+        """Counters and histogram sums/counts as plain numbers, for the debug panel."""
+        with self._lock:
+            out = {f"{name}{{{label}}}" if label else name: value
+                   for (name, label), value in self._counters.items()}
+            for (name, label), hist in self._histograms.items():
+                out[f"{name}_count{{{label}}}"] = hist.count
+                out[f"{name}_sum{{{label}}}"] = hist.sum
+        return out
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format."""
+        lines = []
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h.counts), h.sum, h.count))
+                                for key, h in self._histograms.items())
+        seen = set()
+        for (name, label), value in counters:
+            if name not in seen:
+                seen.add(name)
+                header(name, "counter")
+            lines.append(f"{name}{_labels(name, label)} {value:g}")
+        for (name, label), (counts, total, count) in histograms:
+            if name not in seen:
+                seen.add(name)
+                header(name, "histogram")
+            cumulative = 0
+            for bound, n in zip((*BUCKETS, "+Inf"), counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels(name, label, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(name, label)} {total:.9g}")
+            lines.append(f"{name}_count{_labels(name, label)} {count}")
+        for collect in self._collectors:
+            for name, kind, text, values in collect():
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for label, value in values.items():
+                    lines.append(f"{name}{_labels(name, label)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# the label key each metric family uses
+_LABEL_KEYS = {"fxcalc_phase_seconds": "phase", "fxcalc_runs_total": "scope",
+               "fxcalc_slow_runs_total": "scope", "fxcalc_eval_errors_total": "kind"}
+
+
+def _labels(name: str, label: str, le=None) -> str:
+    parts = []
+    if label:
+        parts.append(f'{_LABEL_KEYS.get(name, "label")}="{label}"')
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+REGISTRY = Registry()
+REGISTRY.describe("fxcalc_phase_seconds", "Wall time per phase (script, fragments, callbacks, eval).")
+REGISTRY.describe("fxcalc_runs_total", "Script and fragment executions, by scope.")
+REGISTRY.describe("fxcalc_keypresses_total", "Keypad button presses.")
+REGISTRY.describe("fxcalc_eval_errors_total", "Evaluations that ended in an error, by kind.")
+REGISTRY.describe("fxcalc_slow_runs_total", "Runs over the profiling threshold.")
+
+
+# ───────────────────────── RECORDING ─────────────────────────
+def inc(name: str, label: str = "", amount: float = 1.0):
+    REGISTRY.inc(name, label, amount)
+
+
+@contextmanager
+def phase(name: str, sink: dict = None):
+    """Time the block as ``fxcalc_phase_seconds{phase=name}``; also store it in ``sink``."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        REGISTRY.observe("fxcalc_phase_seconds", name, elapsed)
+        if sink is not None:
+            sink[name] = elapsed
+
+
+class Run:
+    """One script or fragment execution: counted, timed and (opt-in) profiled.
+
+    ``run = Run("script")`` at the top of the script and ``run.finish()`` at
+    the bottom; fragments use the :func:`timed_run` decorator instead.
+    """
+    __slots__ = ("scope", "sink", "t0", "samples")
+
+    def __init__(self, scope: str, sink: dict = None):
+        self.scope, self.sink = scope, sink
+        REGISTRY.inc("fxcalc_runs_total", scope)
+        self.samples = _PROFILER.begin() if _PROFILER else None
+        self.t0 = time.perf_counter()
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.t0
+        REGISTRY.observe("fxcalc_phase_seconds", self.scope, elapsed)
+        if self.sink is not None:
+            self.sink[self.scope] = elapsed
+        if self.samples is not None:
+            _PROFILER.end(self.samples, self.scope, elapsed)
+        return elapsed
+
+
+def timed_run(scope: str, sink=None):
+    """Decorator form of :class:`Run`; ``sink`` may be a callable returning the dict."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            run = Run(scope, sink() if callable(sink) else sink)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                run.finish()
+        return inner
+    return wrap
+
+
+# ───────────────────────── SAMPLING PROFILER ─────────────────────────
+class _Profiler:
+    """Samples the stacks of threads that are inside a :class:`Run`."""
+
+    def __init__(self, threshold: float, interval: float, directory: str):
+        self.threshold, self.interval, self.directory = threshold, interval, directory
+        self._active = {}            # thread id → Counters of collapsed stacks, one per open run
+        self._lock = threading.Lock()
+        self._thread = None
+        self._sequence = itertools.count()
+
+    def begin(self) -> collections.Counter:
+        samples = collections.Counter()
+        with self._lock:
+            # a list per thread: a fragment run inside the script run samples into both
+            self._active.setdefault(threading.get_ident(), []).append(samples)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="fxcalc-profiler", daemon=True)
+                self._thread.start()
+        return samples
+
+    def end(self, samples, scope: str, elapsed: float):
+        ident = threading.get_ident()
+        with self._lock:
+            runs = self._active.get(ident, [])
+            runs[:] = [run for run in runs if run is not samples]
+            if not runs:
+                self._active.pop(ident, None)
+        if elapsed >= self.threshold and samples:
+            REGISTRY.inc("fxcalc_slow_runs_total", scope)
+            os.makedirs(self.directory, exist_ok=True)
+            name = (f"{scope}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence)}"
+                    f"-{elapsed * 1e3:.0f}ms.folded")
+            with open(os.path.join(self.directory, name), "w", encoding="utf-8") as fh:
+                for stack, count in samples.most_common():
+                    fh.write(f"{stack} {count}\n")
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = {ident: list(runs) for ident, runs in self._active.items()}
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for ident, runs in active.items():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    collapsed = ";".join(reversed(stack))
+                    for samples in runs:
+                        samples[collapsed] += 1
+
+
+def _profiler_from_env():
+    threshold = os.environ.get("FXCALC_PROFILE_SLOW_MS")
+    if not threshold:
+        return None
+    return _Profiler(float(threshold) / 1e3,
+                     float(os.environ.get("FXCALC_PROFILE_INTERVAL_MS", "5")) / 1e3,
+                     os.environ.get("FXCALC_PROFILE_DIR",
+                                    os.path.join(tempfile.gettempdir(), "fxcalc-profiles")))
+
+
+_PROFILER = _profiler_from_env()
+
+
+# ───────────────────────── EXPORT ─────────────────────────
+def write_textfile(path: str):
+    """Atomically replace ``path`` with the current metrics."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(REGISTRY.render())
+    os.replace(tmp, path)
+
+
+def _http_server():
+    # http.server costs ~25 ms to import; only pay for it when the endpoint is on
+    import http.server
+
+    class _Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+    return http.server.ThreadingHTTPServer, _Handler
+
+
+def start_exporters() -> list:
+    """Start the exporters configured in the environment; call once per process."""
+    started = []
+    path = os.environ.get("FXCALC_METRICS_FILE")
+    if path:
+        interval = float(os.environ.get("FXCALC_METRICS_INTERVAL", "15"))
+
+        def loop():
+            while True:
+                write_textfile(path)
+                time.sleep(interval)
+        threading.Thread(target=loop, name="fxcalc-metrics-file", daemon=True).start()
+        started.append(f"file:{path}")
+    port = os.environ.get("FXCALC_METRICS_PORT")
+    if port:
+        server_class, handler = _http_server()
+        server = server_class(("127.0.0.1", int(port)), handler)
+        threading.Thread(target=server.serve_forever, name="fxcalc-metrics-http", daemon=True).start()
+        started.append(f"http://127.0.0.1:{server.server_port}/metrics")
+    return started
@@ -0,0 +1,293 @@
+"""Tokenizer and recursive-descent parser for calculator display text.
+
+The display holds what the keypad typed ("sin(30)×2", "√(2)^2", "5!", "Ans÷3",
+"∫(x^2,0,1)", "d/dx(sin(x),30)"),
+plus the Python-ish spellings older builds inserted ("math.factorial(", "10**").
+Everything is parsed into a small immutable AST that the compiler turns into
+a callable once per expression.
+"""
+import re
+from dataclasses import dataclass
+from typing import Tuple, Union
+
+
+class CalcError(ValueError):
+    """Raised for anything the calculator would show as an error."""
+
+
+# ───────────────────────── AST ─────────────────────────
+@dataclass(frozen=True)
+class Num:
+    value: Union[int, float]     # or Decimal/Fraction in the precision modes
+
+
+@dataclass(frozen=True)
+class Name:
+    id: str                      # constant ("pi", "e") or variable ("Ans", "x")
+
+
+@dataclass(frozen=True)
+class UnaryOp:
+    op: str                      # "-" | "+"
+    operand: "Node"
+
+
+@dataclass(frozen=True)
+class BinOp:
+    op: str                      # "+" | "-" | "*" | "/" | "^"
+    left: "Node"
+    right: "Node"
+
+
+@dataclass(frozen=True)
+class Postfix:
+    op: str                      # "!" | "%"
+    operand: "Node"
+
+
+@dataclass(frozen=True)
+class Call:
+    func: str                    # canonical function name
+    args: Tuple["Node", ...]
+
+
+Node = Union[Num, Name, UnaryOp, BinOp, Postfix, Call]
+
+# ───────────────────────── NAMES ─────────────────────────
+# Every spelling the apps put on the display, mapped to one canonical name.
+FUNCTION_ALIASES = {
+    "sin": "sin", "cos": "cos", "tan": "tan",
+    "asin": "asin", "acos": "acos", "atan": "atan",
+    "log": "log", "log10": "log", "ln": "ln",
+    "exp": "exp", "sqrt": "sqrt", "abs": "abs", "pow": "pow",
+    "fact": "factorial", "factorial": "factorial",
+    "nPr": "nPr", "nCr": "nCr",
+    "multinomial": "multinomial", "catalan": "catalan",
+    "stirling1": "stirling1", "stirling2": "stirling2",
+    "∫": "integral", "integral": "integral", "d/dx": "derivative", "derivative": "derivative",
+    # MATRIX / VECTOR mode (fxcalc.matrix)
+    "det": "det", "Det": "det", "trn": "trn", "Trn": "trn", "inv": "inv",
+    "dot": "dot", "DotP": "dot", "cross": "cross", "eig": "eig",
+    "identity": "identity", "Identity": "identity",
+}
+
+CONSTANT_ALIASES = {"pi": "pi", "π": "pi", "e": "e"}
+
+# STAT variables (fxcalc.stat) typed with glyphs that aren't identifier characters
+VARIABLE_ALIASES = {"x\u0304": "xbar", "y\u0304": "ybar", "\u0233": "ybar", "σx": "sigmax", "σy": "sigmay"}
+
+# Display glyphs that are just another spelling of an ASCII operator.
+_OPERATOR_ALIASES = {"×": "*", "÷": "/", "−": "-", "**": "^"}
+
+MAX_DEPTH = 100     # nesting of the tree: operands of operators, function calls
+MAX_BRACKETS = 50   # "(" and "f(" open at once; each costs several parser frames
+
+# ───────────────────────── TOKENIZER ─────────────────────────
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<num>\d+\.?\d*|\.\d+)
+  | (?P<name>d/dx|[xy]\u0304|\u0233|σ[xy]|(?:math\.)?[A-Za-z][A-Za-z0-9_]*|[π∫])
+  | (?P<op>\*\*|[-+*/^%!√(),×÷−])
+""", re.VERBOSE)
+
+
+def scan(text: str, pos: int, tokens: list, starts: list, number: type = float):
+    """Append the tokens of ``text[pos:]`` to ``tokens`` and their offsets to ``starts``.
+
+    Integers are ints; other numbers are ``number(text)``: floats, or
+    Decimals/Fractions in the precision modes (``0.1`` exactly).
+    """
+    size = len(text)
+    while pos < size:
+        m = _TOKEN_RE.match(text, pos)
+        if m is None:
+            raise CalcError(f"Unexpected character {text[pos]!r}")
+        kind = m.lastgroup
+        value = m.group()
+        pos = m.end()
+        if kind == "ws":
+            continue
+        starts.append(m.start())
+        if kind == "num":
+            if text.startswith(".", pos):       # "1.2.3", "1..2": not a number the device accepts
+                raise CalcError(f"Malformed number {text[m.start():pos + 1]!r}")
+            tokens.append(("num", int(value) if value.isdigit() else number(value)))
+        elif kind == "name":
+            tokens.append(("name", value[5:] if value.startswith("math.") else value))
+        else:
+            tokens.append(("op", _OPERATOR_ALIASES.get(value, value)))
+
+
+def tokenize(text: str, number: type = float):
+    """Split display text into ``(kind, value)`` pairs ending with ``("end", "")``."""
+    tokens = []
+    scan(text, 0, tokens, [], number)
+    tokens.append(("end", ""))
+    return tokens
+
+
+# ───────────────────────── PARSER ─────────────────────────
+# Grammar (lowest to highest precedence):
+#   expr    := term (("+" | "-") term)*
+#   term    := unary (("*" | "/") unary | <implicit ×> power)*
+#   unary   := ("-" | "+") unary | power
+#   power   := postfix ("^" unary)?            right-associative, like Python
+#   postfix := atom ("!" | "%")*
+#   atom    := number | name | func "(" args ")" | "(" expr ")" | "√" postfix
+# Parentheses still open at the end of the input are closed automatically,
+# as on the real device.
+class _Parser:
+    __slots__ = ("tokens", "pos", "brackets")
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.brackets = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def advance(self):
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def accept(self, op: str) -> bool:
+        if self.tokens[self.pos] == ("op", op):
+            self.pos += 1
+            return True
+        return False
+
+    def close_paren(self):
+        # Unclosed "(" at the very end of the input is fine; anywhere else it isn't.
+        if not self.accept(")") and self.peek()[0] != "end":
+            raise CalcError("Missing ')'")
+
+    def bracketed(self, parse):
+        if self.brackets >= MAX_BRACKETS:
+            raise CalcError("Syntax ERROR")
+        self.brackets += 1
+        try:
+            return parse()
+        finally:
+            self.brackets -= 1
+
+    def starts_atom(self) -> bool:
+        kind, value = self.peek()
+        return kind in ("num", "name") or value in ("(", "√")
+
+    def parse(self) -> Node:
+        if self.peek()[0] == "end":
+            raise CalcError("Empty expression")
+        node = self.expr()
+        kind, value = self.peek()
+        if kind != "end":
+            raise CalcError(f"Unexpected {value!r}")
+        return node
+
+    def expr(self) -> Node:
+        node = self.term()
+        while True:
+            kind, value = self.peek()
+            if kind == "op" and value in ("+", "-"):
+                self.pos += 1
+                node = BinOp(value, node, self.term())
+            else:
+                return node
+
+    def term(self) -> Node:
+        node = self.unary()
+        while True:
+            kind, value = self.peek()
+            if kind == "op" and value in ("*", "/"):
+                self.pos += 1
+                node = BinOp(value, node, self.unary())
+            elif self.starts_atom():
+                if kind == "num" and self.tokens[self.pos - 1][0] == "num":
+                    raise CalcError("Missing operator")  # "5 5" is neither 55 nor 25
+                node = BinOp("*", node, self.power())    # 2π, 3(4+1), 2sin(30)
+            else:
+                return node
+
+    def unary(self) -> Node:
+        kind, value = self.peek()
+        if kind == "op" and value in ("-", "+"):
+            self.pos += 1
+            return UnaryOp(value, self.unary())
+        return self.power()
+
+    def power(self) -> Node:
+        node = self.postfix()
+        if self.accept("^"):
+            return BinOp("^", node, self.unary())
+        return node
+
+    def postfix(self) -> Node:
+        node = self.atom()
+        while True:
+            kind, value = self.peek()
+            if kind == "op" and value in ("!", "%"):
+                self.pos += 1
+                node = Postfix(value, node)
+            else:
+                return node
+
+    def atom(self) -> Node:
+        kind, value = self.advance()
+        if kind == "num":
+            return Num(value)
+        if kind == "name":
+            if value in FUNCTION_ALIASES and self.accept("("):
+                return Call(FUNCTION_ALIASES[value], self.bracketed(self.args))
+            if value in FUNCTION_ALIASES:
+                raise CalcError(f"{value} needs '('")
+            return Name(CONSTANT_ALIASES.get(value) or VARIABLE_ALIASES.get(value, value))
+        if value == "(":
+            node = self.bracketed(self.expr)
+            self.close_paren()
+            return node
+        if value == "√":
+            return Call("sqrt", (self.postfix(),))
+        raise CalcError("Unexpected end of input" if kind == "end" else f"Unexpected {value!r}")
+
+    def args(self) -> Tuple[Node, ...]:
+        args = [self.expr()]
+        while self.accept(","):
+            args.append(self.expr())
+        self.close_paren()
+        return tuple(args)
+
+
+def _children(node):
+    if isinstance(node, BinOp):
+        return node.left, node.right
+    if isinstance(node, (UnaryOp, Postfix)):
+        return (node.operand,)
+    if isinstance(node, Call):
+        return node.args
+    return ()
+
+
+def _checked(parser: _Parser) -> Node:
+    # everything downstream (folding, cost check, codegen) walks trees recursively
+    try:
+        tree = parser.parse()
+    except RecursionError:
+        raise CalcError("Syntax ERROR") from None
+    stack = [(tree, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if depth > MAX_DEPTH:
+            raise CalcError("Syntax ERROR")
+        stack.extend((child, depth + 1) for child in _children(node))
+    return tree
+
+
+def parse(text: str, number: type = float) -> Node:
+    """Parse display text into an AST, raising :class:`CalcError` on bad input."""
+    return _checked(_Parser(tokenize(text, number)))
+
+
+def parse_tokens(tokens) -> Node:
+    """:func:`parse` for an already tokenized display (without the end marker)."""
+    return _checked(_Parser([*tokens, ("end", "")]))
@@ -0,0 +1,554 @@
+"""Precision modes: the expression language in Decimal or exact Fraction arithmetic.
+
+``Precision(DECIMAL, 50)`` evaluates with 50 significant digits, and
+``Precision(FRACTION)`` keeps rationals exact (``1÷3+1÷6`` is ``1/2``).
+The compiler gets the tables below in place of the float ones (see
+:func:`system`):
+
+* literals are read exactly: ``0.1`` is 1/10, not the nearest double;
+* +, − and × are Python's own operators, run under the mode's
+  :class:`decimal.Context`, so ints stay exact ints.  ÷ and ^ come from
+  the operator table, because int ÷ int would give a float;
+* sin, cos, tan, atan, ln, log, exp and x^y (for non-integral y) are
+  computed in integer fixed point with :data:`GUARD_DIGITS` extra digits,
+  then rounded once.  They start from the float result where there is one
+  and correct it, and are 2–5× faster than libmpdec's own ln/exp/power.
+  In DEG, multiples of 90° are exact: sin(180) is 0 and tan(90) a Math
+  ERROR.  √ is libmpdec's;
+* π, e and ln 10 are computed once per precision and cached for the
+  process.
+
+In Fraction mode, results that are rarely rational are computed as
+Decimals to ``digits`` digits and then converted exactly: sin, ln, and
+powers without an exact root (``(8÷27)^(1÷3)`` is ``2/3``).  ∫ and d/dx stay
+float-only.
+"""
+import decimal
+import math
+import operator
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+from typing import Callable, NamedTuple
+
+from . import combinatorics
+from .compiler import MODES
+from .limits import MAX_RESULT_BITS, TooExpensive
+from .parser import CalcError
+
+DECIMAL, FRACTION = "Decimal", "Fraction"
+KINDS = (DECIMAL, FRACTION)
+DIGIT_RANGE = (10, 100)
+DEFAULT_DIGITS = 50
+GUARD_DIGITS = 10                # extra digits the series work with
+MAX_ARGUMENT_DIGITS = 1000       # sin(10^1000) needs π to 1000 more digits; larger is an error
+MAX_ROOT = 100                   # x^(p/q) looks for an exact q-th root up to this q
+
+
+class Precision(NamedTuple):
+    """A precision mode; in Fraction mode ``digits`` is that of irrational results."""
+    kind: str = DECIMAL
+    digits: int = DEFAULT_DIGITS
+
+    def check(self) -> "Precision":
+        if self.kind not in KINDS:
+            raise ValueError(f"Unknown precision {self.kind!r}")
+        low, high = DIGIT_RANGE
+        if not low <= self.digits <= high:
+            raise ValueError(f"{self.kind} takes {low}–{high} digits")
+        return self
+
+    def __str__(self):
+        return f"Dec {self.digits}" if self.kind == DECIMAL else "Frac"
+
+
+@lru_cache(maxsize=None)
+def _context(prec: int) -> decimal.Context:
+    return decimal.Context(prec=prec, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+
+# ───────────────────────── FIXED POINT ─────────────────────────
+# The kernels work on ints scaled by 2^bits: Python's int arithmetic at a few
+# hundred bits is several times cheaper than Decimal's, and libmpdec's
+# correctly rounded ln/exp/power cost 35–165 µs at 50 digits.  ``bits`` holds
+# the work digits plus HALVINGS and a margin, so results are good to well
+# past the digits they are rounded to.
+_EXACT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+_LOG2_10 = math.log2(10)
+_SQRT10 = Decimal("3.1622776601683793")
+HALVINGS = 16                    # exp's argument is halved this often, and the result squared back
+MAX_EXP_DIGITS = 6               # exp(x) for |x| ≥ 10^6 over- or underflows: libmpdec reports it
+
+
+def _bits(work: int) -> int:
+    return int(work * _LOG2_10) + 16 + HALVINGS
+
+
+@lru_cache(maxsize=None)
+def _scale(bits: int) -> Decimal:
+    return Decimal(1 << bits)
+
+
+def _fixed(x, bits: int) -> int:
+    # a Decimal (or int) as fixed point, truncated
+    return int(_EXACT.multiply(x, _scale(bits)))
+
+
+def _unfixed(f: int, bits: int, work: int) -> Decimal:
+    return _context(work).divide(Decimal(f), _scale(bits))
+
+
+def _float_fixed(v: float, bits: int) -> int:
+    # a float as fixed point, with all its 53 bits whatever its size
+    mantissa, exponent = math.frexp(v)
+    shift = bits + exponent - 53
+    m = int(math.ldexp(mantissa, 53))
+    return m << shift if shift >= 0 else m >> -shift
+
+
+def _odd_series(t: int, bits: int, alternate: bool) -> int:
+    """atan (``alternate``) or atanh of a small ``t/2^bits``: t ± t³/3 + t⁵/5 …"""
+    sign, t = (-1, -t) if t < 0 else (1, t)
+    t2 = t * t >> bits
+    total = power = t
+    n, negative = 1, alternate
+    while power:
+        power = power * t2 >> bits
+        n += 2
+        total += -(power // n) if negative else power // n
+        negative = alternate and not negative
+    return sign * total
+
+
+def _exp_fixed(r: int, bits: int) -> int:
+    """e^(r/2^bits) for 0 ≤ r/2^bits < ln 10: a Taylor series of r/2^HALVINGS, squared back."""
+    r >>= HALVINGS
+    total = term = 1 << bits
+    n = 0
+    while term:
+        n += 1
+        term = (term * r >> bits) // n
+        total += term
+    for _ in range(HALVINGS):
+        total = total * total >> bits
+    return total
+
+
+def _sin_fixed(r: int, bits: int) -> int:
+    """sin(r/2^bits) for 0 ≤ r/2^bits ≤ π/4, by its Taylor series."""
+    r2 = r * r >> bits
+    total = term = r
+    n, negative = 1, True
+    while term:
+        n += 2
+        term = (term * r2 >> bits) // ((n - 1) * n)
+        total += -term if negative else term
+        negative = not negative
+    return total
+
+
+# ───────────────────────── CONSTANTS ─────────────────────────
+def _arctan_inverse(x: int, one: int) -> int:
+    # atan(1/x) · one in integer fixed point
+    total = term = one // x
+    x2, n, sign = x * x, 1, 1
+    while term:
+        term //= x2
+        n += 2
+        sign = -sign
+        total += sign * (term // n)
+    return total
+
+
+def _atanh_inverse(x: int, one: int) -> int:
+    # atanh(1/x) · one in integer fixed point
+    total = term = one // x
+    x2, n = x * x, 1
+    while term:
+        term //= x2
+        n += 2
+        total += term // n
+    return total
+
+
+@lru_cache(maxsize=64)
+def _pi_fixed(bits: int) -> int:
+    one = 1 << bits
+    return 4 * (4 * _arctan_inverse(5, one) - _arctan_inverse(239, one))     # Machin
+
+
+@lru_cache(maxsize=64)
+def _ln10_fixed(bits: int) -> int:
+    one = 1 << bits
+    return 6 * _atanh_inverse(3, one) + 2 * _atanh_inverse(9, one)         # 3·ln 2 + ln(5/4)
+
+
+@lru_cache(maxsize=64)
+def pi(prec: int) -> Decimal:
+    """π to ``prec`` digits; computed once per precision."""
+    bits = _bits(prec)
+    return _unfixed(_pi_fixed(bits), bits, prec)
+
+
+@lru_cache(maxsize=64)
+def e(prec: int) -> Decimal:
+    """e to ``prec`` digits; computed once per precision."""
+    return _context(prec).exp(1)
+
+
+# ───────────────────────── EXP / LN ─────────────────────────
+def _exp_scaled(y: int, bits: int, work: int) -> Decimal:
+    # e^(y/2^bits) = 10^k · e^r, 0 ≤ r < ln 10
+    k, r = divmod(y, _ln10_fixed(bits))
+    return _context(work).scaleb(_unfixed(_exp_fixed(r, bits), bits, work), k)
+
+
+def _exp(x, work: int) -> Decimal:
+    x = Decimal(x)
+    if not x:
+        return Decimal(1)
+    if x.adjusted() >= MAX_EXP_DIGITS:
+        return _context(work).exp(x)
+    bits = _bits(work + max(0, x.adjusted() + 1))   # k·ln 10 must be good to the last digit of r
+    return _exp_scaled(_fixed(x, bits), bits, work)
+
+
+def _ln_fixed(x, work: int):
+    """``(f, bits)`` with ln x = f/2^bits to ``work`` significant digits.
+
+    x = m·10^k with 1/√10 ≤ m < √10.  ln m starts from the float log of m and
+    is corrected by 2·atanh((m − e^y)/(m + e^y)), which is tiny.
+    """
+    x = Decimal(x)
+    if x <= 0:
+        raise ValueError("ln of a number ≤ 0")
+    k = x.adjusted()
+    m = _context(work).scaleb(x, -k) if k else x
+    if m >= _SQRT10:
+        k, m = k + 1, m.scaleb(-1, _context(work))
+    extra = 0
+    if not k:                                   # ln m is all there is: keep its own digits when m ≈ 1
+        d = _EXACT.subtract(m, 1)
+        if not d:
+            return 0, 0
+        extra = max(0, -d.adjusted())
+    bits = _bits(work + extra)
+    one = 1 << bits
+    fm = _fixed(m, bits)
+    y = _float_fixed(math.log(float(m)), bits)
+    ey = _exp_fixed(y, bits) if y >= 0 else (one * one) // _exp_fixed(-y, bits)
+    t = ((fm - ey) << bits) // (fm + ey)
+    return y + 2 * _odd_series(t, bits, alternate=False) + k * _ln10_fixed(bits), bits
+
+
+def _ln(x, work: int) -> Decimal:
+    f, bits = _ln_fixed(x, work)
+    return _unfixed(f, bits, work)
+
+
+def _log10(x, work: int) -> Decimal:
+    f, bits = _ln_fixed(x, work)
+    return _unfixed((f << bits) // _ln10_fixed(bits), bits, work) if bits else Decimal(0)
+
+
+def _power(a, b, work: int):
+    """a^b for a > 0 and a non-integral b, as e^(b·ln a); None where libmpdec should decide."""
+    b = Decimal(b)
+    f, bits = _ln_fixed(a, work + max(0, b.adjusted() + 1))
+    if not bits:
+        return Decimal(1)
+    y = _fixed(b, bits) * f >> bits
+    if abs(y) >> bits >= 10 ** MAX_EXP_DIGITS:
+        return None
+    return _exp_scaled(y, bits, work)
+
+
+# ───────────────────────── TRIGONOMETRY ─────────────────────────
+def _rotation(x, work: int, degrees: bool):
+    """``(s, c, bits)``: sin x and cos x as fixed point; ``bits`` is 0 for exact multiples of 90°.
+
+    x is reduced to r + q·π/2 with |r| ≤ π/4.  In DEG that is exact, in
+    Decimal, so sin(180) is 0 and tan(90) an error.
+    """
+    x = Decimal(x)
+    extra = max(0, x.adjusted() + 1)
+    if extra > MAX_ARGUMENT_DIGITS:
+        raise ValueError("angle too large")
+    if degrees:
+        with decimal.localcontext(_context(work + extra)):
+            x %= 360                                 # exact: the quotient fits in the precision
+            q = int((x / 90).to_integral_value())
+            rest = x - 90 * q
+        if not rest:
+            s, c, bits = 0, 1, 0
+        else:
+            bits = _bits(work + max(0, -rest.adjusted()))  # sin of a tiny r keeps its own digits
+            r = _fixed(rest, bits) * _pi_fixed(bits) // 180 >> bits
+    else:
+        bits = _bits(work + extra + max(0, -x.adjusted()))
+        quarter = _pi_fixed(bits) >> 1
+        q, r = divmod(_fixed(x, bits) + (quarter >> 1), quarter)
+        r -= quarter >> 1
+    if bits:
+        s = _sin_fixed(abs(r), bits)
+        c = math.isqrt((1 << 2 * bits) - s * s)
+        if r < 0:
+            s = -s
+    for _ in range(q % 4):                           # sin(r + 90°) = cos r, cos(r + 90°) = −sin r
+        s, c = c, -s
+    return s, c, bits
+
+
+def _sin(x, work: int, degrees: bool):
+    s, _, bits = _rotation(x, work, degrees)
+    return _unfixed(s, bits, work)
+
+
+def _cos(x, work: int, degrees: bool):
+    _, c, bits = _rotation(x, work, degrees)
+    return _unfixed(c, bits, work)
+
+
+def _tan(x, work: int, degrees: bool):
+    s, c, _ = _rotation(x, work, degrees)
+    if not c:
+        raise ValueError("tan of an odd multiple of 90°")
+    return _context(work).divide(Decimal(s), Decimal(c))
+
+
+def _atan_fixed(x: Decimal, bits: int) -> int:
+    """atan x for |x| ≤ 1: the float atan y, plus atan((x·cos y − sin y)/(cos y + x·sin y))."""
+    one = 1 << bits
+    fx = _fixed(x, bits)
+    y = _float_fixed(math.atan(float(x)), bits)
+    s = _sin_fixed(abs(y), bits)
+    c = math.isqrt(one * one - s * s)
+    if y < 0:
+        s = -s
+    d = ((fx * c - s * one) << bits) // (c * one + fx * s)
+    return y + _odd_series(d, bits, alternate=True)
+
+
+def _atan(x, work: int) -> Decimal:
+    # radians
+    x = Decimal(x)
+    if not x:
+        return Decimal(0)
+    if x.copy_abs() > 1:
+        bits = _bits(work)
+        inverse = _atan_fixed(_context(work).divide(1, x), bits)
+        half_pi = _pi_fixed(bits) >> 1
+        return _unfixed((half_pi if x > 0 else -half_pi) - inverse, bits, work)
+    bits = _bits(work + max(0, -x.adjusted()))
+    return _unfixed(_atan_fixed(x, bits), bits, work)
+
+
+def _asin(x, work: int) -> Decimal:
+    with decimal.localcontext(_context(work)):
+        x = Decimal(x)
+        if x.copy_abs() > 1:
+            raise ValueError("asin outside [-1, 1]")
+        if x.copy_abs() == 1:
+            return (pi(work) / 2).copy_sign(x)
+        return _atan(x / (1 - x * x).sqrt(), work)
+
+
+def _acos(x, work: int) -> Decimal:
+    with decimal.localcontext(_context(work)):
+        return pi(work) / 2 - _asin(x, work)
+
+
+# ───────────────────────── TABLES ─────────────────────────
+def _float_only(name: str):
+    def call(*args):
+        raise CalcError(f"{name} needs Float precision")
+    return call
+
+
+def _decimal_functions(mode: str, digits: int) -> dict:
+    ctx, work, degrees = _context(digits), digits + GUARD_DIGITS, mode == "DEG"
+    to_degrees = _context(work).divide(180, pi(work))
+
+    def direct(fn):
+        return lambda x: ctx.plus(fn(x, work, degrees))
+
+    def plain(fn):
+        return lambda x: ctx.plus(fn(x, work))
+
+    def inverse(fn):
+        if degrees:
+            return lambda x: ctx.multiply(fn(x, work), to_degrees)
+        return lambda x: ctx.plus(fn(x, work))
+
+    return {
+        "sin": direct(_sin), "cos": direct(_cos), "tan": direct(_tan),
+        "asin": inverse(_asin), "acos": inverse(_acos), "atan": inverse(_atan),
+        "log": plain(_log10), "ln": plain(_ln), "exp": plain(_exp), "sqrt": ctx.sqrt, "abs": abs,
+        "factorial": combinatorics.factorial, "nPr": combinatorics.nPr, "nCr": combinatorics.nCr,
+        "multinomial": combinatorics.multinomial, "catalan": combinatorics.catalan,
+        "stirling1": combinatorics.stirling1, "stirling2": combinatorics.stirling2,
+        "integral": _float_only("∫"), "derivative": _float_only("d/dx"),
+    }
+
+
+def _decimal_operators(digits: int) -> dict:
+    ctx, work = _context(digits), digits + GUARD_DIGITS
+
+    def power(a, b):
+        if isinstance(a, int) and isinstance(b, int) and b >= 0:
+            return a ** b                            # exact, as with floats
+        if a > 0 and not isinstance(b, int) and b != b.to_integral_value():
+            value = _power(a, b, work)
+            if value is not None:
+                return ctx.plus(value)
+        return ctx.power(a, b)                       # integral b, a ≤ 0, or past MAX_EXP_DIGITS
+
+    return {"div": ctx.divide, "pow": power}
+
+
+def _iroot(n: int, k: int) -> int:
+    # ⌊n^(1/k)⌋ by Newton's method on ints
+    if n < 2:
+        return n
+    x = 1 << -(-n.bit_length() // k)
+    while True:
+        y = ((k - 1) * x + n // x ** (k - 1)) // k
+        if y >= x:
+            return x
+        x = y
+
+
+def _exact_root(a: Fraction, k: int):
+    """The rational k-th root of ``a``, or None."""
+    if a < 0:
+        root = _exact_root(-a, k) if k % 2 else None
+        return None if root is None else -root
+    p, q = _iroot(a.numerator, k), _iroot(a.denominator, k)
+    return Fraction(p, q) if p ** k == a.numerator and q ** k == a.denominator else None
+
+
+def _exact(d: Decimal) -> Fraction:
+    """A Decimal result as a Fraction, within the engine's result size."""
+    if abs(d.adjusted()) * _LOG2_10 > MAX_RESULT_BITS:
+        raise TooExpensive(f"result over {MAX_RESULT_BITS:,} bits")
+    return Fraction(d)
+
+
+def _fraction_operators(digits: int) -> dict:
+    decimal_power = _decimal_operators(digits)["pow"]
+
+    def power(a, b):
+        if isinstance(b, Fraction) and b.denominator == 1:
+            b = b.numerator
+        if isinstance(b, int):
+            if isinstance(a, int) and b >= 0:
+                return a ** b
+            a = Fraction(a)
+            if (a.numerator.bit_length() + a.denominator.bit_length()) * abs(b) > MAX_RESULT_BITS:
+                raise TooExpensive(f"result over {MAX_RESULT_BITS:,} bits")
+            return a ** b
+        if b.denominator <= MAX_ROOT:
+            root = _exact_root(Fraction(a), b.denominator)
+            if root is not None:
+                return power(root, b.numerator)
+        return _exact(decimal_power(_as_decimal(a), _as_decimal(b)))
+
+    return {"div": lambda a, b: Fraction(a) / b, "pow": power}
+
+
+def _fraction_functions(mode: str, digits: int) -> dict:
+    functions = _decimal_functions(mode, digits)
+
+    def rounded(fn):
+        return lambda x: _exact(Decimal(fn(_as_decimal(x))))
+
+    def sqrt(x):
+        root = _exact_root(Fraction(x), 2)
+        return rounded(functions["sqrt"])(x) if root is None else root
+
+    irrational = ("sin", "cos", "tan", "asin", "acos", "atan", "log", "ln", "exp")
+    return {**functions, **{name: rounded(functions[name]) for name in irrational}, "sqrt": sqrt}
+
+
+# ───────────────────────── VALUES ─────────────────────────
+def _as_decimal(value):
+    """``value`` as a Decimal mode operand; ints stay ints."""
+    if isinstance(value, (Decimal, int)):
+        return value
+    if isinstance(value, Fraction):
+        return Decimal(value.numerator) / value.denominator
+    if isinstance(value, float):
+        return Decimal(float.__repr__(value))       # the digits the display showed, not the binary value
+    try:
+        return operator.index(value)
+    except TypeError:
+        return Decimal(float.__repr__(float(value)))
+
+
+def _as_fraction(value):
+    """``value`` as a Fraction mode operand; ints stay ints."""
+    if isinstance(value, (Fraction, int)):
+        return value
+    if isinstance(value, Decimal):
+        return Fraction(value)
+    if isinstance(value, float):
+        return Fraction(float.__repr__(value))
+    try:
+        return operator.index(value)
+    except TypeError:
+        return Fraction(float.__repr__(float(value)))
+
+
+class System(NamedTuple):
+    """What the compiler needs for one (angle mode, precision)."""
+    functions: dict
+    operators: dict
+    constants: dict
+    context: decimal.Context
+    coerce: Callable                 # a variable's value (float Ans, ...) as an operand
+    number: type                     # non-integer literals
+
+    def bind(self, fn: Callable) -> Callable:
+        """``fn`` of a compiled expression, run in this system's context."""
+        context, coerce = self.context, self.coerce
+
+        def call(*args):
+            with decimal.localcontext(context):
+                result = fn(*map(coerce, args))
+            if isinstance(result, Decimal) and not result.is_finite():
+                raise ValueError("not finite")      # ln(0) is -Infinity, without a signal
+            return result
+        return call
+
+
+@lru_cache(maxsize=64)
+def system(mode: str, precision: Precision) -> System:
+    """The tables of ``precision`` for angle ``mode``, built once per process."""
+    if mode not in MODES:
+        raise CalcError(f"Unknown angle mode {mode!r}")
+    kind, digits = precision.check()
+    constants = {"pi": _context(digits).plus(pi(digits + GUARD_DIGITS)), "e": e(digits)}
+    if kind == DECIMAL:
+        return System(_decimal_functions(mode, digits), _decimal_operators(digits), constants,
+                      _context(digits), _as_decimal, Decimal)
+    constants = {name: Fraction(value) for name, value in constants.items()}
+    return System(_fraction_functions(mode, digits), _fraction_operators(digits), constants,
+                  _context(digits), _as_fraction, Fraction)
+
+
+def convert(value, precision: Precision = None):
+    """``value`` (Ans, M) for a switch to ``precision``; ``None`` is floats, ints stay ints."""
+    if isinstance(value, int) or getattr(value, "ndim", 0):
+        return value
+    if precision is None:
+        return float(value)
+    s = system(MODES[0], precision)
+    with decimal.localcontext(s.context):
+        return +s.coerce(value) if precision.kind == DECIMAL else s.coerce(value)
+
+
+def add(total, value, precision: Precision, sign: int = 1):
+    """``total ± value`` in ``precision``: M+ and M− outside an expression."""
+    s = system(MODES[0], precision)
+    with decimal.localcontext(s.context):
+        return s.coerce(total) + sign * s.coerce(value)
@@ -0,0 +1,202 @@
+"""Provisional results while the display is being typed ("natural display").
+
+A :class:`Preview` belongs to one display.  It keeps the tokens of the text
+it last saw.  When keys are appended, only the tail is scanned again: the
+last few tokens, because "1." + "5" or "d/d" + "x" merge into a single token.
+Every sub-expression it has evaluated is remembered.  "sin(30)+2×3" followed
+by "+1" only adds the new ``+ 1`` node to the memoized ``sin(30)+2×3``.
+
+Incomplete input never raises.  Open parentheses are closed as on the
+device, and tokens that can't end an expression (an operator, "sqrt(",
+",") are trimmed from the end until the rest parses.  ``None`` means there
+is nothing to show: errors, a display that is just a number, or one whose
+factorials, powers or nCr grow past :data:`PREVIEW_BITS` (previews run in
+the server thread with no deadline; "=" evaluates those in the pool).
+
+With a ``precision`` (:mod:`fxcalc.precise`), literals are scanned as
+Decimals or Fractions and evaluated with that precision's tables, as "="
+would.
+
+Debouncing is the caller's job.  The browser keypad sends the display after
+a pause in typing, not per key.
+"""
+import contextlib
+import decimal
+import math
+import operator
+from collections import OrderedDict
+from typing import NamedTuple
+
+from .compiler import CALCULUS, CONSTANTS, FUNCTIONS, OPERATOR_NAMES, compile_tree, uses_arrays
+from .limits import TooExpensive, is_risky, result_bits
+from .parser import BinOp, CalcError, Call, Name, Num, Postfix, UnaryOp, parse_tokens, scan
+
+MEMO_SIZE = 256
+LOOKBACK = 3        # tokens rescanned before the first changed character ("d/d" + "x" is one token)
+PREVIEW_BITS = 4096  # largest sub-result, in bits, of a growth operation worth previewing
+MAX_TRIM = 8        # trailing tokens dropped at most while looking for a complete expression
+
+_BINOPS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv,
+           "^": operator.pow}
+_UNARYOPS = {"-": operator.neg, "+": operator.pos}
+
+
+class _Tables(NamedTuple):
+    # what one evaluation uses: the float tables, or a precise.System's
+    functions: dict
+    operators: dict
+    constants: dict
+    context: object                  # a decimal.Context, or None for floats
+    coerce: object                   # a variable's value as an operand
+    number: type
+
+
+def _tables(mode: str, precision) -> _Tables:
+    if precision is None:
+        return _Tables(FUNCTIONS[mode], {}, CONSTANTS, None, None, float)
+    from . import precise
+    system = precise.system(mode, precision)
+    return _Tables(system.functions, system.operators, system.constants, system.context, system.coerce,
+                   system.number)
+
+
+class Preview:
+    """Incremental tokenizer plus memoizing evaluator for one display."""
+    __slots__ = ("_text", "_tokens", "_starts", "_number", "_memo", "_env", "hits", "misses")
+
+    def __init__(self):
+        self._text = ""
+        self._tokens = []
+        self._starts = []
+        self._number = float
+        self._memo = OrderedDict()   # repr(node) → value, for the current mode, precision and variables
+        self._env = None
+        self.hits = self.misses = 0
+
+    # ───────── tokens ─────────
+    def tokens(self, text: str, number: type = float) -> list:
+        """Tokens of ``text`` (no end marker), rescanning only what changed."""
+        if number is not self._number:
+            self._text, self._number = "", number     # "0.1" is another token now
+            self._tokens.clear()
+            self._starts.clear()
+        old = self._text
+        same = 0
+        for a, b in zip(old, text):
+            if a != b:
+                break
+            same += 1
+        # keep the tokens that start before the change, minus a few that may merge with it
+        keep = 0
+        while keep < len(self._starts) and self._starts[keep] < same:
+            keep += 1
+        keep = max(0, keep - LOOKBACK)
+        pos = self._starts[keep] if keep else 0
+        del self._tokens[keep:], self._starts[keep:]
+        self._text = ""              # a failed scan leaves nothing half-updated behind
+        scan(text, pos, self._tokens, self._starts, number)
+        self._text = text
+        return self._tokens
+
+    # ───────── evaluation ─────────
+    def __call__(self, text: str, mode: str = "DEG", variables: dict = None, precision=None):
+        """The provisional value of ``text``, or ``None`` when there is nothing to show."""
+        variables = variables or {}
+        env = (mode, precision, tuple(sorted(variables.items())))
+        if env != self._env:
+            self._memo.clear()           # Ans, the angle unit or the precision changed: nothing carries over
+            self._env = env
+        try:
+            tables = _tables(mode, precision)
+            tokens = self.tokens(text, tables.number)
+        except CalcError:
+            return None
+        tree = _complete(tokens)
+        if tree is None or _is_literal(tree) or uses_arrays(tree):
+            return None                  # arrays have their own view in the MATRIX panel
+        if tables.coerce is not None:
+            variables = {name: tables.coerce(value) for name, value in variables.items()}
+        try:
+            if not _cheap(tree, variables):
+                return None              # no deadline in the server thread: leave it to "=" and the pool
+            with decimal.localcontext(tables.context) if tables.context else contextlib.nullcontext():
+                value = self._value(tree, tables, mode, variables)
+        except (TooExpensive, ArithmeticError, ValueError, TypeError, KeyError, RecursionError):
+            return None
+        if isinstance(value, decimal.Decimal) and not value.is_finite():
+            return None
+        if isinstance(value, float) and not math.isfinite(value):
+            return None                  # "=" would say Math ERROR
+        return None if isinstance(value, complex) else value
+
+    def _value(self, node, tables, mode, variables):
+        if isinstance(node, Num):
+            return node.value
+        if isinstance(node, Name):
+            return tables.constants[node.id] if node.id in CONSTANTS else variables[node.id]
+        key = repr(node)                 # not the node: Num(2) == Num(2.0), but 2^99 != 2.0^99
+        memo = self._memo
+        if key in memo:
+            memo.move_to_end(key)
+            self.hits += 1
+            return memo[key]
+        self.misses += 1
+        functions, operators = tables.functions, tables.operators
+        if isinstance(node, BinOp):
+            binop = operators.get(OPERATOR_NAMES[node.op], _BINOPS[node.op])
+            value = binop(self._value(node.left, tables, mode, variables),
+                          self._value(node.right, tables, mode, variables))
+        elif isinstance(node, UnaryOp):
+            value = _UNARYOPS[node.op](self._value(node.operand, tables, mode, variables))
+        elif isinstance(node, Postfix):
+            operand = self._value(node.operand, tables, mode, variables)
+            if node.op == "%":
+                value = operators.get("div", operator.truediv)(operand, 100)
+            else:
+                value = functions["factorial"](operand)
+        elif isinstance(node, Call) and node.func in CALCULUS:
+            # the body is a function of x, not a value: run the compiled call as a whole
+            compiled = compile_tree(node, mode, functions, operators=operators, constants=tables.constants)
+            value = compiled.fn(*[variables[name] for name in compiled.variables])
+        elif isinstance(node, Call):
+            value = functions[node.func](*[self._value(arg, tables, mode, variables) for arg in node.args])
+        else:
+            raise CalcError(f"Cannot evaluate {node!r}")
+        memo[key] = value
+        if len(memo) > MEMO_SIZE:
+            memo.popitem(last=False)
+        return value
+
+
+def _complete(tokens):
+    """Parse the longest prefix of ``tokens`` that forms an expression."""
+    for end in range(len(tokens), max(0, len(tokens) - MAX_TRIM) - 1, -1):
+        if not end:
+            return None
+        try:
+            return parse_tokens(tokens[:end])
+        except CalcError:
+            continue
+    return None
+
+
+def _cheap(node, variables: dict) -> bool:
+    """Whether every growth operation (^, !, nCr...) in ``node`` stays under :data:`PREVIEW_BITS`."""
+    if not is_risky(node):
+        return True
+    if result_bits(node, variables) > PREVIEW_BITS:
+        return False
+    if isinstance(node, BinOp):
+        children = (node.left, node.right)
+    elif isinstance(node, (UnaryOp, Postfix)):
+        children = (node.operand,)
+    else:
+        children = node.args
+    return all(_cheap(child, variables) for child in children)
+
+
+def _is_literal(tree) -> bool:
+    # "12" or "-3.5": the preview would only repeat the display
+    while isinstance(tree, UnaryOp):
+        tree = tree.operand
+    return isinstance(tree, Num)
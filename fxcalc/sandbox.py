@@ -0,0 +1,285 @@
+"""A small pre-warmed process pool that evaluates with time and memory limits.
+
+The Streamlit server evaluates on its own threads; one runaway expression
+there stalls every session served by that process.  ``EvalPool`` ships each
+evaluation to a worker process instead.  Workers run with an address-space
+limit, and a worker that misses the wall-clock deadline is killed and
+replaced, so the caller gets :class:`~fxcalc.limits.TooExpensive` instead of
+a hung server.  The static cost check still runs first, in the caller, so
+obviously huge requests never cost a round trip.
+
+Workers are plain ``python -m fxcalc.sandbox`` subprocesses talking pickle
+over stdin/stdout.  multiprocessing's spawn/forkserver would re-execute the
+Streamlit script in every worker (Streamlit registers it as ``__main__``).
+"""
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+
+from .compiler import compile_expression, evaluate
+from .limits import TooExpensive, check_cost
+from .parser import CalcError
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, the timeout still applies
+    resource = None
+
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT = 2.0            # seconds per expression
+DEFAULT_MEMORY_MB = 512          # address space per worker
+IDLE_TIMEOUT = 30.0              # seconds to wait for a free worker
+RESPAWN_BACKOFF = (0.1, 5.0)     # first and longest wait between failed respawns
+RETRY_TIMEOUTS = 2               # retries of a failed batch that may miss the deadline
+
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ───────────────────────── WORKER PROCESS ─────────────────────────
+def _worker_main(memory_bytes: int):
+    requests, replies = sys.stdin.buffer, sys.stdout.buffer
+    sys.stdout = sys.stderr          # nothing else may write to the reply pipe
+    if resource is not None and memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    evaluate("1+1")                  # warm the parser/compiler before reporting ready
+
+    def send(reply):
+        pickle.dump(reply, replies, pickle.HIGHEST_PROTOCOL)
+        replies.flush()
+
+    def run(text, mode, variables, precision):
+        try:
+            return "ok", evaluate(text, mode, variables, precision)
+        except TooExpensive as exc:
+            return "expensive", exc.what
+        except CalcError as exc:
+            return "error", str(exc)
+        except MemoryError:
+            return "expensive", "out of memory"
+        except Exception:            # one bad expression must not take the batch (or the worker) down
+            return "error", "Math ERROR"
+
+    send(("ready", None))
+    while True:
+        try:
+            text, mode, variables, precision = pickle.load(requests)
+        except EOFError:
+            return
+        if isinstance(text, list):   # a batch: one reply per expression
+            reply = [run(item, mode, variables, precision) for item in text]
+        else:
+            reply = run(text, mode, variables, precision)
+        try:
+            send(reply)
+        except MemoryError:
+            send(("expensive", "result too large"))
+
+
+# ───────────────────────── POOL ─────────────────────────
+def _outcome(reply):
+    # a worker's (status, payload) as the value or the CalcError to raise
+    status, payload = reply
+    if status == "ok":
+        return payload
+    if status == "expensive":
+        return TooExpensive(payload)
+    return CalcError(payload)
+
+
+class _Worker:
+    __slots__ = ("process", "replies")
+
+    def __init__(self, memory_bytes: int):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, (_PACKAGE_ROOT, env.get("PYTHONPATH"))))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "fxcalc.sandbox", str(memory_bytes)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+        )
+        # a reader thread turns the blocking pipe into a queue we can wait on with a timeout
+        self.replies = queue.Queue()
+        threading.Thread(target=self._read, name="evalpool-reader", daemon=True).start()
+
+    def _read(self):
+        try:
+            while True:
+                self.replies.put(pickle.load(self.process.stdout))
+        except (EOFError, OSError, ValueError, pickle.UnpicklingError):
+            self.replies.put(None)   # worker gone
+
+    def request(self, message, timeout: float):
+        """Send ``message`` and wait for the reply; ``None`` if the worker died."""
+        try:
+            pickle.dump(message, self.process.stdin, pickle.HIGHEST_PROTOCOL)
+            self.process.stdin.flush()
+        except OSError:
+            return None
+        return self.replies.get(timeout=timeout)
+
+    def wait_ready(self, timeout: float = 60.0):
+        try:
+            reply = self.replies.get(timeout=timeout)
+        except queue.Empty:
+            reply = None
+        if reply is None or reply[0] != "ready":
+            self.kill()
+            raise RuntimeError("evaluation worker failed to start")
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+
+class EvalPool:
+    """Thread-safe pool of evaluation processes; share one per server process."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, timeout: float = DEFAULT_TIMEOUT,
+                 memory_mb: int = DEFAULT_MEMORY_MB):
+        self._memory_bytes = memory_mb * 1024 * 1024 if memory_mb else 0
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._closed = threading.Event()
+        started = [_Worker(self._memory_bytes) for _ in range(workers)]
+        for worker in started:
+            worker.wait_ready()
+            self._idle.put(worker)
+
+    def evaluate(self, text: str, mode: str = "DEG", variables: dict = None, precision=None):
+        """Same contract as :func:`fxcalc.evaluate`, but bounded in time and memory."""
+        compiled = compile_expression(text, mode, precision)
+        if compiled.risky:
+            check_cost(compiled.tree, variables)
+        # only what the expression uses is pickled (a 500×500 MatB is 2 MB)
+        variables = {name: variables[name] for name in compiled.variables if name in (variables or {})}
+        result = _outcome(self._request((text, mode, variables, precision)))
+        if isinstance(result, CalcError):
+            raise result
+        return result
+
+    def evaluate_many(self, texts: list, mode: str = "DEG", variables: dict = None, precision=None) -> list:
+        """Evaluate ``texts`` in one round trip to one worker.
+
+        Returns, for each text, its value or the :class:`CalcError` it
+        raised, as ``asyncio.gather(return_exceptions=True)`` does.  The
+        deadline covers the whole batch; if a batch misses it, its
+        expressions are retried one by one so that only the slow one fails.
+        Once :data:`RETRY_TIMEOUTS` retries have missed theirs too, the rest
+        go back as one batch that succeeds or fails as a whole, so a batch
+        costs a few deadlines at most.
+        """
+        outcomes, sent, names = [None] * len(texts), [], set()
+        for i, text in enumerate(texts):
+            try:
+                compiled = compile_expression(text, mode, precision)
+                if compiled.risky:
+                    check_cost(compiled.tree, variables)
+            except CalcError as exc:
+                outcomes[i] = exc
+                continue
+            except Exception:           # contained to this expression, like the worker does
+                outcomes[i] = CalcError("Math ERROR")
+                continue
+            sent.append(i)
+            names.update(compiled.variables)
+        if not sent:
+            return outcomes
+        variables = {name: variables[name] for name in names if name in (variables or {})}
+        try:
+            replies = self._request(([texts[i] for i in sent], mode, variables, precision))
+        except TooExpensive as exc:
+            if len(sent) == 1:
+                outcomes[sent[0]] = exc          # nothing to narrow down
+                return outcomes
+            replies = None
+        if not isinstance(replies, list):
+            replies = [None] * len(sent)
+        timeouts, rest = 0, []
+        for i, reply in zip(sent, replies):
+            if reply is not None:
+                outcomes[i] = _outcome(reply)
+            elif timeouts >= RETRY_TIMEOUTS:
+                rest.append(i)
+            else:
+                try:
+                    outcomes[i] = self.evaluate(texts[i], mode, variables, precision)
+                except TooExpensive as exc:
+                    timeouts += 1
+                    outcomes[i] = exc
+                except CalcError as exc:
+                    outcomes[i] = exc
+        if rest:
+            # out of retries: one last round trip for the rest, which succeeds or fails as a whole
+            try:
+                replies = self._request(([texts[i] for i in rest], mode, variables, precision))
+                last = ([_outcome(reply) for reply in replies] if isinstance(replies, list)
+                        else [_outcome(replies)] * len(rest))
+            except TooExpensive as exc:
+                last = [exc] * len(rest)
+            for i, outcome in zip(rest, last):
+                outcomes[i] = outcome
+        return outcomes
+
+    def _request(self, message):
+        """Send ``message`` to an idle worker and return its reply."""
+        if self._closed.is_set():
+            raise CalcError("Evaluation pool is closed")
+        try:
+            worker = self._idle.get(timeout=IDLE_TIMEOUT)
+        except queue.Empty:
+            raise CalcError("Evaluation pool is busy") from None
+        try:
+            reply = worker.request(message, self.timeout)
+        except queue.Empty:
+            self._replace(worker)
+            raise TooExpensive(f"over {self.timeout:g} s") from None
+        if reply is None:
+            # killed by the memory limit (or otherwise gone)
+            self._replace(worker)
+            raise TooExpensive("worker ran out of memory")
+        self._idle.put(worker)
+        return reply
+
+    def _replace(self, worker: _Worker):
+        """Kill ``worker`` and start a successor without making the caller wait for it."""
+        worker.kill()
+
+        def start():
+            # a successor that fails to start is retried, so the pool never shrinks for good
+            delay, longest = RESPAWN_BACKOFF
+            while not self._closed.is_set():
+                try:
+                    fresh = _Worker(self._memory_bytes)
+                    fresh.wait_ready()
+                except (OSError, RuntimeError):
+                    self._closed.wait(delay)
+                    delay = min(2 * delay, longest)
+                    continue
+                if self._closed.is_set():
+                    fresh.kill()
+                else:
+                    self._idle.put(fresh)
+                return
+        threading.Thread(target=start, name="evalpool-respawn", daemon=True).start()
+
+    def close(self):
+        self._closed.set()
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                return
+
+
+if __name__ == "__main__":
+    try:
+        _worker_main(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    except BrokenPipeError:
+        pass                         # the pool went away first
@@ -0,0 +1,82 @@
+"""Per-session calculator state in one compact object.
+
+A Streamlit session used to carry half a dozen loose ``st.session_state``
+keys, including a list of pre-formatted history strings that was
+re-inserted and re-sliced on every "=".  :class:`SessionState` holds the
+same state in one ``__slots__`` object.  Recent results go into a
+fixed-size :class:`Ring` as ``(expression, number)`` pairs, and are only
+formatted when rendered (ints too long to print are kept as their text).
+"""
+from .core import Calculator
+from .formatting import NORM_FORMAT, compact
+from .preview import Preview
+
+RECENT_SIZE = 10
+
+
+class Ring:
+    """Fixed-size ring buffer; iterates newest first."""
+    __slots__ = ("_items", "_head", "_count")
+
+    def __init__(self, size: int):
+        self._items = [None] * size
+        self._head = 0               # next slot to write
+        self._count = 0
+
+    def append(self, item):
+        self._items[self._head] = item
+        self._head = (self._head + 1) % len(self._items)
+        if self._count < len(self._items):
+            self._count += 1
+
+    def clear(self):
+        self._items[:] = [None] * len(self._items)
+        self._head = self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        items, size = self._items, len(self._items)
+        for i in range(1, self._count + 1):
+            yield items[(self._head - i) % size]
+
+
+class SessionState(Calculator):
+    """Everything one calculator session needs between reruns."""
+    __slots__ = ("disp", "revision", "shift", "fmt", "preview", "arrays", "stats", "recent", "history_id",
+                 "history_pages", "phases")
+
+    def __init__(self, history_id: str = "", mode: str = "DEG", recent_size: int = RECENT_SIZE):
+        super().__init__(mode)
+        self.disp = ""
+        self.revision = 0                # bumped when the server sets disp under a browser keypad
+        self.shift = False
+        self.fmt = NORM_FORMAT           # number format of the SETUP menu (fxcalc.formatting.Format)
+        self.preview = Preview()         # provisional result of disp, incrementally evaluated
+        self.arrays = {}                 # MatA…VctAns → fxcalc.matrix.ArrayRef (data in the shared store)
+        self.stats = None                # STAT variables (x̄, σx, a, b, ...) of the loaded CSV
+        self.recent = Ring(recent_size)  # (expression, result) pairs, results as numbers
+        self.history_id = history_id
+        self.history_pages = ()          # keyset cursors of the older history pages shown
+        self.phases = {}                 # last timing per phase, for the debug panel
+
+    def record(self, expression: str, result):
+        self.recent.append((expression, compact(result)))
+
+    def variables(self) -> dict:
+        variables = super().variables()
+        variables.update(self.stats or ())
+        variables.update((name, ref.array) for name, ref in self.arrays.items())
+        return variables
+
+
+def as_number(text: str):
+    """Result text (as stored in the history database) back to a number."""
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
@@ -0,0 +1,214 @@
+"""SOLVE mode: every real root of an equation in x on an interval.
+
+The equation is compiled twice, once against the NumPy function table and
+once against the scalar one, and cached.  One vectorized pass over a grid
+of points finds every sign change.  Each bracket is then refined with
+Brent's method on the scalar callable.  Grid points where |f| dips towards
+zero without changing sign (double roots such as ``x^2=0``) are tried with
+Newton's method.  Angles follow the DEG/RAD mode, as everywhere else.
+"""
+import math
+from functools import lru_cache
+from typing import List, NamedTuple
+
+import numpy as np
+
+from .compiler import CACHE_SIZE, FUNCTIONS, compile_tree, normalize
+from .limits import check_cost, is_risky
+from .parser import BinOp, CalcError, parse
+from .table import VECTOR_FUNCTIONS
+
+SCAN_POINTS = 2_001
+MAX_ITERATIONS = 100
+RTOL = 4 * np.finfo(float).eps
+
+
+class Root(NamedTuple):
+    x: float
+    iterations: int
+    residual: float              # |f(x)|
+    method: str                  # "brent" | "newton" | "exact"
+
+
+class Equation(NamedTuple):
+    scalar: object               # Compiled, math functions
+    vector: object               # Compiled, NumPy functions
+    tree: object                 # lhs - rhs
+
+
+# ───────────────────────── COMPILING ─────────────────────────
+def _equation_tree(text: str):
+    sides = text.split("=")
+    if len(sides) > 2:
+        raise CalcError("Only one '=' allowed")
+    if len(sides) == 1 or not sides[1]:
+        return parse(sides[0])
+    return BinOp("-", parse(sides[0]), parse(sides[1]))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile_equation(text: str, mode: str) -> Equation:
+    if mode not in FUNCTIONS:
+        raise CalcError(f"Unknown angle mode {mode!r}")
+    tree = _equation_tree(text)
+    return Equation(compile_tree(tree, mode, source=text, optimize=True),
+                    compile_tree(tree, mode, VECTOR_FUNCTIONS[mode], source=text), tree)
+
+
+def compile_equation(text: str, mode: str = "DEG") -> Equation:
+    """Compile ``lhs=rhs`` (or ``expr``, meaning ``expr=0``) as ``lhs - rhs``."""
+    return _compile_equation(normalize(text), mode)
+
+
+def _bind(compiled, variables: dict):
+    """``compiled`` as a function of x alone."""
+    names = compiled.variables
+    if "x" not in names:
+        raise CalcError("The equation has no x")
+    try:
+        values = [None if name == "x" else variables[name] for name in names]
+    except KeyError as exc:
+        raise CalcError(f"Undefined variable {exc.args[0]}") from None
+    slot, fn = names.index("x"), compiled.fn
+    if len(names) == 1:
+        return fn
+
+    def bound(x):
+        values[slot] = x
+        return fn(*values)
+    return bound
+
+
+# ───────────────────────── REFINEMENT ─────────────────────────
+def _safe(f):
+    def g(x):
+        try:
+            y = f(x)
+            return float(y) if not isinstance(y, complex) else math.nan
+        except (ArithmeticError, ValueError, TypeError):
+            return math.nan
+    return g
+
+
+def brent(f, a: float, b: float, fa: float, fb: float, xtol: float = 0.0,
+          rtol: float = RTOL, maxiter: int = MAX_ITERATIONS):
+    """Brent's method on a sign-changing bracket; returns ``(x, iterations)``.
+
+    The classic zeroin formulation: interpolate (secant or inverse
+    quadratic) when that shrinks the bracket fast enough, bisect otherwise.
+    """
+    xpre, xcur, fpre, fcur = a, b, fa, fb
+    xblk = fblk = spre = scur = 0.0
+    for i in range(1, maxiter + 1):
+        if fpre and fcur and (fpre < 0) != (fcur < 0):
+            xblk, fblk = xpre, fpre
+            spre = scur = xcur - xpre
+        if abs(fblk) < abs(fcur):
+            xpre, xcur, xblk = xcur, xblk, xcur
+            fpre, fcur, fblk = fcur, fblk, fcur
+        delta = (xtol + rtol * abs(xcur)) / 2
+        sbis = (xblk - xcur) / 2
+        if fcur == 0 or abs(sbis) < delta:
+            return xcur, i
+        if abs(spre) > delta and abs(fcur) < abs(fpre):
+            if xpre == xblk:
+                stry = -fcur * (xcur - xpre) / (fcur - fpre)
+            else:
+                dpre = (fpre - fcur) / (xpre - xcur)
+                dblk = (fblk - fcur) / (xblk - xcur)
+                stry = -fcur * (fblk * dblk - fpre * dpre) / (dblk * dpre * (fblk - fpre))
+            if 2 * abs(stry) < min(abs(spre), 3 * abs(sbis) - delta):
+                spre, scur = scur, stry
+            else:
+                spre = scur = sbis
+        else:
+            spre = scur = sbis
+        xpre, fpre = xcur, fcur
+        xcur += scur if abs(scur) > delta else (delta if sbis > 0 else -delta)
+        fcur = f(xcur)
+        if math.isnan(fcur):
+            return None, i
+    return xcur, maxiter
+
+
+def newton(f, x: float, h: float, rtol: float = RTOL, maxiter: int = MAX_ITERATIONS):
+    """Newton's method with a central-difference slope; ``(x, iterations)`` or ``(None, n)``."""
+    for i in range(1, maxiter + 1):
+        fx = f(x)
+        if fx == 0:
+            return x, i
+        step = max(h, abs(x) * 1e-8)
+        slope = (f(x + step) - f(x - step)) / (2 * step)
+        if not slope or math.isnan(slope) or math.isnan(fx):
+            return None, i
+        dx = fx / slope
+        x -= dx
+        if abs(dx) <= rtol * abs(x) or abs(dx) < h * 1e-6:
+            return x, i
+    return None, maxiter
+
+
+# ───────────────────────── SOLVE ─────────────────────────
+def solve(text: str, lo: float, hi: float, mode: str = "DEG", variables: dict = None,
+          points: int = SCAN_POINTS) -> List[Root]:
+    """All roots of ``text`` in ``[lo, hi]``, ascending.
+
+    Sign changes at poles (``tan(x)=0`` across 90°) are refined too but
+    dropped, because the residual does not shrink there.
+    """
+    if not (math.isfinite(lo) and math.isfinite(hi)) or lo >= hi:
+        raise CalcError("Need a finite interval with lower < upper")
+    if points < 3:
+        raise CalcError("Need at least 3 scan points")
+    equation = compile_equation(text, mode)
+    variables = dict(variables or {})
+    if is_risky(equation.tree):
+        check_cost(equation.tree, dict(variables, x=float(max(abs(lo), abs(hi)))))
+    f = _safe(_bind(equation.scalar, variables))
+    g = _bind(equation.vector, variables)
+
+    xs = np.linspace(lo, hi, points)
+    with np.errstate(all="ignore"):
+        try:
+            ys = np.broadcast_to(np.asarray(g(xs), dtype=float), xs.shape)
+        except (ArithmeticError, ValueError, TypeError) as exc:
+            raise CalcError("Math ERROR") from exc      # e.g. an Ans past float range
+    finite = np.isfinite(ys)
+    if not finite.any():
+        raise CalcError("Math ERROR")
+    scale = float(np.max(np.abs(ys[finite]))) or 1.0
+    accept = 1e-9 * max(1.0, scale)
+    h = (hi - lo) / (points - 1)
+
+    found = []
+    for i in np.flatnonzero(ys == 0):
+        found.append(Root(float(xs[i]), 0, 0.0, "exact"))
+    # sign changes between neighbouring finite points
+    pairs = np.flatnonzero(finite[:-1] & finite[1:] & (np.sign(ys[:-1]) * np.sign(ys[1:]) < 0))
+    for i in pairs:
+        x, n = brent(f, float(xs[i]), float(xs[i + 1]), float(ys[i]), float(ys[i + 1]), h * RTOL)
+        if x is not None:
+            found.append(Root(float(x), n, abs(f(x)), "brent"))
+    # local minima of |f| that do not cross zero: tangent roots
+    a = np.abs(ys)
+    touch = np.flatnonzero(finite[1:-1] & finite[:-2] & finite[2:]
+                           & (a[1:-1] < a[:-2]) & (a[1:-1] <= a[2:])
+                           & (np.sign(ys[:-2]) == np.sign(ys[2:]))
+                           & (a[1:-1] < 1e-3 * scale)) + 1
+    # ... and at the ends of the interval (tan(x)=0 at 360°)
+    ends = [i for i, j in ((0, 1), (-1, -2)) if finite[i] and finite[j] and a[i] < min(a[j], 1e-3 * scale)]
+    for i in (*touch, *ends):
+        x, n = newton(f, float(xs[i]), h * 1e-3)
+        if x is not None and lo <= x <= hi:
+            found.append(Root(x, n, abs(f(x)), "newton"))
+
+    roots = []
+    for root in sorted(found, key=lambda r: r.x):
+        if not root.residual <= accept:
+            continue                 # pole, or Newton stalled away from zero
+        if roots and abs(root.x - roots[-1].x) <= max(h * 1e-3, 1e-12 * abs(root.x)):
+            if root.residual < roots[-1].residual:
+                roots[-1] = root
+            continue
+        roots.append(root)
+    return roots
@@ -0,0 +1,285 @@
+"""STAT mode: one-variable and paired statistics of a CSV, streamed in chunks.
+
+A file is read ``CHUNK_ROWS`` rows at a time and never held whole.  Each
+chunk is reduced with NumPy and merged into an :class:`Accumulator`:
+
+* count, mean and the sum of squared deviations use Welford's update in
+  the pairwise form (Chan et al.), so variances don't suffer from the
+  cancellation of Σx² − (Σx)²/n;
+* linear regression uses the co-moment Σ(x−x̄)(y−ȳ), merged the same way;
+* quadratic regression uses power sums of ``u = x − c``, where c is the
+  first chunk's mean, and solves the 3×3 normal equations at the end;
+* quartiles come from a :class:`QuantileSketch`.  It is exact up to
+  ``QuantileSketch.limit`` values, and past that keeps a compressed
+  weighted sample (rank error about 1/``QuantileSketch.keep``).
+
+:func:`summarize` yields a :class:`Stats` snapshot after every chunk, so
+the page can show partial results while a file loads.  Final results are
+cached by file digest, and loading the same file again costs one hash.
+``Stats.variables`` are the names an expression can use after a file is
+loaded: ``n``, ``x̄``, ``σx``, ``sx``, ``ȳ``, ``σy``, ``sy``, ``minX``,
+``maxX``, ``Q1``, ``med``, ``Q3``, ``a``, ``b``, ``c`` and ``r``.
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from .parser import CalcError
+
+CHUNK_ROWS = 250_000
+CACHE_SIZE = 32
+
+
+class QuantileSketch:
+    """Mergeable weighted sample for quantiles in bounded memory."""
+    __slots__ = ("_values", "_weights", "exact", "limit", "keep")
+
+    def __init__(self, limit: int = 200_000, keep: int = 20_000):
+        self._values = np.empty(0)
+        self._weights = np.empty(0)
+        self.exact = True                # every value still present with weight 1
+        self.limit, self.keep = limit, keep
+
+    def add(self, values: np.ndarray):
+        self._values = np.concatenate((self._values, values))
+        self._weights = np.concatenate((self._weights, np.ones(len(values))))
+        if len(self._values) > self.limit:
+            self._compress()
+
+    def _compress(self):
+        # keep points at evenly spaced cumulative weights; each carries an equal share
+        order = np.argsort(self._values, kind="stable")
+        values, cumulative = self._values[order], np.cumsum(self._weights[order])
+        total = cumulative[-1]
+        targets = (np.arange(self.keep) + 0.5) * (total / self.keep)
+        self._values = values[np.searchsorted(cumulative, targets)]
+        self._weights = np.full(self.keep, total / self.keep)
+        self.exact = False
+
+    def quantiles(self, qs) -> np.ndarray:
+        if not len(self._values):
+            return np.full(len(qs), math.nan)
+        if self.exact:
+            return np.quantile(self._values, qs)
+        order = np.argsort(self._values, kind="stable")
+        values, weights = self._values[order], self._weights[order]
+        # weighted ranks at the centre of each point's weight, interpolated
+        centres = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return np.interp(qs, centres, values)
+
+
+class Stats(NamedTuple):
+    """Statistics of the rows read so far; ``done`` once the whole file is in."""
+    n: int
+    xbar: float
+    sigmax: float
+    sx: float
+    minX: float
+    maxX: float
+    Q1: float
+    med: float
+    Q3: float
+    ybar: Optional[float] = None
+    sigmay: Optional[float] = None
+    sy: Optional[float] = None
+    linear: Optional[tuple] = None       # (a, b, r) of y = a + bx
+    quadratic: Optional[tuple] = None    # (a, b, c) of y = a + bx + cx²
+    exact_quartiles: bool = True
+    skipped: int = 0                     # rows without a number in the chosen columns
+    done: bool = False
+
+    def variables(self, quadratic: bool = False) -> dict:
+        """Values for the expression language (``x̄`` → ``xbar``, ...)."""
+        out = {name: getattr(self, name) for name in ("n", "xbar", "sigmax", "sx", "minX", "maxX",
+                                                      "Q1", "med", "Q3")}
+        if self.ybar is not None:
+            out.update(ybar=self.ybar, sigmay=self.sigmay, sy=self.sy)
+        model = self.quadratic if quadratic else self.linear
+        if model is not None:
+            out.update(zip(("a", "b", "c") if quadratic else ("a", "b", "r"), model))
+        return {name: value for name, value in out.items() if value is not None and not _isnan(value)}
+
+
+def _isnan(value) -> bool:
+    return isinstance(value, float) and math.isnan(value)
+
+
+class Accumulator:
+    """One pass over chunks of x (and optionally y) values."""
+    __slots__ = ("n", "mean_x", "m2_x", "mean_y", "m2_y", "c_xy", "min_x", "max_x",
+                 "shift", "u_sums", "uy_sums", "quartiles", "paired", "skipped")
+
+    def __init__(self, paired: bool = False):
+        self.n = 0
+        self.mean_x = self.m2_x = self.mean_y = self.m2_y = self.c_xy = 0.0
+        self.min_x, self.max_x = math.inf, -math.inf
+        self.shift = None                # c in u = x − c
+        self.u_sums = np.zeros(5)        # Σu⁰ … Σu⁴
+        self.uy_sums = np.zeros(3)       # Σy, Σuy, Σu²y
+        self.quartiles = QuantileSketch()
+        self.paired = paired
+        self.skipped = 0
+
+    def add(self, x: np.ndarray, y: np.ndarray = None):
+        nb = len(x)
+        if not nb:
+            return
+        na, n = self.n, self.n + nb
+        mean_xb = x.mean()
+        dx = x - mean_xb
+        delta_x = mean_xb - self.mean_x
+        self.m2_x += dx @ dx + delta_x * delta_x * na * nb / n
+        self.mean_x += delta_x * nb / n
+        self.min_x, self.max_x = min(self.min_x, x.min()), max(self.max_x, x.max())
+        self.quartiles.add(x)
+        if y is not None:
+            mean_yb = y.mean()
+            dy = y - mean_yb
+            delta_y = mean_yb - self.mean_y
+            self.m2_y += dy @ dy + delta_y * delta_y * na * nb / n
+            self.c_xy += dx @ dy + delta_x * delta_y * na * nb / n
+            self.mean_y += delta_y * nb / n
+            if self.shift is None:
+                self.shift = mean_xb
+            u = x - self.shift
+            powers = np.vander(u, 5, increasing=True)        # 1, u, u², u³, u⁴ per row
+            self.u_sums += powers.sum(axis=0)
+            self.uy_sums += y @ powers[:, :3]
+        self.n = n
+
+    def stats(self, done: bool = False) -> Stats:
+        n = self.n
+        if not n:
+            raise CalcError("No numbers in the chosen column")
+        var_x = self.m2_x / n
+        q1, med, q3 = self.quartiles.quantiles([0.25, 0.5, 0.75])
+        fields = dict(n=n, xbar=float(self.mean_x), sigmax=math.sqrt(var_x),
+                      sx=math.sqrt(self.m2_x / (n - 1)) if n > 1 else math.nan,
+                      minX=float(self.min_x), maxX=float(self.max_x),
+                      Q1=float(q1), med=float(med), Q3=float(q3),
+                      exact_quartiles=self.quartiles.exact, skipped=self.skipped, done=done)
+        if self.paired:
+            fields.update(ybar=float(self.mean_y), sigmay=math.sqrt(self.m2_y / n),
+                          sy=math.sqrt(self.m2_y / (n - 1)) if n > 1 else math.nan,
+                          linear=self._linear(), quadratic=self._quadratic())
+        return Stats(**fields)
+
+    def _linear(self):
+        if not self.m2_x:
+            return None
+        b = self.c_xy / self.m2_x
+        r = self.c_xy / math.sqrt(self.m2_x * self.m2_y) if self.m2_y else math.nan
+        return float(self.mean_y - b * self.mean_x), float(b), float(r)
+
+    def _quadratic(self):
+        s = self.u_sums
+        normal = np.array([[s[0], s[1], s[2]], [s[1], s[2], s[3]], [s[2], s[3], s[4]]])
+        try:
+            a, b, c = np.linalg.solve(normal, self.uy_sums)
+        except np.linalg.LinAlgError:
+            return None                  # fewer than three distinct x
+        # y = a + b·u + c·u² with u = x − shift, back in powers of x
+        k = self.shift
+        return float(a - b * k + c * k * k), float(b - 2 * c * k), float(c)
+
+
+# ───────────────────────── CSV ─────────────────────────
+def columns(source) -> list:
+    """Column names of a CSV (``"1"``, ``"2"``, ... when the first row is numbers)."""
+    return _layout(source)[0]
+
+
+def _layout(source):
+    # (column names, whether the first row is a header)
+    cells = [cell.strip() for cell in _first_line(source).split(",")]
+    if _numeric(cells):
+        return [str(i) for i in range(1, len(cells) + 1)], False
+    return cells, True
+
+
+def _first_line(source) -> str:
+    position = source.tell()
+    line = source.readline()
+    source.seek(position)
+    return (line.decode("utf-8", "replace") if isinstance(line, bytes) else line).strip()
+
+
+def _numeric(cells) -> bool:
+    try:
+        [float(cell) for cell in cells if cell]
+    except ValueError:
+        return False
+    return True
+
+
+def digest(source) -> str:
+    """Content hash of a binary file object (read in blocks, then rewound)."""
+    source.seek(0)
+    value = hashlib.file_digest(source, "blake2b").hexdigest()
+    source.seek(0)
+    return value
+
+
+def summarize(source, x: str, y: str = None, chunk_rows: int = CHUNK_ROWS, key: str = None):
+    """Yield :class:`Stats` after each chunk of the CSV ``source``; the last is final.
+
+    ``x``/``y`` are column names as returned by :func:`columns`.  ``key``
+    (e.g. :func:`digest` of the file) makes a repeat a cache hit: the
+    final snapshot is yielded at once.
+    """
+    import pandas as pd                  # its C parser does the chunking
+
+    cache_key = key and (key, x, y)
+    if cache_key:
+        hit = _cache_get(cache_key)
+        if hit is not None:
+            yield hit
+            return
+    names, has_header = _layout(source)
+    wanted = [x] if y is None else [x, y]
+    missing = [name for name in wanted if name not in names]
+    if missing:
+        raise CalcError(f"No column {missing[0]!r}")
+    reader = pd.read_csv(source, header=0 if has_header else None, names=None if has_header else names,
+                         usecols=wanted, chunksize=chunk_rows, engine="c", skipinitialspace=True)
+    acc = Accumulator(paired=y is not None)
+    for chunk in reader:
+        chunk = chunk[wanted]
+        if not all(dtype.kind in "fiu" for dtype in chunk.dtypes):
+            chunk = chunk.apply(pd.to_numeric, errors="coerce")     # text cells become NaN
+        values = chunk.to_numpy(dtype=float)
+        finite = np.isfinite(values).all(axis=1)
+        if not finite.all():
+            acc.skipped += int(len(values) - finite.sum())
+            values = values[finite]
+        acc.add(values[:, 0], values[:, 1] if y is not None else None)
+        if acc.n:
+            yield acc.stats()
+    stats = acc.stats(done=True)
+    if cache_key:
+        _cache_put(cache_key, stats)
+    yield stats
+
+
+# ───────────────────────── RESULT CACHE ─────────────────────────
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(key):
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+
+def _cache_put(key, stats: Stats):
+    with _cache_lock:
+        _cache[key] = stats
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
@@ -0,0 +1,139 @@
+"""TABLE mode: evaluate f(x) over a whole range in one NumPy pass.
+
+The expression is compiled once against a table of ufuncs (with the same
+DEG/RAD semantics as the scalar functions) and called with the full x array,
+so a million points cost one Python call instead of a million.
+"""
+import io
+import math
+from functools import lru_cache, partial
+
+import numpy as np
+
+from . import calculus, combinatorics
+from .compiler import CACHE_SIZE, MODES, compile_tree, normalize
+from .limits import check_cost, is_risky
+from .parser import CalcError, parse
+
+MAX_POINTS = 10_000_000
+
+
+# ───────────────────────── UFUNC TABLES ─────────────────────────
+def _elementwise(fn, nargs=1):
+    """Lift a scalar-only function (factorial, nPr) to arrays; bad points become NaN."""
+    def safe(*args):
+        try:
+            return float(fn(*args))
+        except (ArithmeticError, ValueError, TypeError):
+            return math.nan
+    ufunc = np.frompyfunc(safe, nargs, 1)
+    return lambda *args: np.asarray(ufunc(*args), dtype=float)
+
+
+def _factorial(n):
+    # past 170! the float overflows anyway; don't build a huge bignum first
+    return combinatorics.factorial(n) if n <= 170 else math.inf
+
+
+def _calculus(fn, mode: str):
+    # ∫/d/dx per point of the limits; the body itself is evaluated vectorized inside
+    def lifted(body, names, values, *points):
+        return _elementwise(partial(fn, body, names, values, mode=mode), len(points))(*points)
+    return lifted
+
+
+def _trig_table(mode: str) -> dict:
+    if mode == "RAD":
+        return {"sin": np.sin, "cos": np.cos, "tan": np.tan,
+                "asin": np.arcsin, "acos": np.arccos, "atan": np.arctan}
+    return {
+        "sin": lambda x: np.sin(np.radians(x)),
+        "cos": lambda x: np.cos(np.radians(x)),
+        "tan": lambda x: np.tan(np.radians(x)),
+        "asin": lambda x: np.degrees(np.arcsin(x)),
+        "acos": lambda x: np.degrees(np.arccos(x)),
+        "atan": lambda x: np.degrees(np.arctan(x)),
+    }
+
+
+VECTOR_FUNCTIONS = {
+    mode: {
+        **_trig_table(mode),
+        "log": np.log10, "ln": np.log, "exp": np.exp, "sqrt": np.sqrt,
+        "abs": np.abs, "pow": np.power,
+        "factorial": _elementwise(_factorial),
+        "nPr": _elementwise(combinatorics.nPr, 2),
+        "nCr": _elementwise(combinatorics.nCr, 2),
+        "catalan": _elementwise(combinatorics.catalan),
+        "stirling1": _elementwise(combinatorics.stirling1, 2),
+        "stirling2": _elementwise(combinatorics.stirling2, 2),
+        "multinomial": lambda *ks: _elementwise(combinatorics.multinomial, len(ks))(*ks),
+        "integral": _calculus(calculus.integral, mode),
+        "derivative": _calculus(calculus.derivative, mode),
+    }
+    for mode in MODES
+}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile_vectorized(text: str, mode: str):
+    if mode not in VECTOR_FUNCTIONS:
+        raise CalcError(f"Unknown angle mode {mode!r}")
+    return compile_tree(parse(text), mode, VECTOR_FUNCTIONS[mode], source=text)
+
+
+def compile_vectorized(text: str, mode: str = "DEG"):
+    """Compile ``text`` so that its variables may be NumPy arrays."""
+    return _compile_vectorized(normalize(text), mode)
+
+
+# ───────────────────────── TABLE ─────────────────────────
+def x_range(start: float, stop: float, step: float) -> np.ndarray:
+    """Points ``start, start+step, ...`` up to and including ``stop`` (fx-991EX style)."""
+    if step == 0 or not all(map(math.isfinite, (start, stop, step))):
+        raise CalcError("Step must be a non-zero finite number")
+    span = (stop - start) / step
+    if span < 0:
+        raise CalcError("Step points away from End")
+    # tolerate float noise so that 0..1 step 0.1 includes 1.0
+    count = int(math.floor(span + 1e-9)) + 1
+    if count > MAX_POINTS:
+        raise CalcError(f"Too many points ({count:,} > {MAX_POINTS:,})")
+    return start + step * np.arange(count, dtype=float)
+
+
+def evaluate_array(text: str, x: np.ndarray, mode: str = "DEG", variables: dict = None) -> np.ndarray:
+    """Evaluate ``text`` at every point of ``x``; math errors give NaN/inf per point."""
+    compiled = compile_vectorized(text, mode)
+    env = dict(variables or {}, x=x)
+    try:
+        args = [env[name] for name in compiled.variables]
+    except KeyError as exc:
+        raise CalcError(f"Undefined variable {exc.args[0]}") from None
+    if is_risky(compiled.tree):
+        # the bound at the largest |x| covers every row (as solve does for its bracket)
+        check_cost(compiled.tree, dict(env, x=float(np.abs(x).max(initial=0.0))))
+    with np.errstate(all="ignore"):
+        try:
+            y = compiled.fn(*args)
+        except (ArithmeticError, ValueError, TypeError) as exc:
+            raise CalcError("Math ERROR") from exc
+    y = np.asarray(y)
+    if np.iscomplexobj(y):
+        raise CalcError("Math ERROR")
+    # expressions without x (e.g. "2π") still need one value per row
+    return np.broadcast_to(y.astype(float, copy=False), x.shape)
+
+
+def tabulate(text: str, start: float, stop: float, step: float,
+             mode: str = "DEG", variables: dict = None):
+    """Return ``(x, f(x))`` arrays for TABLE mode."""
+    x = x_range(start, stop, step)
+    return x, evaluate_array(text, x, mode, variables)
+
+
+def to_csv(x: np.ndarray, y: np.ndarray) -> bytes:
+    buf = io.StringIO()
+    buf.write("x,f(x)\n")
+    np.savetxt(buf, np.column_stack((x, y)), delimiter=",", fmt="%.15g")
+    return buf.getvalue().encode()
@@ -0,0 +1,50 @@
+"""The fx-991EX keypad and display as a browser-side Streamlit component.
+
+With ``st.button`` keys, every digit is a websocket round trip and a script
+rerun that appends one character to the display.  This component keeps the
+expression being typed in the browser: digits, operators, functions, SHIFT,
+DEL and C never reach the server.  Only the keys that need the engine or
+session state ("=", M+, M−, MR, MC and the angle mode) report an event:
+
+    {"action": "equal", "expr": "sin(30)+2×3", "seq": 7}
+
+The server hands back its display text with a new ``revision``, and the
+component adopts it.  After a pause in typing the component also sends
+``{"action": "preview", ...}``; the server answers with the provisional
+result for that text in ``preview``, so a burst of keys costs one
+evaluation.  The frontend is plain HTML/JS in ``frontend/`` (no build
+step, nothing from a CDN).  The key layout and SHIFT map come from
+:mod:`fxcalc.keypad`, the same data the server-side keypad uses.
+"""
+import os
+
+import streamlit.components.v1 as components
+
+from fxcalc.keypad import LAYOUT, SHIFT_MAP
+
+FRONTEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+
+# handled in the browser; every other action is sent to the server
+CLIENT_ACTIONS = ("press", "clear", "back", "toggle_shift")
+
+# sent once per render; JSON-ready copies of the process-wide layout
+_LAYOUT = [[list(key) for key in row] for row in LAYOUT]
+_SHIFT_MAP = dict(SHIFT_MAP)
+
+_component = components.declare_component("fx_keypad", path=FRONTEND)
+
+
+def keypad(disp: str, revision: int, mode: str, mem: str, ans: str, info: str = "",
+           preview: str = "", error_texts=(), key: str = None, on_change=None):
+    """Render the keypad; returns the last event dict, or None.
+
+    ``revision`` must change whenever the server sets ``disp``; the browser
+    otherwise keeps what the user is typing.  ``preview`` is the provisional
+    result of ``disp``, shown while the browser's text still equals it.  A
+    display equal to one of ``error_texts`` is cleared by the next key press,
+    as on the device.
+    """
+    return _component(layout=_LAYOUT, shift_map=_SHIFT_MAP, client_actions=CLIENT_ACTIONS,
+                      disp=disp, revision=revision, mode=mode, mem=mem, ans=ans, info=info,
+                      preview=preview,
+                      error_texts=list(error_texts), key=key, on_change=on_change, default=None)
@@ -0,0 +1,143 @@
+// fx-991EX keypad and display, run entirely in the browser.
+//
+// Typing (digits, operators, functions, SHIFT, DEL, C) only edits the local
+// expression.  Keys whose action is not in args.client_actions ("=", M+, M−,
+// MR, MC, mode) send {action, expr, seq} to the server, and the keypad waits
+// for the next render, whose args.revision tells it to take the server's
+// display text.  After PREVIEW_DELAY ms without a key, the expression is sent
+// as {action: "preview", expr, seq}; the answer's args.preview is shown while
+// args.disp still equals what is typed.  Speaks the Streamlit component
+// protocol (v1) directly, so nothing is loaded from a CDN.
+(function () {
+  "use strict";
+
+  const PREVIEW_DELAY = 250;  // ms of quiet before the expression is sent for a preview
+
+  const display = document.getElementById("display");
+  const preview = document.getElementById("preview");
+  const info = document.getElementById("info");
+  const extra = document.getElementById("extra");
+  const keys = document.getElementById("keys");
+
+  let args = null;          // last render's arguments
+  let expr = "";
+  let shift = false;
+  let revision = null;      // server display revision this expression is based on
+  let busy = false;         // waiting for the server to answer an event
+  let seq = 0;
+  let layoutDrawn = null;   // shift state the buttons were drawn for
+  let previewTimer = null;
+  let previewed = null;     // expression last sent for a preview
+
+  function send(type, data) {
+    window.parent.postMessage(Object.assign({isStreamlitMessage: true, type: type}, data), "*");
+  }
+
+  function resize() {
+    send("streamlit:setFrameHeight", {height: document.documentElement.scrollHeight});
+  }
+
+  // ───────── keys ─────────
+  function shifted(text) {
+    return shift && args.shift_map.hasOwnProperty(text) ? args.shift_map[text] : text;
+  }
+
+  function isClient(action) {
+    return args.client_actions.indexOf(action) >= 0;
+  }
+
+  const LOCAL = {
+    press: function (token) {
+      if (args.error_texts.indexOf(expr) >= 0) expr = "";
+      expr += shifted(token);
+    },
+    clear: function () { expr = ""; },
+    back: function () { expr = Array.from(expr).slice(0, -1).join(""); },
+    toggle_shift: function () { shift = !shift; },
+  };
+
+  function schedulePreview() {
+    clearTimeout(previewTimer);
+    previewTimer = setTimeout(function () {
+      // not while an event is pending: its answer replaces the expression anyway
+      if (busy || !expr || expr === previewed || expr === args.disp) return;
+      previewed = expr;
+      seq += 1;
+      send("streamlit:setComponentValue", {value: {action: "preview", expr: expr, seq: seq}, dataType: "json"});
+    }, PREVIEW_DELAY);
+  }
+
+  function key(action, token) {
+    if (busy || !args || args.disabled) return;
+    if (isClient(action)) {
+      LOCAL[action](token);
+      draw();
+      schedulePreview();
+      return;
+    }
+    clearTimeout(previewTimer);
+    busy = true;
+    seq += 1;
+    draw();
+    send("streamlit:setComponentValue", {value: {action: action, expr: expr, seq: seq}, dataType: "json"});
+  }
+
+  function drawKeys() {
+    keys.textContent = "";
+    args.layout.forEach(function (row) {
+      row.forEach(function (spec) {
+        const label = spec[0], action = spec[1], token = spec[2];
+        const button = document.createElement("button");
+        button.textContent = label === null ? args.mode : (action === "press" ? shifted(label) : label);
+        if (!isClient(action)) button.className = "server";
+        if (action === "toggle_shift" && shift) button.className = "shift-on";
+        button.addEventListener("click", function () { key(action, token); });
+        keys.appendChild(button);
+      });
+    });
+    layoutDrawn = shift;
+  }
+
+  function draw() {
+    display.textContent = expr || "0";
+    display.classList.toggle("busy", busy);
+    preview.textContent = args.disp === expr ? args.preview || "" : "";
+    info.textContent = "Mode: " + args.mode + " | SHIFT: " + (shift ? "ON" : "OFF") +
+      " | Mem: " + args.mem + " | Ans: " + args.ans;
+    extra.textContent = args.info || "";
+    if (layoutDrawn !== shift || keys.childElementCount === 0) drawKeys();
+  }
+
+  // physical keyboard, once the frame has focus
+  const KEYBOARD = {"*": "×", "/": "÷", "-": "−", "+": "+", "^": "^", "(": "(", ")": ")",
+                    ".": ".", ",": ",", "x": "x", "!": "!"};
+  document.addEventListener("keydown", function (event) {
+    if (!args || event.ctrlKey || event.metaKey || event.altKey) return;
+    if (/^[0-9]$/.test(event.key)) key("press", event.key);
+    else if (KEYBOARD.hasOwnProperty(event.key)) key("press", KEYBOARD[event.key]);
+    else if (event.key === "Enter" || event.key === "=") key("equal", null);
+    else if (event.key === "Backspace") key("back", null);
+    else if (event.key === "Escape") key("clear", null);
+    else return;
+    event.preventDefault();
+  });
+
+  // ───────── protocol ─────────
+  window.addEventListener("message", function (event) {
+    if (!event.data || event.data.type !== "streamlit:render") return;
+    const previousMode = args && args.mode;
+    args = Object.assign({}, event.data.args, {disabled: event.data.disabled});
+    if (args.revision !== revision) {
+      // the server changed the display ("=", MR, history recall, a new session)
+      revision = args.revision;
+      expr = args.disp;
+      busy = false;
+      previewed = null;
+    }
+    if (previousMode !== args.mode) layoutDrawn = null;
+    draw();
+    resize();
+  });
+
+  send("streamlit:componentReady", {apiVersion: 1});
+})();
@@ -1,224 +1,606 @@
+import os
 import streamlit as st
-import math
 from functools import partial
 
+from fxcalc import CalcError, metrics
+from fxcalc.formatting import DIGIT_RANGE, FORMATS, NORM, Format, all_digits, brief, is_huge, result_text
+from fxcalc.keypad import rows as keypad_rows
+from fxcalc.limits import TooExpensive
+from fxcalc.precise import DECIMAL, FRACTION, Precision
+from fxcalc.precise import DIGIT_RANGE as PRECISION_DIGITS
+from fxcalc.precise import convert as convert_precision
+from fxcalc.session import RECENT_SIZE, SessionState, as_number
+from fxkeypad import keypad as keypad_component
+from shared import apply_style, eval_pool, history_session, history_store, metrics_exporters
+
+# NumPy and pandas are only imported by the TABLE/SOLVE/MATRIX/STAT modes and the debug panel
+
 # ───────────────────────── PAGE / THEME ─────────────────────────
 st.set_page_config(page_title="Casio fx-991EX | Streamlit Pro", page_icon="🧮", layout="centered")
 
-st.markdown("""
-<style>
-body {background: radial-gradient(circle at 25% 15%, #0b0f17 0%, #0a0d12 100%);}
-.calc {
-  max-width:460px;margin:40px auto;padding:20px;
-  background:linear-gradient(180deg,#0d141f,#0a111a);
-  border-radius:20px;border:1px solid #1a2538;
-  box-shadow:0 0 30px rgba(0,255,213,.25);
-}
-.brand{text-align:center;color:#00ffd5;font-weight:800;font-size:20px;
-margin-bottom:10px;text-shadow:0 0 8px #00ffd5;}
-.display{background:#000;color:#00ff9d;font-family:Consolas,monospace;
-font-size:30px;text-align:right;border-radius:10px;padding:12px;
-margin-bottom:8px;overflow-x:auto;border:1px solid #111;}
-.info{font-size:13px;color:#7ee7ff;text-align:right;margin-bottom:10px;}
-button[kind="secondary"]{
-  height:48px;border-radius:10px;font-weight:600;
-  border:1px solid #1c2636;color:#e8f9ff;background:#121a27;}
-.op   button[kind="secondary"]{border-color:#00ffa2;}
-.func button[kind="secondary"]{border-color:#66a3ff;}
-.eq   button[kind="secondary"]{border-color:#a8fddc;}
-.dng  button[kind="secondary"]{border-color:#ff5f6a;}
-.mem  button[kind="secondary"]{border-color:#ffaa00;}
-.shift button[kind="secondary"]{border-color:#f1ff5e;color:#f8fa9d;}
-</style>
-""", unsafe_allow_html=True)
-
 # ───────────────────────── STATE ─────────────────────────
-if "disp" not in st.session_state: st.session_state.disp = ""
-if "mem"  not in st.session_state: st.session_state.mem  = 0.0
-if "ans"  not in st.session_state: st.session_state.ans  = 0.0
-if "mode" not in st.session_state: st.session_state.mode = "DEG"   # DEG | RAD
-if "shift" not in st.session_state: st.session_state.shift = False
-if "history" not in st.session_state: st.session_state.history = []  # recent calcs
-
-# ───────────────────────── MATH HELPERS ─────────────────────────
-def tsin(x): return math.sin(math.radians(x)) if st.session_state.mode=="DEG" else math.sin(x)
-def tcos(x): return math.cos(math.radians(x)) if st.session_state.mode=="DEG" else math.cos(x)
-def ttan(x): return math.tan(math.radians(x)) if st.session_state.mode=="DEG" else math.tan(x)
-def nPr(n,r): return math.factorial(int(n)) // math.factorial(int(n)-int(r))
-def nCr(n,r): return math.comb(int(n), int(r))
-
-ALLOWED = {"math": math, "tsin": tsin, "tcos": tcos, "ttan": ttan, "nPr": nPr, "nCr": nCr}
-
-def _sanitize(expr: str) -> str:
-    # Pretty to pythonic
-    return (expr.replace("×", "*")
-                .replace("÷", "/")
-                .replace("^", "**")
-                .replace("%", "/100")
-                .replace("√", "math.sqrt(")    # we append '(' for UX; user must close it
-                .replace("π", "math.pi")
-                .replace("e", "math.e")
-                .replace("sin", "tsin")
-                .replace("cos", "tcos")
-                .replace("tan", "ttan")
-                .replace("ln", "math.log")
-                .replace("log", "math.log10")
-                .replace("Ans", str(st.session_state.ans)))
+# history_store(), eval_pool() and the stylesheet are per-process resources in shared.py
+def new_session() -> SessionState:
+    state = SessionState(history_session())
+    # seed the in-memory recent list from the persistent history, oldest first
+    for entry in reversed(history_store().page(state.history_id, limit=RECENT_SIZE)):
+        state.record(entry.expression, as_number(entry.result))
+    return state
+
+# All per-session state lives in one __slots__ object (display, mode, Ans, M,
+# SHIFT, recent results, history paging, phase timings)
+if "calc" not in st.session_state: st.session_state.calc = new_session()
+S = st.session_state.calc
+
+# ───────────────────────── INSTRUMENTATION ─────────────────────────
+# Process-wide Prometheus metrics (see fxcalc.metrics); this session's last
+# timings per phase go to S.phases for the debug panel.
+metrics_exporters()
+
+def phases() -> dict:
+    return S.phases
+
+_script_run = metrics.Run("script", phases())
+
+with metrics.phase("css", phases()):
+    apply_style("pro")
+
+# ───────────────────────── EVALUATION ─────────────────────────
+TOO_EXPENSIVE = "Too expensive"
+
+def calc(expr: str):
+    # Parsed + compiled once per (expression, mode, precision); Ans, M and MatA… are bound at call time
+    with metrics.phase("eval", phases()):
+        return eval_pool().evaluate(expr, S.mode, S.variables(), S.precision)
+
+def float_ans():
+    # TABLE and SOLVE run in floats; an Ans past float range (200!) stays exact and fails only if used
+    try:
+        return float(S.ans)
+    except OverflowError:
+        return S.ans
+
+def set_array(name: str, value):
+    # the data goes to the process-wide store (fxcalc.matrix); the session keeps a handle
+    from fxcalc.matrix import STORE
+    S.arrays[name] = STORE.put(value)
+
+# ───────────────────────── KEYPAD MODE ─────────────────────────
+# "client" (default): the fxkeypad component keeps the expression being typed in
+# the browser and only "=", M+/M−, MR, MC and the mode key reach this script.
+# "server": st.button keys, one rerun per press (used by the AppTest benchmarks).
+KEYPAD = st.query_params.get("keypad") or os.environ.get("FXCALC_KEYPAD", "client")
+# the fragment that draws the display; the component draws its own
+SCREEN = "keypad" if KEYPAD == "client" else "display"
 
 # ───────────────────────── ACTIONS ─────────────────────────
+# Callbacks only update state and name the fragments that need redrawing
+# (st.rerun with fragment keys), so a digit redraws the display and nothing else.
 def press(token: str):
     # Always work with strings; token MUST be str
-    if st.session_state.disp == "Error":
-        st.session_state.disp = ""
-    st.session_state.disp += token
-    st.rerun()
+    if S.disp in ("Error", TOO_EXPENSIVE):
+        S.disp = ""
+    S.disp += token
+    st.rerun(SCREEN)
 
 def clear():
-    st.session_state.disp = ""
-    st.rerun()
+    S.disp = ""
+    st.rerun(SCREEN)
 
 def back():
-    st.session_state.disp = st.session_state.disp[:-1]
-    st.rerun()
+    S.disp = S.disp[:-1]
+    st.rerun(SCREEN)
 
 def toggle_mode():
-    st.session_state.mode = "RAD" if st.session_state.mode == "DEG" else "DEG"
-    st.rerun()
+    S.mode = "RAD" if S.mode == "DEG" else "DEG"
+    st.rerun()   # full run: TABLE mode depends on the angle unit too
 
 def toggle_shift():
-    st.session_state.shift = not st.session_state.shift
-    st.rerun()
+    S.shift = not S.shift
+    st.rerun(["display", "keypad"])
 
 def equal():
-    expr = st.session_state.disp.strip()
+    expr = S.disp.strip()
     if not expr:
         return
-    try:
-        sanitized = _sanitize(expr)
-        result = eval(sanitized, ALLOWED)   # no builtins!
-        st.session_state.ans = result
-        st.session_state.history.insert(0, f"{expr} = {result}")
-        st.session_state.history = st.session_state.history[:10]
-        st.session_state.disp = str(result)
-    except Exception:
-        st.session_state.disp = "Error"
-    st.rerun()
+    with metrics.phase("equal", phases()):
+        try:
+            result = calc(expr)
+            if getattr(result, "ndim", 0):
+                # a matrix or vector: it becomes MatAns/VctAns, history keeps a summary
+                from fxcalc.matrix import ANSWERS, summary
+                S.disp = ANSWERS[result.ndim]
+                set_array(S.disp, result)
+                result = summary(result)
+            else:
+                S.ans = result
+                # bounded: a huge int is rounded, never converted digit by digit
+                S.disp = result_text(result, S.fmt)
+            # the number goes to the in-memory recent list (page 1 of the replay);
+            # the Norm text is queued for the SQLite store, written in batches
+            S.record(expr, result)
+            history_store().append(S.history_id, expr, result_text(result))
+            S.history_pages = ()
+        except TooExpensive:
+            S.disp = TOO_EXPENSIVE
+            metrics.inc("fxcalc_eval_errors_total", "too_expensive")
+        except Exception:
+            S.disp = "Error"
+            metrics.inc("fxcalc_eval_errors_total", "error")
+    st.rerun([SCREEN, "history", "result"])
 
 # Memory
 def mem_add():
     try:
-        val = eval(_sanitize(st.session_state.disp or "0"), ALLOWED)
-        st.session_state.mem += float(val)
+        S.mem_plus(calc(S.disp or "0"))
     except Exception:
         pass
-    st.rerun()
+    st.rerun(SCREEN)
 
 def mem_sub():
     try:
-        val = eval(_sanitize(st.session_state.disp or "0"), ALLOWED)
-        st.session_state.mem -= float(val)
+        S.mem_plus(calc(S.disp or "0"), -1)
     except Exception:
         pass
-    st.rerun()
+    st.rerun(SCREEN)
 
 def mem_clear():
-    st.session_state.mem = 0.0
-    st.rerun()
+    S.mem = 0.0
+    st.rerun(SCREEN)
 
 def mem_recall():
-    st.session_state.disp += str(st.session_state.mem)
-    st.rerun()
-
-# ───────────────────────── SHIFT MAP ─────────────────────────
-# What the key *prints* when SHIFT is ON
-SHIFT_MAP = {
-    "sin(": "asin(",   # inverse trig
-    "cos(": "acos(",
-    "tan(": "atan(",
-    "log(": "10**",    # 10^x
-    "ln(":  "exp(",    # e^x
-    "√(":   "**2",     # x^2 (acts on the left value)
-    "π":    "e"        # quick constant swap
-}
-
-def shifted(symbol: str) -> str:
-    return SHIFT_MAP.get(symbol, symbol)
+    S.disp += result_text(S.mem)
+    st.rerun(SCREEN)
+
+def insert(token: str):
+    # MATRIX/STAT panels: a variable or function name the keypad has no key for
+    if S.disp in ("Error", TOO_EXPENSIVE):
+        S.disp = ""
+    S.disp += token
+    S.revision += 1          # the browser keypad takes the new text
+    st.rerun(SCREEN)
+
+# History
+def recall_expression(expression: str):
+    S.disp = expression
+    S.revision += 1
+    st.rerun(SCREEN)
+
+def history_older(cursor):
+    if cursor is None:
+        # leaving page 1, which came from memory: find where the stored page ends
+        cursor = history_store().page(S.history_id, limit=HISTORY_PAGE_ROWS)[-1].id
+    S.history_pages += (cursor,)
+    st.rerun("history")
+
+def history_newer():
+    S.history_pages = S.history_pages[:-1]
+    st.rerun("history")
+
+def history_search():
+    S.history_pages = ()
+
+# keypad.LAYOUT action names → callbacks
+ACTIONS = {"press": press, "equal": equal, "clear": clear, "back": back,
+           "toggle_shift": toggle_shift, "toggle_mode": toggle_mode,
+           "mem_clear": mem_clear, "mem_recall": mem_recall, "mem_add": mem_add, "mem_sub": mem_sub}
+
+def keypad_event():
+    # a server-bound key of the browser keypad: adopt its expression, then act on it
+    event = st.session_state.keypad_ui
+    if event.get("action") == "preview":
+        # sent after a pause in typing: no revision bump, the browser keeps its text
+        S.disp = str(event.get("expr", ""))
+        return
+    action = ACTIONS.get(event.get("action"))
+    if action is None or event["action"] == "press":
+        return
+    metrics.inc("fxcalc_keypresses_total")
+    S.disp = str(event.get("expr", ""))
+    S.revision += 1          # the browser takes the display text back from the next render
+    action()
 
 # ───────────────────────── UI ─────────────────────────
-st.markdown("<div class='calc'>", unsafe_allow_html=True)
-st.markdown("<div class='brand'>CASIO fx-991EX • Streamlit Pro</div>", unsafe_allow_html=True)
-st.markdown(f"<div class='display'>{st.session_state.disp or '0'}</div>", unsafe_allow_html=True)
-st.markdown(
-    f"<div class='info'>Mode: {st.session_state.mode} &nbsp;|&nbsp; "
-    f"SHIFT: {'ON' if st.session_state.shift else 'OFF'} &nbsp;|&nbsp; "
-    f"Mem: {st.session_state.mem:.4g} &nbsp;|&nbsp; Ans: {st.session_state.ans:.4g}</div>",
-    unsafe_allow_html=True
-)
-
-def make_row(btns):
-    cols = st.columns(4)
-    for i, (label, handler, key) in enumerate(btns):
-        # Ensure labels are ALWAYS strings
-        label = str(label)
-        with cols[i]:
-            st.button(label, key=key, on_click=handler, use_container_width=True)
-
-# Memory row
-make_row([("MC", mem_clear, "k_mc"),
-          ("MR", mem_recall, "k_mr"),
-          ("M+", mem_add,    "k_mplus"),
-          ("M−", mem_sub,    "k_mminus")])
-
-# Trig / function rows (SHIFT aware)
-make_row([(shifted("sin(") if st.session_state.shift else "sin(", partial(press, shifted("sin(") if st.session_state.shift else "sin("), "k_sin"),
-          (shifted("cos(") if st.session_state.shift else "cos(", partial(press, shifted("cos(") if st.session_state.shift else "cos("), "k_cos"),
-          (shifted("tan(") if st.session_state.shift else "tan(", partial(press, shifted("tan(") if st.session_state.shift else "tan("), "k_tan"),
-          (shifted("√(")  if st.session_state.shift else "√(",  partial(press, shifted("√(")  if st.session_state.shift else "√("),  "k_sqrt")])
-
-make_row([(shifted("log(") if st.session_state.shift else "log(", partial(press, shifted("log(") if st.session_state.shift else "log("), "k_log"),
-          (shifted("ln(")  if st.session_state.shift else "ln(",  partial(press, shifted("ln(")  if st.session_state.shift else "ln("),  "k_ln"),
-          ("(",  partial(press, "("), "k_lp"),
-          (")",  partial(press, ")"), "k_rp")])
-
-# Digits & ops
-make_row([("7", partial(press, "7"), "k_7"),
-          ("8", partial(press, "8"), "k_8"),
-          ("9", partial(press, "9"), "k_div"),
-          ("÷", partial(press, "÷"), "k_op_div")])
-
-make_row([("4", partial(press, "4"), "k_4"),
-          ("5", partial(press, "5"), "k_5"),
-          ("6", partial(press, "6"), "k_mul"),
-          ("×", partial(press, "×"), "k_op_mul")])
-
-make_row([("1", partial(press, "1"), "k_1"),
-          ("2", partial(press, "2"), "k_2"),
-          ("3", partial(press, "3"), "k_sub"),
-          ("−", partial(press, "−"), "k_op_sub")])
-
-make_row([("0", partial(press, "0"), "k_0"),
-          (".", partial(press, "."), "k_dot"),
-          ("^", partial(press, "^"), "k_pow"),
-          ("+", partial(press, "+"), "k_op_add")])
-
-# Constants / equals
-make_row([(shifted("π") if st.session_state.shift else "π", partial(press, shifted("π") if st.session_state.shift else "π"), "k_pi"),
-          ("e", partial(press, "e"), "k_e"),
-          ("!", partial(press, "math.factorial("), "k_fact"),
-          ("=", equal, "k_eq")])
-
-# Controls (use ASCII-safe DEL instead of ⌫)
-make_row([("C", clear, "k_clear"),
-          ("DEL", back, "k_del"),
-          ("SHIFT", toggle_shift, "k_shift"),
-          (st.session_state.mode, toggle_mode, "k_mode")])
-
-st.markdown("</div>", unsafe_allow_html=True)
+def preview_text() -> str:
+    # provisional result under the display; incremental and memoized (fxcalc.preview)
+    if S.disp in S.arrays:
+        from fxcalc.matrix import summary
+        return f"= {summary(S.arrays[S.disp].array)}"
+    with metrics.phase("preview", phases()):
+        value = S.preview(S.disp, S.mode, {"Ans": S.ans, **(S.stats or {})}, S.precision)
+    return "" if value is None else f"= {result_text(value, S.fmt)}"
+
+def estimate_info(ans) -> str:
+    # ∫ / d/dx results (fxcalc.calculus.Estimate, not imported: NumPy) carry their error and cost
+    return f"± {ans.error:.2g} | {ans.evaluations:,} evaluations" if hasattr(ans, "evaluations") else ""
+
+if KEYPAD != "client":
+    st.markdown("<div class='calc'>", unsafe_allow_html=True)
+    st.markdown("<div class='brand'>CASIO fx-991EX • Streamlit Pro</div>", unsafe_allow_html=True)
+
+@st.fragment(key="display")
+@metrics.timed_run("display", phases)
+def display():
+    st.markdown(f"<div class='display'>{S.disp or '0'}</div>", unsafe_allow_html=True)
+    preview = preview_text()
+    if preview:
+        st.markdown(f"<div class='preview'>{preview}</div>", unsafe_allow_html=True)
+    st.markdown(
+        f"<div class='info'>Mode: {S.mode} &nbsp;|&nbsp; {S.precision or 'Float'} &nbsp;|&nbsp; {S.fmt} &nbsp;|&nbsp; "
+        f"SHIFT: {'ON' if S.shift else 'OFF'} &nbsp;|&nbsp; "
+        f"Mem: {brief(S.mem)} &nbsp;|&nbsp; Ans: {brief(S.ans)}</div>",
+        unsafe_allow_html=True
+    )
+    info = estimate_info(S.ans)
+    if info:
+        st.markdown(f"<div class='info'>{info.replace(' | ', ' &nbsp;|&nbsp; ')}</div>", unsafe_allow_html=True)
+
+if KEYPAD != "client":
+    display()
+
+def keypress(action: str, token):
+    metrics.inc("fxcalc_keypresses_total")
+    if token is None:
+        ACTIONS[action]()
+    else:
+        ACTIONS[action](token)
+
+@st.fragment(key="keypad")
+@metrics.timed_run("keypad", phases)
+def keypad():
+    if KEYPAD == "client":
+        keypad_component(S.disp, S.revision, S.mode, brief(S.mem), brief(S.ans), estimate_info(S.ans),
+                         preview=preview_text(), error_texts=("Error", TOO_EXPENSIVE),
+                         key="keypad_ui", on_change=keypad_event)
+        return
+    # Rows come pre-built (both SHIFT states) from fxcalc.keypad, once per process
+    for row in keypad_rows(S.shift):
+        cols = st.columns(4)
+        for col, (label, action, token, key) in zip(cols, row):
+            with col:
+                st.button(label or S.mode, key=key, on_click=keypress, args=(action, token),
+                          use_container_width=True)
+
+keypad()
+
+if KEYPAD != "client":
+    st.markdown("</div>", unsafe_allow_html=True)
+
+# ───────────────────────── SETUP / ALL DIGITS ─────────────────────────
+def set_format():
+    # the device's SETUP → number format; a result on the display is shown again in it
+    mode = st.session_state.fmt_mode
+    low, high = DIGIT_RANGE.get(mode, (0, 10))
+    fmt = Format(mode, min(max(int(st.session_state.fmt_digits), low), high))
+    st.session_state.fmt_digits = fmt.digits
+    if S.disp == result_text(S.ans, S.fmt):
+        S.disp = result_text(S.ans, fmt)
+        S.revision += 1
+    S.fmt = fmt
+    st.rerun([SCREEN, "result"])
+
+PRECISIONS = ("Float", DECIMAL, FRACTION)
+
+def set_precision():
+    # SETUP → precision: Ans and M are converted, a result on the display is shown again
+    kind = st.session_state.prec_kind
+    low, high = PRECISION_DIGITS
+    digits = min(max(int(st.session_state.prec_digits), low), high)
+    st.session_state.prec_digits = digits
+    precision = None if kind == "Float" else Precision(kind, digits)
+    shown = S.disp == result_text(S.ans, S.fmt)
+    S.ans, S.mem = convert_precision(S.ans, precision), convert_precision(S.mem, precision)
+    if shown:
+        S.disp = result_text(S.ans, S.fmt)
+        S.revision += 1
+    S.precision = precision
+    st.rerun([SCREEN, "result"])
+
+@st.fragment(key="result")
+@metrics.timed_run("result", phases)
+def result_panel():
+    with st.expander("⚙ SETUP  number format, precision", expanded=False, key="fmt_open",
+                     on_change="rerun") as box:
+        if box.open:
+            c1, c2 = st.columns([3, 1])
+            c1.radio("Format", FORMATS, index=FORMATS.index(S.fmt.mode), horizontal=True, key="fmt_mode",
+                     on_change=set_format)
+            if "fmt_digits" not in st.session_state:
+                st.session_state.fmt_digits = S.fmt.digits      # set_format clamps it per format
+            c2.number_input("Digits", min_value=0, max_value=10, key="fmt_digits",
+                            on_change=set_format, disabled=S.fmt.mode == NORM)
+            st.caption("Fix: decimals 0–9 • Sci/Eng: significant digits 1–10 • Norm: every digit")
+            c1, c2 = st.columns([3, 1])
+            kind = S.precision.kind if S.precision else "Float"
+            c1.radio("Precision", PRECISIONS, index=PRECISIONS.index(kind), horizontal=True, key="prec_kind",
+                     on_change=set_precision)
+            if "prec_digits" not in st.session_state:
+                st.session_state.prec_digits = S.precision.digits if S.precision else Precision().digits
+            c2.number_input("Digits", min_value=PRECISION_DIGITS[0], max_value=PRECISION_DIGITS[1],
+                            key="prec_digits", on_change=set_precision, disabled=kind == "Float")
+            st.caption("Decimal: 10–100 significant digits • Fraction: exact rationals, "
+                       "irrational results to that many digits • ∫, d/dx, TABLE, SOLVE and matrices stay Float")
+    if not is_huge(S.ans):
+        return
+    # the display rounds a huge Ans; its digits are written out only when asked for
+    with st.expander("🔢 Ans, every digit", expanded=False, key="digits_open", on_change="rerun") as box:
+        if box.open:
+            with st.spinner("Writing out the digits…"):
+                digits = all_digits(S.ans).result()    # background thread, cached per value
+            st.caption(f"{len(digits.lstrip('-')):,} digits")
+            st.download_button("⬇ TXT", data=digits, file_name="ans.txt", mime="text/plain")
+            st.code(digits, language=None, wrap_lines=True, height=240)
+
+result_panel()
 
 # ───────────────────────── HISTORY ─────────────────────────
-st.subheader("🧾 Recent Calculations (Replay)")
-if st.session_state.history:
-    for h in st.session_state.history[:10]:
-        st.markdown(f"`{h}`")
-else:
-    st.caption("No calculations yet.")
+HISTORY_PAGE_ROWS = RECENT_SIZE
+
+@st.fragment(key="history")
+@metrics.timed_run("history", phases)
+def history():
+    st.subheader("🧾 Recent Calculations (Replay)")
+    prefix = st.text_input("Search", key="hist_prefix", placeholder="expression starts with…",
+                           on_change=history_search, label_visibility="collapsed")
+    pages = S.history_pages
+    if not pages and not prefix:
+        # page 1 is this session's recent list: no SQLite round trip after "="
+        rows = [(f"r{i}", expression, f"{expression} = {result_text(result)}")
+                for i, (expression, result) in enumerate(S.recent)]
+        more, cursor, caption = len(S.recent) == RECENT_SIZE, None, "page 1"
+    else:
+        store, hid = history_store(), S.history_id
+        # one row past the page tells us whether there is an older page
+        entries = store.page(hid, pages[-1] if pages else None, HISTORY_PAGE_ROWS + 1, prefix)
+        more, entries = len(entries) > HISTORY_PAGE_ROWS, entries[:HISTORY_PAGE_ROWS]
+        rows = [(entry.id, entry.expression, str(entry)) for entry in entries]
+        cursor = entries[-1].id if entries else None
+        caption = f"{store.count(hid, prefix):,} saved • page {len(pages) + 1}"
+    if not rows and not pages:
+        st.caption("No calculations yet.")
+        return
+    for row_id, expression, text in rows:
+        cols = st.columns([8, 1])
+        cols[0].markdown(f"`{text}`")
+        cols[1].button("↩", key=f"recall_{row_id}", on_click=recall_expression, args=(expression,))
+    c1, c2, c3 = st.columns([1, 2, 1])
+    c1.button("◀ Newer", key="hist_newer", on_click=history_newer, disabled=not pages)
+    c2.caption(caption)
+    c3.button("Older ▶", key="hist_older", on_click=history_older, args=(cursor,), disabled=not more)
+
+history()
+
+# ───────────────────────── TABLE MODE ─────────────────────────
+TABLE_PAGE_ROWS = 100
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def table_data(expr: str, start: float, stop: float, step: float, mode: str, ans: float):
+    # One compiled, vectorized call for the whole range; cached across reruns
+    from fxcalc.table import tabulate
+    return tabulate(expr, start, stop, step, mode, {"Ans": ans})
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def table_csv(expr: str, start: float, stop: float, step: float, mode: str, ans: float) -> bytes:
+    from fxcalc.table import to_csv
+    return to_csv(*table_data(expr, start, stop, step, mode, ans))
+
+# Own fragment: editing the range or paging never reruns the keypad
+@st.fragment(key="table")
+@metrics.timed_run("table", phases)
+def table_mode():
+    # tracked open/closed state: a closed expander runs nothing (and imports no NumPy/pandas)
+    with st.expander("📈 TABLE  f(x)", expanded=False, key="tbl_open", on_change="rerun") as box:
+        if not box.open:
+            return
+        import pandas as pd
+        t_expr = st.text_input("f(x) =", value="x^2", key="tbl_expr")
+        c1, c2, c3 = st.columns(3)
+        t_start = c1.number_input("Start", value=1.0, key="tbl_start")
+        t_stop  = c2.number_input("End",   value=10.0, key="tbl_stop")
+        t_step  = c3.number_input("Step",  value=1.0, key="tbl_step")
+        if t_expr.strip():
+            args = (t_expr.strip(), t_start, t_stop, t_step, S.mode, float_ans())
+            try:
+                xs, ys = table_data(*args)
+            except CalcError as exc:
+                st.error(f"TABLE: {exc}")
+            else:
+                pages = max(1, -(-len(xs) // TABLE_PAGE_ROWS))
+                page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key="tbl_page")
+                lo = (page - 1) * TABLE_PAGE_ROWS
+                rows = slice(lo, lo + TABLE_PAGE_ROWS)
+                st.dataframe(pd.DataFrame({"x": xs[rows], "f(x)": ys[rows]}, index=range(lo + 1, lo + 1 + len(xs[rows]))),
+                             width="stretch")
+                st.caption(f"{len(xs):,} rows • {S.mode}")
+                # deferred: the CSV is only built when the button is clicked
+                st.download_button("⬇ CSV", data=partial(table_csv, *args), file_name="table.csv", mime="text/csv")
+
+table_mode()
+
+# ───────────────────────── SOLVE MODE ─────────────────────────
+@st.cache_data(max_entries=32, show_spinner=False)
+def solve_roots(equation: str, lo: float, hi: float, mode: str, ans: float):
+    # Compiled once; one vectorized bracket scan, then Brent/Newton per root
+    from fxcalc.solve import solve
+    return solve(equation, lo, hi, mode, {"Ans": ans})
+
+@st.fragment(key="solve")
+@metrics.timed_run("solve", phases)
+def solve_mode():
+    # tracked open/closed state: a closed expander runs nothing (and imports no NumPy/pandas)
+    with st.expander("🎯 SOLVE  f(x) = 0", expanded=False, key="slv_open", on_change="rerun") as box:
+        if not box.open:
+            return
+        import pandas as pd
+        s_eq = st.text_input("Equation", value="x^3-2x-5=0", key="slv_eq")
+        c1, c2 = st.columns(2)
+        s_lo = c1.number_input("From", value=-10.0, key="slv_lo")
+        s_hi = c2.number_input("To",   value=10.0, key="slv_hi")
+        if s_eq.strip():
+            try:
+                roots = solve_roots(s_eq.strip(), s_lo, s_hi, S.mode, float_ans())
+            except CalcError as exc:
+                st.error(f"SOLVE: {exc}")
+            else:
+                if roots:
+                    st.dataframe(pd.DataFrame(roots, columns=["x", "iterations", "|f(x)|", "method"]),
+                                 width="stretch", hide_index=True)
+                else:
+                    st.caption("No real roots found in this interval.")
+                st.caption(f"{len(roots)} root(s) • {S.mode}")
+
+solve_mode()
+
+# ───────────────────────── MATRIX / VECTOR MODE ─────────────────────────
+MATRIX_EDIT_CELLS = 400      # bigger arrays come from CSV and are shown, not edited cell by cell
+MATRIX_VIEW = 20             # rows and columns shown of a bigger array
+MATRIX_INSERTS = ("MatA", "MatB", "MatC", "MatD", "MatAns", "det(",
+                  "VctA", "VctB", "VctC", "VctD", "VctAns", "inv(",
+                  "trn(", "dot(", "cross(", "eig(", "identity(", "abs(")
+
+def resize_array(name: str, shape: tuple):
+    # keeps the cells that still fit, like redefining the dimension on the device
+    import numpy as np
+    array = np.zeros(shape)
+    if name in S.arrays:
+        old = S.arrays[name].array
+        array[tuple(slice(0, min(a, b)) for a, b in zip(shape, old.shape))] = \
+            old[tuple(slice(0, min(a, b)) for a, b in zip(shape, old.shape))]
+    set_array(name, array)
+
+def load_csv(name: str, key: str, vector: bool):
+    import numpy as np
+    upload = st.session_state[key]
+    if upload is None:
+        return
+    try:
+        array = np.loadtxt(upload, delimiter=",", ndmin=2)
+        set_array(name, array.ravel() if vector else array)
+    except (ValueError, CalcError) as exc:
+        st.session_state.mat_error = f"{name}: {exc}"
+
+def clear_array(name: str):
+    S.arrays.pop(name, None)
+
+@st.fragment(key="matrix")
+@metrics.timed_run("matrix", phases)
+def matrix_mode():
+    with st.expander("🔢 MATRIX / VECTOR", expanded=False, key="mat_open", on_change="rerun") as box:
+        if not box.open:
+            return
+        import numpy as np
+        import pandas as pd
+        from fxcalc.matrix import ANSWERS, MATRICES, MAX_DIM, VECTORS
+        cols = st.columns(6)
+        for i, token in enumerate(MATRIX_INSERTS):
+            cols[i % 6].button(token, key=f"mat_ins_{token}", on_click=insert, args=(token,),
+                               use_container_width=True)
+        name = st.selectbox("Variable", MATRICES + VECTORS + tuple(ANSWERS.values()), key="mat_name")
+        vector, ref = name.startswith("Vct"), S.arrays.get(name)
+        if name not in ANSWERS.values():
+            shape = ref.shape if ref else ((3,) if vector else (3, 3))
+            c1, c2, c3, c4 = st.columns(4)
+            rows = c1.number_input("Size" if vector else "Rows", 1, MAX_DIM, shape[0], key=f"mat_rows_{name}")
+            size = (rows,) if vector else (rows, c2.number_input("Columns", 1, MAX_DIM, shape[1],
+                                                                 key=f"mat_cols_{name}"))
+            c3.button("Set size", key="mat_resize", on_click=resize_array, args=(name, size),
+                      use_container_width=True)
+            c4.button("Clear", key="mat_clear", on_click=clear_array, args=(name,),
+                      disabled=ref is None, use_container_width=True)
+            st.file_uploader("Load CSV", type="csv", key=f"mat_csv_{name}",
+                             on_change=load_csv, args=(name, f"mat_csv_{name}", vector))
+        error = st.session_state.pop("mat_error", None)
+        if error:
+            st.error(error)
+        if ref is None:
+            st.caption(f"{name} is not defined.")
+            return
+        array = ref.array
+        frame = pd.DataFrame(array.reshape(len(array), -1),
+                             columns=[name] if vector else [str(c) for c in range(1, array.shape[-1] + 1)],
+                             index=range(1, len(array) + 1))
+        if np.iscomplexobj(array):
+            frame = frame.map("{:.10g}".format)      # Arrow has no complex columns
+        if name in ANSWERS.values() or array.size > MATRIX_EDIT_CELLS:
+            st.dataframe(frame.iloc[:MATRIX_VIEW, :MATRIX_VIEW], width="stretch")
+        else:
+            # keyed by content: a resized or reloaded array gets a fresh editor
+            edited = st.data_editor(frame, key=f"mat_edit_{name}_{ref.key[:12]}", width="stretch")
+            values = edited.to_numpy(dtype=float).reshape(array.shape)
+            if not np.array_equal(values, array, equal_nan=True):
+                set_array(name, values)
+        st.caption(f"{name}: {'×'.join(map(str, array.shape))}")
+
+matrix_mode()
+
+# ───────────────────────── STAT MODE ─────────────────────────
+STAT_INSERTS = ("n", "x̄", "σx", "sx", "minX", "maxX", "Q1", "med",
+                "Q3", "ȳ", "σy", "sy", "a", "b", "c", "r")
+STAT_MODELS = ("y = a + bx", "y = a + bx + cx²")
+STAT_LABELS = {"n": "n", "xbar": "x̄", "sigmax": "σx", "sx": "sx", "minX": "minX", "maxX": "maxX",
+               "Q1": "Q1", "med": "med", "Q3": "Q3", "ybar": "ȳ", "sigmay": "σy", "sy": "sy",
+               "a": "a", "b": "b", "c": "c", "r": "r"}
+
+def stat_table(stats, quadratic: bool):
+    import pandas as pd
+    values = stats.variables(quadratic)
+    st.dataframe(pd.DataFrame({"value": {STAT_LABELS[name]: value for name, value in values.items()}}),
+                 width="stretch")
+    quartiles = "" if stats.exact_quartiles else " • quartiles approximate"
+    skipped = f" • {stats.skipped:,} rows skipped" if stats.skipped else ""
+    st.caption(f"{stats.n:,} rows{'' if stats.done else ' so far…'}{quartiles}{skipped}")
+
+@st.fragment(key="stat")
+@metrics.timed_run("stat", phases)
+def stat_mode():
+    with st.expander("📊 STAT  (CSV)", expanded=False, key="stat_open", on_change="rerun") as box:
+        if not box.open:
+            return
+        from fxcalc import stat
+        upload = st.file_uploader("CSV: one column for 1-VAR, two for x and y", type="csv", key="stat_csv")
+        if upload is None:
+            S.stats = None
+            st.session_state.pop("stat_result", None)
+            return
+        names = stat.columns(upload)
+        c1, c2, c3 = st.columns(3)
+        x = c1.selectbox("x", names, key="stat_x")
+        # y defaults to the second column; a one-column file is 1-VAR, not x against itself
+        y = c2.selectbox("y", ("—",) + tuple(names), index=2 if len(names) > 1 else 0, key="stat_y")
+        quadratic = c3.radio("Regression", STAT_MODELS, key="stat_model") == STAT_MODELS[1]
+        y = None if y == "—" else y
+        source = (upload.file_id, x, y)
+        result = st.session_state.get("stat_result")
+        if result is None or result[0] != source:
+            # stream: partial results are redrawn as chunks arrive; a known file is one hash
+            partial, progress = st.empty(), st.progress(0.0)
+            try:
+                for stats in stat.summarize(upload, x, y, key=stat.digest(upload)):
+                    progress.progress(min(upload.tell() / max(upload.size, 1), 1.0))
+                    with partial.container():
+                        stat_table(stats, quadratic)
+            except CalcError as exc:
+                st.error(f"STAT: {exc}")
+                return
+            st.session_state.stat_result = result = (source, stats)
+            partial.empty()
+            progress.empty()
+        S.stats = result[1].variables(quadratic)
+        stat_table(result[1], quadratic)
+        cols = st.columns(8)
+        for i, token in enumerate(STAT_INSERTS):
+            cols[i % 8].button(token, key=f"stat_ins_{token}", on_click=insert, args=(token,),
+                               use_container_width=True)
+
+stat_mode()
+
+# ───────────────────────── DEBUG PANEL ─────────────────────────
+_script_run.finish()
+
+if st.query_params.get("debug") == "1" or os.environ.get("FXCALC_DEBUG"):
+    import pandas as pd
+    with st.sidebar.expander("🔧 Debug", expanded=True):
+        st.caption("This session, last run of each phase (ms)")
+        st.dataframe(pd.DataFrame({"ms": {k: v * 1e3 for k, v in sorted(phases().items())}}), width="stretch")
+        st.caption("This server process")
+        st.dataframe(pd.DataFrame({"value": metrics.REGISTRY.snapshot()}), width="stretch")
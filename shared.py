@@ -0,0 +1,64 @@
+"""Process-wide resources shared by every page of ``app.py``.
+
+Each page used to declare its own CSS, history store and evaluator.  Here
+they are ``st.cache_resource`` singletons: one stylesheet parsed once, one
+SQLite history store and one evaluation pool per server process, whichever
+page asks first.  Nothing in this module imports NumPy or pandas.  Pages
+import those where a mode needs them.
+"""
+import os
+import re
+import uuid
+
+import streamlit as st
+
+from fxcalc import metrics
+from fxcalc.history import HistoryStore
+from fxcalc.sandbox import EvalPool
+
+STYLESHEET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css")
+
+# "/* @page name */" starts the rules of one page; rules before the first marker apply everywhere
+_SECTION_RE = re.compile(r"/\*\s*@page\s+(\w+)\s*\*/")
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+
+
+@st.cache_resource
+def stylesheet() -> dict:
+    """``style.css`` split into ``{page: "<style>…</style>"}``; ``""`` is the shared part."""
+    with open(STYLESHEET, encoding="utf-8") as fh:
+        parts = _SECTION_RE.split(fh.read())
+    sections = {"": parts[0]}
+    sections.update(zip(parts[1::2], parts[2::2]))
+    sections = {page: _COMMENT_RE.sub("", css).strip() for page, css in sections.items()}
+    return {page: f"<style>{css}</style>" for page, css in sections.items() if css}
+
+
+def apply_style(page: str):
+    """Inject the shared rules plus those of ``page`` (one markdown element)."""
+    sheet = stylesheet()
+    st.markdown(sheet.get("", "") + sheet.get(page, ""), unsafe_allow_html=True)
+
+
+@st.cache_resource
+def history_store() -> HistoryStore:
+    # One SQLite-backed store per server process; survives restarts
+    return HistoryStore()
+
+
+@st.cache_resource
+def eval_pool() -> EvalPool:
+    # One pre-warmed, time/memory-limited worker pool per server process
+    return EvalPool()
+
+
+@st.cache_resource
+def metrics_exporters() -> list:
+    return metrics.start_exporters()
+
+
+def history_session() -> str:
+    # The history id lives in the URL, so reloads and server restarts keep it
+    if "hid" not in st.query_params:
+        st.query_params["hid"] = uuid.uuid4().hex[:12]
+    return st.query_params["hid"]